@@ -0,0 +1,78 @@
+# benchmarks/bench_fetch.py
+"""Compare the per-message FETCH loop with batched, pipelined UID FETCH.
+
+Also measures header-only list mode, which skips bodies and attachments.
+Run from the project directory:
+
+    python -m benchmarks.bench_fetch --latency 0.05 --count 10 100 500
+"""
+import argparse
+import imaplib
+import time
+
+from benchmarks.fake_imap import FakeIMAPServer, FakeMailbox, make_simple_message, make_attachment_message
+from features.email_reader.email_reader import fetch_emails, fetch_single_email
+
+
+def per_message_loop(imap_conn, num_emails):
+    """The original fetch_emails loop: one FETCH round trip per message"""
+    imap_conn.select("INBOX")
+    _, messages = imap_conn.search(None, "ALL")
+    email_ids = messages[0].split()[-num_emails:]
+    return [fetch_single_email(imap_conn, email_id) for email_id in reversed(email_ids)]
+
+
+def batched(imap_conn, num_emails, batch_size, pipeline_depth, headers_only=False):
+    emails, error = fetch_emails(imap_conn, num_emails=num_emails, batch_size=batch_size,
+                                 pipeline_depth=pipeline_depth, headers_only=headers_only)
+    if error:
+        raise RuntimeError(error)
+    return emails
+
+
+def measure(server, label, func, *args):
+    imap_conn = imaplib.IMAP4(server.host, server.port)
+    imap_conn.login("bench", "bench")
+    server.reset_stats()
+    start = time.perf_counter()
+    emails = func(imap_conn, *args)
+    elapsed = time.perf_counter() - start
+    commands = server.stats["commands"]
+    kilobytes = server.stats["bytes_out"] / 1024
+    imap_conn.logout()
+
+    round_trips = elapsed / server.latency if server.latency else float("nan")
+    print(f"{label:<28} {len(emails):>6} {commands:>9} {round_trips:>12.1f} "
+          f"{kilobytes:>11.1f} {elapsed * 1000:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="one-way delay per response in seconds")
+    parser.add_argument("--count", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--pipeline-depth", type=int, default=4)
+    parser.add_argument("--attachment-every", type=int, default=5,
+                        help="make every Nth message carry a 256 KB attachment (0 disables)")
+    args = parser.parse_args()
+
+    mailbox = FakeMailbox(
+        make_attachment_message(i, 256 * 1024) if args.attachment_every and i % args.attachment_every == 0
+        else make_simple_message(i)
+        for i in range(max(args.count)))
+    with FakeIMAPServer({"INBOX": mailbox}, latency=args.latency) as server:
+        print(f"latency={args.latency * 1000:.0f}ms batch_size={args.batch_size} "
+              f"pipeline_depth={args.pipeline_depth}")
+        print(f"{'mode':<28} {'emails':>6} {'commands':>9} {'~round trips':>12} "
+              f"{'KB in':>11} {'wall (ms)':>11}")
+        for count in args.count:
+            measure(server, f"per-message x{count}", per_message_loop, count)
+            measure(server, f"batched x{count}", batched, count, args.batch_size, 1)
+            measure(server, f"batched+pipelined x{count}", batched, count,
+                    args.batch_size, args.pipeline_depth)
+            measure(server, f"list mode x{count}", batched, count,
+                    args.batch_size, args.pipeline_depth, True)
+
+
+if __name__ == "__main__":
+    main()
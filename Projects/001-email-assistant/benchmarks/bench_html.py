@@ -0,0 +1,103 @@
+# benchmarks/bench_html.py
+"""Compare the single-pass regex converter with the old per-tag regex strippers.
+
+Builds a synthetic corpus of marketing-style HTML (nested tables, inline
+styles, <style>/<script> blocks, entities, malformed markup) at several
+sizes and reports throughput plus leftovers in the output. Run from the
+project directory:
+
+    python -m benchmarks.bench_html --sizes 1 4 16
+"""
+import argparse
+import re
+import time
+
+from utils.html_text import html_to_text
+
+PREVIEW_CHARS = 81
+
+_HEAD = """<!DOCTYPE html><html><head><title>Weekly deals</title>
+<style type="text/css">body {{ font-family: Arial; }} .promo td {{ padding: 4px; color: #333; }}
+@media only screen and (max-width: 600px) {{ .col {{ width: 100% !important; }} }}</style>
+<script>window.dataLayer = window.dataLayer || []; function track(id) {{ return id > 0 && id < 9; }}</script>
+</head><body><div class="wrapper">"""
+
+_BLOCK = """<table class="promo" width="100%" cellpadding="0" cellspacing="0" style="border:0">
+<tr><td class="col" style="font-size:14px;line-height:20px">
+<h2 style="margin:0">Offer {index} &ndash; save&nbsp;{index}%</h2>
+<p>Dear customer, caf&eacute; &amp; restaurant vouchers are back. Prices start at &pound;{index}.99
+<br>Terms &amp; conditions apply &#8212; see <a href="https://example.com/t/{index}?utm=mail&amp;id={index}">details</a>.</p>
+<ul><li>Free delivery</li><li>Cancel anytime <b>no questions asked</li></ul>
+<img src="https://example.com/p/{index}.png" alt="" width="1" height="1"/>
+<script type="text/javascript">track({index});</script>
+</td></tr></table>
+"""
+
+_TAIL = "<p>Unsubscribe &middot; Privacy</p></div></body></html>"
+
+
+def build_html(size_bytes):
+    """Marketing-style HTML of roughly size_bytes"""
+    parts = [_HEAD.format()]
+    total = len(parts[0])
+    index = 0
+    while total < size_bytes:
+        block = _BLOCK.format(index=index)
+        parts.append(block)
+        total += len(block)
+        index += 1
+    parts.append(_TAIL)
+    return "".join(parts)
+
+
+def regex_html_to_plain_text(html):
+    """The previous email_reader.html_to_plain_text"""
+    text = re.sub(r'<[^>]+>', ' ', html)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def regex_clean_email_body(body):
+    """The previous helpers.clean_email_body"""
+    clean_body = re.sub(r'<[^>]+>', '', body)
+    clean_body = re.sub(r'\s+', ' ', clean_body)
+    return clean_body.strip()
+
+
+def leftovers(text):
+    """Count markup that should not reach the reader"""
+    return {
+        "entities": len(re.findall(r'&[a-z]+;|&#\d+;', text)),
+        "css/js": text.count("font-family") + text.count("dataLayer") + text.count("track(")
+    }
+
+
+def measure(label, func, html, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = func(html)
+        best = min(best, time.perf_counter() - start)
+    megabytes = len(html) / 1e6
+    found = leftovers(text)
+    print(f"{label:<28} {best * 1000:>9.1f} ms {megabytes / best:>8.1f} MB/s "
+          f"{len(text):>10} chars  entities={found['entities']} css/js={found['css/js']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16], help="corpus sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        html = build_html(int(size * 1e6))
+        print(f"\n{len(html) / 1e6:.1f} MB marketing HTML")
+        measure("regex html_to_plain_text", regex_html_to_plain_text, html, args.repeat)
+        measure("regex clean_email_body", regex_clean_email_body, html, args.repeat)
+        measure("html_to_text", html_to_text, html, args.repeat)
+        measure(f"html_to_text preview ({PREVIEW_CHARS})", lambda h: html_to_text(h, PREVIEW_CHARS), html, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_startup.py
+"""Measure start-up time of the headless commands and the interactive client.
+
+Each case runs in a fresh process inside a scratch directory with a seeded
+message cache, so `list --offline` and `read --offline` do real work
+without a network. The same cases run against a PyInstaller build when
+`--frozen` points at the executable. Source runs are timed both as
+`python main.py` and as `python -m main`, which skips recompiling main.py.
+`--importtime` prints the slowest imports of one command
+(python -X importtime). Run from the project directory:
+
+    python -m benchmarks.bench_startup --repeat 10
+    python -m benchmarks.bench_startup --frozen dist/cli_app.exe
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(PROJECT_DIR, "main.py")
+SEED_MESSAGES = 500
+
+CASES = [
+    ("--help", ["--help"]),
+    ("list --offline", ["list", "--offline"]),
+    ("read --offline", ["read", str(SEED_MESSAGES), "--offline"]),
+]
+
+
+def seed_workdir(directory, count=SEED_MESSAGES):
+    """Create config/mail_cache.db with `count` cached INBOX messages"""
+    from benchmarks.fake_imap import make_simple_message
+    from features.email_reader.email_reader import build_email_record
+    from utils.mail_cache import open_mail_cache, set_folder_state, store_records, store_body
+
+    os.makedirs(os.path.join(directory, "config"), exist_ok=True)
+    cache = open_mail_cache(os.path.join(directory, "config", "mail_cache.db"))
+    records = []
+    for uid in range(1, count + 1):
+        record = build_email_record(str(uid).encode(), make_simple_message(uid))
+        record["uid"] = uid
+        records.append(record)
+    set_folder_state(cache, "INBOX", 1)
+    store_records(cache, "INBOX", 1, records)
+    store_body(cache, "INBOX", 1, count, records[-1]["body"])
+    cache.close()
+
+
+def time_command(command, cwd, repeat, env=None):
+    """Wall times in ms of running command `repeat` times; None if it fails"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            return None
+    return times
+
+
+def report(label, times):
+    if times is None:
+        print(f"{label:<34} {'failed':>10}")
+        return
+    print(f"{label:<34} {min(times):>8.1f} ms {statistics.median(times):>8.1f} ms")
+
+
+def show_importtime(argv, cwd, top):
+    """Print the slowest cumulative imports of one source run"""
+    result = subprocess.run([sys.executable, "-X", "importtime", MAIN] + argv, cwd=cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    print(f"\nslowest imports of `main.py {' '.join(argv)}` (cumulative us)")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative:>10} {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--frozen", help="path of the PyInstaller executable to time as well")
+    parser.add_argument("--importtime", metavar="COMMAND", help="e.g. 'list --offline'")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seed_workdir(workdir)
+        print(f"{'case':<34} {'best':>11} {'median':>11}")
+        report("python -c pass (interpreter floor)", time_command([sys.executable, "-c", "pass"], workdir, args.repeat))
+        # A script is recompiled on every run, `-m main` loads its cached bytecode
+        module_env = dict(os.environ, PYTHONPATH=PROJECT_DIR)
+        for label, argv in CASES:
+            report(f"source {label}", time_command([sys.executable, MAIN] + argv, workdir, args.repeat))
+            report(f"source -m {label}", time_command([sys.executable, "-m", "main"] + argv, workdir,
+                                                      args.repeat, module_env))
+        report("source interactive imports", time_command(
+            [sys.executable, "-c", f"import sys; sys.path.insert(0, {PROJECT_DIR!r}); import main"],
+            workdir, args.repeat))
+        if args.frozen:
+            frozen = os.path.abspath(args.frozen)
+            for label, argv in CASES:
+                report(f"frozen {label}", time_command([frozen] + argv, workdir, args.repeat))
+        if args.importtime:
+            show_importtime(args.importtime.split(), workdir, args.top)
+
+
+if __name__ == "__main__":
+    main()
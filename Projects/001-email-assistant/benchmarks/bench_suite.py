@@ -0,0 +1,217 @@
+# benchmarks/bench_suite.py
+"""Regression benchmarks for the reader, the helpers and the replier.
+
+Starts the fake IMAP and SMTP servers in-process with the given latency and
+bandwidth, serves synthetic mailboxes of every `--sizes` entry (plain,
+HTML, multipart, attachments, legacy charsets) and times:
+
+  fetch_emails (list mode and full), fetch_single_email   over IMAP
+  extract_email_body and the utils.helpers functions      on a parsed corpus
+  send_reply                                              over SMTP
+
+Each case reports protocol round trips (commands), bytes on the wire, wall
+time and peak Python memory. Wall time comes from an untraced run and peak
+memory from a second run under tracemalloc; the servers share the process,
+so the peak includes their response buffers. `--save` writes the results
+as JSON and `--baseline` prints the change against such a file. Run from
+the project directory:
+
+    python -m benchmarks.bench_suite --sizes 1000 10000 200000 --latency 0.02
+    python -m benchmarks.bench_suite --bandwidth 1000000 --save before.json
+    python -m benchmarks.bench_suite --baseline before.json
+"""
+import argparse
+import email
+import imaplib
+import json
+import smtplib
+import time
+import tracemalloc
+
+from benchmarks.fake_imap import FakeIMAPServer
+from benchmarks.fake_smtp import FakeSMTPServer
+from benchmarks.synthetic import SyntheticMailbox, make_mixed_message
+from features.email_reader.email_reader import fetch_emails, fetch_single_email, extract_email_body, build_email_record
+from features.email_replier.email_replier import send_reply
+from utils.helpers import clean_email_body, format_email_date, extract_clean_sender, wrap_text
+
+REPLY_TEXT = "Thanks, received.\n\nI will go through it this afternoon and get back to you."
+
+
+def measure(label, func, servers=(), trace_memory=True):
+    """Run func() untraced for time and traffic, then traced for peak memory.
+
+    func returns the number of items it processed. Server counters are
+    reset before the untraced run only, so they describe a single pass. A
+    case that raises is reported with its error instead of numbers.
+    """
+    for server in servers:
+        server.reset_stats()
+    start = time.perf_counter()
+    try:
+        items = func()
+    except Exception as e:
+        return {"case": label, "error": f"{type(e).__name__}: {e}"}
+    elapsed = time.perf_counter() - start
+    round_trips = sum(server.stats["commands"] for server in servers)
+    traffic = sum(server.stats["bytes_in"] + server.stats["bytes_out"] for server in servers)
+
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {"case": label, "items": items, "round_trips": round_trips, "bytes": traffic,
+            "wall_ms": elapsed * 1000, "peak_kb": peak / 1024 if peak is not None else None}
+
+
+def measure_imap(server, label, func, trace_memory=True):
+    """measure() func(conn) on a fresh, logged-in connection"""
+    conn = imaplib.IMAP4(server.host, server.port)
+    conn.login("bench", "bench")
+    try:
+        return measure(label, lambda: func(conn), [server], trace_memory)
+    finally:
+        try:
+            conn.logout()
+        except (imaplib.IMAP4.error, OSError):
+            conn.shutdown()
+
+
+def imap_cases(size, page, singles):
+    """(label, func(conn)) cases against one served mailbox"""
+    def list_mode(conn):
+        emails, error = fetch_emails(conn, num_emails=page, headers_only=True)
+        if error:
+            raise RuntimeError(error)
+        return len(emails)
+
+    def full(conn):
+        emails, error = fetch_emails(conn, num_emails=page)
+        if error:
+            raise RuntimeError(error)
+        return len(emails)
+
+    def single(conn):
+        conn.select("INBOX")
+        return sum(fetch_single_email(conn, str(seq).encode()) is not None
+                   for seq in range(size, max(size - singles, 0), -1))
+
+    return [(f"fetch_emails list x{page} of {size}", list_mode),
+            (f"fetch_emails full x{page} of {size}", full),
+            (f"fetch_single_email x{singles} of {size}", single)]
+
+
+def corpus_cases(corpus_size):
+    """CPU-only cases over parsed synthetic messages"""
+    raws = [make_mixed_message(index, seed=1) for index in range(1, corpus_size + 1)]
+    messages = [email.message_from_bytes(raw) for raw in raws]
+    bodies = [extract_email_body(msg) for msg in messages]
+    html = [part.get_payload(decode=True).decode(part.get_content_charset() or "utf-8", errors="replace")
+            for msg in messages for part in msg.walk() if part.get_content_type() == "text/html"]
+    dates = [msg.get("Date") for msg in messages]
+    senders = [msg.get("From") for msg in messages]
+
+    def run(func, values):
+        return lambda: sum(1 for value in values if func(value) is not None)
+
+    cases = [
+        ("extract_email_body", extract_email_body, messages),
+        ("clean_email_body text", clean_email_body, bodies),
+        ("clean_email_body html", clean_email_body, html),
+        ("format_email_date", format_email_date, dates),
+        ("extract_clean_sender", extract_clean_sender, senders),
+        ("wrap_text", wrap_text, bodies),
+    ]
+    for name, func, values in cases:
+        yield lambda trace, name=name, func=func, values=values: measure(
+            f"{name} x{len(values)}", run(func, values), (), trace)
+
+
+def smtp_cases(server, replies):
+    """send_reply on one authenticated connection"""
+    records = [build_email_record(str(index).encode(), make_mixed_message(index, seed=2))
+               for index in range(1, replies + 1)]
+    conn = smtplib.SMTP(server.host, server.port)
+    conn.login("bench", "bench")
+
+    def reply_all():
+        sent = 0
+        for record in records:
+            success, error = send_reply(conn, record, REPLY_TEXT, "me@example.com")
+            if not success:
+                raise RuntimeError(error)
+            sent += 1
+        return sent
+
+    try:
+        yield lambda trace: measure(f"send_reply x{replies}", reply_all, [server], trace)
+    finally:
+        conn.quit()
+
+
+def print_row(result, baseline=None):
+    if "error" in result:
+        print(f"{result['case']:<40} failed: {result['error'][:100]}", flush=True)
+        return
+    peak = f"{result['peak_kb']:>10.0f}" if result["peak_kb"] is not None else f"{'-':>10}"
+    line = (f"{result['case']:<40} {result['items']:>6} {result['round_trips']:>7} "
+            f"{result['bytes'] / 1024:>10.1f} {result['wall_ms']:>10.1f} {peak}")
+    previous = (baseline or {}).get(result["case"])
+    if previous and previous.get("wall_ms"):
+        line += f" {(result['wall_ms'] / previous['wall_ms'] - 1) * 100:>+8.1f}%"
+    print(line, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 200000],
+                        help="messages in the served mailbox, one run each")
+    parser.add_argument("--latency", type=float, default=0.02, help="one-way delay per response in seconds")
+    parser.add_argument("--bandwidth", type=float, default=None, help="link speed in bytes per second")
+    parser.add_argument("--page", type=int, default=50, help="messages per fetch_emails call")
+    parser.add_argument("--singles", type=int, default=20, help="messages fetched one by one")
+    parser.add_argument("--corpus", type=int, default=2000, help="messages in the CPU-only corpus")
+    parser.add_argument("--replies", type=int, default=20)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare wall times with saved results")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {result["case"]: result for result in json.load(f)["results"]}
+    trace = not args.no_memory
+
+    bandwidth = f"{args.bandwidth / 1024:.0f} KB/s" if args.bandwidth else "unlimited"
+    print(f"latency={args.latency * 1000:.0f}ms bandwidth={bandwidth}")
+    print(f"{'case':<40} {'items':>6} {'trips':>7} {'KB wire':>10} {'wall (ms)':>10} {'peak KB':>10}"
+          + (f" {'vs base':>9}" if baseline else ""))
+
+    results = []
+    for size in args.sizes:
+        mailbox = SyntheticMailbox(size)
+        mailbox.warm(max(args.page, args.singles))
+        with FakeIMAPServer({"INBOX": mailbox}, latency=args.latency, bandwidth=args.bandwidth) as server:
+            for label, func in imap_cases(size, args.page, args.singles):
+                results.append(measure_imap(server, label, func, trace))
+                print_row(results[-1], baseline)
+    for case in corpus_cases(args.corpus):
+        results.append(case(trace))
+        print_row(results[-1], baseline)
+    with FakeSMTPServer(latency=args.latency, bandwidth=args.bandwidth) as server:
+        for case in smtp_cases(server, args.replies):
+            results.append(case(trace))
+            print_row(results[-1], baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"latency": args.latency, "bandwidth": args.bandwidth, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
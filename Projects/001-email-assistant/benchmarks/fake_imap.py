@@ -0,0 +1,460 @@
+# benchmarks/fake_imap.py
+import bisect
+import email
+import heapq
+import itertools
+import re
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+_COMMAND = re.compile(r'^(?P<tag>\S+) (?P<name>[A-Za-z]+)(?: (?P<args>.*))?$')
+
+
+def make_simple_message(index, body_size=2000):
+    """Build a small plain-text RFC822 message"""
+    msg = EmailMessage()
+    msg["From"] = f"Sender {index} <sender{index}@example.com>"
+    msg["To"] = "me@example.com"
+    msg["Subject"] = f"Benchmark message {index}"
+    msg["Date"] = format_datetime(datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index))
+    msg["Message-ID"] = f"<bench-{index}@example.com>"
+    msg.set_content(("Lorem ipsum dolor sit amet. " * (body_size // 28 + 1))[:body_size])
+    return msg.as_bytes()
+
+
+def make_attachment_message(index, attachment_size=1_000_000):
+    """Build a multipart/mixed message with an HTML alternative and a binary attachment"""
+    msg = EmailMessage()
+    msg["From"] = f"Sender {index} <sender{index}@example.com>"
+    msg["To"] = "me@example.com"
+    msg["Subject"] = f"Report {index}"
+    msg["Date"] = format_datetime(datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index))
+    msg["Message-ID"] = f"<report-{index}@example.com>"
+    msg.set_content(f"Please find report {index} attached. " * 20)
+    msg.add_alternative(f"<html><body><p>Please find <b>report {index}</b> attached.</p></body></html>",
+                        subtype="html")
+    msg.add_attachment(bytes(range(256)) * (attachment_size // 256), maintype="application",
+                       subtype="octet-stream", filename=f"report-{index}.bin")
+    return msg.as_bytes()
+
+
+class FakeMailbox:
+    """In-memory mailbox of (uid, flags, raw bytes) messages"""
+
+    def __init__(self, messages=(), uidvalidity=1):
+        self.uidvalidity = uidvalidity
+        self.messages = []
+        self.next_uid = 1
+        for raw in messages:
+            self.append(raw)
+
+    def append(self, raw, flags=()):
+        self.messages.append({"uid": self.next_uid, "flags": set(flags), "raw": raw})
+        self.next_uid += 1
+
+    def resolve(self, id_set, by_uid):
+        """Return (sequence number, message) pairs selected by an IMAP set"""
+        if not self.messages:
+            return []
+        top = self.messages[-1]["uid"] if by_uid else len(self.messages)
+        positions = set()
+        for part in id_set.split(','):
+            low, _, high = part.partition(':')
+            low = top if low == '*' else int(low)
+            high = low if not high else (top if high == '*' else int(high))
+            low, high = min(low, high), max(low, high)
+            if by_uid:
+                # UIDs ascend, so a range is a slice found by bisection
+                start = bisect.bisect_left(self.messages, low, key=_uid_of)
+                stop = bisect.bisect_right(self.messages, high, key=_uid_of)
+            else:
+                start, stop = max(low, 1) - 1, min(high, len(self.messages))
+            positions.update(range(start, stop))
+        return [(position + 1, self.messages[position]) for position in sorted(positions)]
+
+
+def _uid_of(message):
+    return message["uid"]
+
+
+class FakeIMAPServer:
+    """Threaded plain-TCP IMAP stand-in with simulated network latency.
+
+    Responses are delivered `latency` seconds after the command arrives, so
+    pipelined commands overlap their round trips the way they do on a real
+    link. With `bandwidth` (bytes per second) each response also occupies
+    the downlink for len/bandwidth seconds, one response after another. Use
+    as a context manager; `port` and `stats` are available once started.
+    """
+
+    def __init__(self, mailboxes=None, latency=0.0, host="127.0.0.1", bandwidth=None):
+        self.mailboxes = mailboxes if mailboxes is not None else {"INBOX": FakeMailbox()}
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.host = host
+        self.port = None
+        self.stats = {"connections": 0, "commands": 0, "bytes_in": 0, "bytes_out": 0}
+        self.capabilities = "IMAP4rev1 UIDPLUS IDLE"
+        self.sessions = set()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        owner = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                _Session(owner, self.connection, self.rfile).run()
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((self.host, 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset_stats(self):
+        for key in self.stats:
+            self.stats[key] = 0
+
+    def deliver(self, folder, raw, flags=()):
+        """Append a message and push EXISTS to sessions idling on the folder"""
+        mailbox = self.mailboxes[folder]
+        mailbox.append(raw, flags)
+        for session in list(self.sessions):
+            if session.mailbox is mailbox and session.idle_tag:
+                session.report_exists()
+
+
+class _Session:
+    """One client connection: command reader plus delayed response writer"""
+
+    def __init__(self, server, sock, rfile):
+        self.server = server
+        self.sock = sock
+        self.rfile = rfile
+        self.mailbox = None
+        self.idle_tag = None
+        self.known_exists = 0
+        self._queue = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def run(self):
+        self.server.stats["connections"] += 1
+        self.server.sessions.add(self)
+        writer = threading.Thread(target=self._writer, daemon=True)
+        writer.start()
+        self.send([f"* OK [CAPABILITY {self.server.capabilities}] Fake IMAP ready\r\n".encode()])
+        try:
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    break
+                self.server.stats["bytes_in"] += len(line)
+                text = line.decode('utf-8', errors='replace').rstrip('\r\n')
+                if self.idle_tag and text.upper() == "DONE":
+                    tag, self.idle_tag = self.idle_tag, None
+                    self.send([tag + b" OK IDLE terminated\r\n"])
+                    continue
+                self.server.stats["commands"] += 1
+                if not self.dispatch(text):
+                    break
+        finally:
+            self.server.sessions.discard(self)
+            with self._cond:
+                self._closed = True
+                self._cond.notify()
+            writer.join(timeout=5)
+
+    def send(self, chunks):
+        due = time.monotonic() + self.server.latency
+        with self._cond:
+            heapq.heappush(self._queue, (due, next(self._order), b''.join(chunks)))
+            self._cond.notify()
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                due, _, payload = self._queue[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._queue)
+            if self.server.bandwidth:
+                time.sleep(len(payload) / self.server.bandwidth)
+            try:
+                self.sock.sendall(payload)
+                self.server.stats["bytes_out"] += len(payload)
+            except OSError:
+                return
+
+    def dispatch(self, line):
+        match = _COMMAND.match(line)
+        if not match:
+            self.send([b"* BAD malformed command\r\n"])
+            return True
+
+        tag = match.group("tag").encode()
+        name = match.group("name").upper()
+        args = match.group("args") or ""
+        by_uid = False
+        if name == "UID":
+            sub_name, _, args = args.partition(' ')
+            name, by_uid = sub_name.upper(), True
+
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            self.send([tag + b" BAD unknown command\r\n"])
+            return True
+        return handler(tag, args, by_uid)
+
+    def cmd_capability(self, tag, args, by_uid):
+        self.send([f"* CAPABILITY {self.server.capabilities}\r\n".encode(),
+                   tag + b" OK CAPABILITY completed\r\n"])
+        return True
+
+    def cmd_idle(self, tag, args, by_uid):
+        if "IDLE" not in self.server.capabilities.split():
+            self.send([tag + b" BAD IDLE not supported\r\n"])
+            return True
+        self.idle_tag = tag
+        self.send([b"+ idling\r\n"])
+        return True
+
+    def cmd_login(self, tag, args, by_uid):
+        self.send([tag + b" OK LOGIN completed\r\n"])
+        return True
+
+    def report_exists(self):
+        """Send EXISTS if the selected mailbox grew since it was last reported"""
+        if self.mailbox is not None and len(self.mailbox.messages) != self.known_exists:
+            self.known_exists = len(self.mailbox.messages)
+            self.send([f"* {self.known_exists} EXISTS\r\n".encode()])
+
+    def cmd_noop(self, tag, args, by_uid):
+        self.report_exists()
+        self.send([tag + b" OK NOOP completed\r\n"])
+        return True
+
+    def cmd_logout(self, tag, args, by_uid):
+        self.send([b"* BYE logging out\r\n", tag + b" OK LOGOUT completed\r\n"])
+        return False
+
+    def cmd_select(self, tag, args, by_uid):
+        quoted = re.match(r'\s*"((?:[^"\\]|\\.)*)"', args)
+        name = quoted.group(1) if quoted else (args.split()[0] if args.strip() else "")
+        self.mailbox = self.server.mailboxes.get(name)
+        if self.mailbox is None:
+            self.send([tag + b" NO no such mailbox\r\n"])
+            return True
+        self.known_exists = len(self.mailbox.messages)
+        self.send([
+            f"* {len(self.mailbox.messages)} EXISTS\r\n".encode(),
+            b"* 0 RECENT\r\n",
+            f"* OK [UIDVALIDITY {self.mailbox.uidvalidity}] UIDs valid\r\n".encode(),
+            f"* OK [UIDNEXT {self.mailbox.next_uid}] next UID\r\n".encode(),
+            tag + b" OK [READ-WRITE] SELECT completed\r\n"
+        ])
+        return True
+
+    cmd_examine = cmd_select
+
+    def cmd_search(self, tag, args, by_uid):
+        returns = None
+        match = re.match(r'\s*RETURN \(([^)]*)\)\s*', args, re.IGNORECASE)
+        if match:
+            returns = match.group(1).upper().split()
+            args = args[match.end():]
+        args = re.sub(r'^CHARSET \S+\s*', '', args, flags=re.IGNORECASE)
+
+        selected = list(enumerate(self.mailbox.messages, 1))
+        for key, value in re.findall(r'(\w+)(?: ("(?:[^"\\]|\\.)*"|\d[\d:,*]*))?', args):
+            key, value = key.upper(), value.strip('"').lower()
+            if key == "UID":
+                wanted = {id(m) for _, m in self.mailbox.resolve(value, True)}
+                selected = [(seq, m) for seq, m in selected if id(m) in wanted]
+            elif key == "UNSEEN":
+                selected = [(seq, m) for seq, m in selected if "\\Seen" not in m["flags"]]
+            elif key in ("FROM", "SUBJECT"):
+                selected = [(seq, m) for seq, m in selected
+                            if value in str(parsed_message(m).get(key, "")).lower()]
+        keys = [m["uid"] if by_uid else seq for seq, m in selected]
+
+        if returns is None:
+            line = ("* SEARCH " + " ".join(map(str, keys))).rstrip()
+        else:
+            line = f'* ESEARCH (TAG "{tag.decode()}")' + (" UID" if by_uid else "")
+            if "COUNT" in returns:
+                line += f" COUNT {len(keys)}"
+            if keys and "MIN" in returns:
+                line += f" MIN {min(keys)}"
+            if keys and "MAX" in returns:
+                line += f" MAX {max(keys)}"
+            if keys and "ALL" in returns:
+                line += " ALL " + ",".join(map(str, keys))
+            if "PARTIAL" in returns:
+                low, high = map(int, returns[returns.index("PARTIAL") + 1].split(":"))
+                window = keys[low - 1:high]
+                line += f" PARTIAL ({low}:{high} " + (",".join(map(str, window)) or "NIL") + ")"
+        self.send([line.encode() + b"\r\n", tag + b" OK SEARCH completed\r\n"])
+        return True
+
+    def cmd_fetch(self, tag, args, by_uid):
+        id_set, _, items = args.partition(' ')
+        items = items.strip()
+        if items.startswith('(') and items.endswith(')'):
+            items = items[1:-1]
+        items = items.upper()
+        chunks = []
+        for seq, message in self.mailbox.resolve(id_set, by_uid):
+            if "BODY[" in items and "PEEK" not in items:
+                message["flags"].add("\\Seen")
+            chunks.append(self.fetch_item_response(seq, message, items, by_uid))
+        chunks.append(tag + b" OK FETCH completed\r\n")
+        self.send(chunks)
+        return True
+
+    def cmd_store(self, tag, args, by_uid):
+        id_set, _, rest = args.partition(' ')
+        action, _, flags = rest.partition(' ')
+        action = action.upper()
+        flags = set(flags.strip().strip('()').split())
+        chunks = []
+        for seq, message in self.mailbox.resolve(id_set, by_uid):
+            if action.startswith('+'):
+                message["flags"] |= flags
+            elif action.startswith('-'):
+                message["flags"] -= flags
+            else:
+                message["flags"] = set(flags)
+            if not action.endswith(".SILENT"):
+                chunks.append(self.fetch_item_response(seq, message, "FLAGS", by_uid))
+        chunks.append(tag + b" OK STORE completed\r\n")
+        self.send(chunks)
+        return True
+
+    def fetch_item_response(self, seq, message, items, by_uid):
+        raw = message["raw"]
+        words = re.sub(r'\[[^\]]*\]', '[]', items).split()
+        parts = []
+        if by_uid or "UID" in words:
+            parts.append(b"UID %d" % message["uid"])
+        if "FLAGS" in words:
+            parts.append(b"FLAGS (" + " ".join(sorted(message["flags"])).encode() + b")")
+        if "RFC822.SIZE" in words:
+            parts.append(b"RFC822.SIZE %d" % len(raw))
+        if "RFC822" in words:
+            parts.append(b"RFC822 {%d}\r\n" % len(raw) + raw)
+        if "BODYSTRUCTURE" in words:
+            parts.append(b"BODYSTRUCTURE " + bodystructure(parsed_message(message)))
+        for match in _BODY_SECTION.finditer(items):
+            section, origin, length = match.group(1), match.group(2), match.group(3)
+            data = section_bytes(message, section)
+            name = f"BODY[{section}]"
+            if origin is not None:
+                data = data[int(origin):int(origin) + int(length)]
+                name += f"<{origin}>"
+            parts.append(name.encode() + b" {%d}\r\n" % len(data) + data)
+        return b"* %d FETCH (" % seq + b" ".join(parts) + b")\r\n"
+
+
+_BODY_SECTION = re.compile(r'BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?')
+
+
+def parsed_message(message):
+    """Parse and cache the email.message.Message of a mailbox entry"""
+    if "parsed" not in message:
+        message["parsed"] = email.message_from_bytes(message["raw"])
+    return message["parsed"]
+
+
+def _quote(value):
+    if value is None:
+        return b"NIL"
+    return b'"' + str(value).replace('\\', '\\\\').replace('"', '\\"').encode() + b'"'
+
+
+def _param_list(part):
+    params = [(k, v) for k, v in part.get_params() or [] if v][1:]
+    if not params:
+        return b"NIL"
+    return b"(" + b" ".join(_quote(k) + b" " + _quote(v) for k, v in params) + b")"
+
+
+def bodystructure(part):
+    """Render an approximate RFC 3501 BODYSTRUCTURE for a message part"""
+    if part.is_multipart():
+        children = b"".join(bodystructure(child) for child in part.get_payload())
+        return b"(" + children + b" " + _quote(part.get_content_subtype()) + b" NIL NIL NIL NIL)"
+
+    payload = part.get_payload(decode=False)
+    payload = payload.encode('utf-8', 'surrogateescape') if isinstance(payload, str) else b""
+    encoding = part.get("Content-Transfer-Encoding", "7bit").lower()
+    fields = [_quote(part.get_content_maintype()), _quote(part.get_content_subtype()),
+              _param_list(part), b"NIL", b"NIL", _quote(encoding), b"%d" % len(payload)]
+    if part.get_content_maintype() == "text":
+        fields.append(b"%d" % payload.count(b"\n"))
+    disposition = part.get_content_disposition()
+    filename = part.get_filename()
+    fields.append(b"NIL")
+    if disposition:
+        disposition_params = b"(" + _quote("filename") + b" " + _quote(filename) + b")" if filename else b"NIL"
+        fields.append(b"(" + _quote(disposition) + b" " + disposition_params + b")")
+    else:
+        fields.append(b"NIL")
+    return b"(" + b" ".join(fields) + b")"
+
+
+def section_bytes(message, section):
+    """Return the raw bytes of a BODY[section] for a mailbox entry"""
+    raw = message["raw"]
+    head, sep, text = raw.partition(b"\r\n\r\n")
+    if not sep:
+        head, sep, text = raw.partition(b"\n\n")
+
+    if section == "":
+        return raw
+    if section == "TEXT":
+        return text
+    if section.startswith("HEADER.FIELDS"):
+        wanted = set(re.findall(r'[\w-]+', section[len("HEADER.FIELDS"):].upper()))
+        msg = parsed_message(message)
+        lines = [f"{name}: {value}" for name, value in msg.items() if name.upper() in wanted]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('utf-8', 'surrogateescape')
+    if section == "HEADER":
+        return head + sep
+
+    part = parsed_message(message)
+    for index in section.split('.'):
+        if part.is_multipart():
+            part = part.get_payload()[int(index) - 1]
+        elif index != "1":
+            return b""
+    payload = part.get_payload(decode=False)
+    if isinstance(payload, list):
+        return part.as_bytes()
+    return payload.encode('utf-8', 'surrogateescape')
@@ -0,0 +1,158 @@
+# benchmarks/fake_smtp.py
+"""In-process SMTP stand-in (aiosmtpd-style) with simulated latency and bandwidth.
+
+Speaks enough ESMTP for smtplib and the outbox worker: EHLO with optional
+PIPELINING, AUTH PLAIN/LOGIN, MAIL/RCPT/DATA/RSET/NOOP/QUIT. Accepted
+messages land in `server.messages`; `fail_next` injects reply codes.
+"""
+import socketserver
+import threading
+import time
+
+from benchmarks.fake_imap import _Session
+
+
+class FakeSMTPServer:
+    """Threaded plain-TCP SMTP server; use as a context manager"""
+
+    def __init__(self, latency=0.0, pipelining=True, host="127.0.0.1", bandwidth=None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.pipelining = pipelining
+        self.host = host
+        self.port = None
+        self.messages = []
+        self.fail_next = []
+        self.stats = {"connections": 0, "commands": 0, "bytes_in": 0, "bytes_out": 0, "messages": 0}
+        self.sessions = set()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        owner = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                _SMTPSession(owner, self.connection, self.rfile).run()
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((self.host, 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset_stats(self):
+        for key in self.stats:
+            self.stats[key] = 0
+
+
+class _SMTPSession(_Session):
+    """One SMTP client connection, reusing the delayed writer of the IMAP fake"""
+
+    def __init__(self, server, sock, rfile):
+        super().__init__(server, sock, rfile)
+        self.envelope = None
+
+    def reply(self, text):
+        self.send([text.encode() + b"\r\n"])
+
+    def run(self):
+        self.server.stats["connections"] += 1
+        writer = threading.Thread(target=self._writer, daemon=True)
+        writer.start()
+        self.reply("220 fake.smtp ESMTP ready")
+        try:
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    break
+                self.server.stats["bytes_in"] += len(line)
+                self.server.stats["commands"] += 1
+                if not self.dispatch(line.decode('utf-8', errors='replace').rstrip('\r\n')):
+                    break
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify()
+            writer.join(timeout=5)
+
+    def dispatch(self, line):
+        verb, _, arg = line.partition(' ')
+        verb = verb.upper()
+        if self.server.fail_next and verb in ("MAIL", "DATA"):
+            code = self.server.fail_next.pop(0)
+            self.reply(f"{code} injected failure")
+            return code != 421
+
+        if verb in ("EHLO", "HELO"):
+            lines = ["fake.smtp", "AUTH PLAIN LOGIN", "SIZE 52428800", "8BITMIME"]
+            if self.server.pipelining:
+                lines.append("PIPELINING")
+            self.send([f"250{'-' if i < len(lines) - 1 else ' '}{text}\r\n".encode() for i, text in enumerate(lines)])
+        elif verb == "AUTH":
+            mechanism = arg.split()[0].upper() if arg else ""
+            if mechanism == "LOGIN" and len(arg.split()) == 1:
+                self.reply("334 VXNlcm5hbWU6")
+                self.rfile.readline()
+                self.reply("334 UGFzc3dvcmQ6")
+                self.rfile.readline()
+            self.reply("235 Authentication successful")
+        elif verb == "MAIL":
+            self.envelope = {"from": arg[5:].strip(), "to": []}
+            self.reply("250 OK")
+        elif verb == "RCPT":
+            if self.envelope is None:
+                self.reply("503 need MAIL first")
+            elif "reject" in arg.lower():
+                self.reply("550 mailbox unavailable")
+            else:
+                self.envelope["to"].append(arg[3:].strip())
+                self.reply("250 OK")
+        elif verb == "DATA":
+            if not self.envelope or not self.envelope["to"]:
+                self.reply("554 no valid recipients")
+                return True
+            self.reply("354 End data with <CR><LF>.<CR><LF>")
+            self.receive_data()
+        elif verb in ("RSET", "NOOP"):
+            self.envelope = None if verb == "RSET" else self.envelope
+            self.reply("250 OK")
+        elif verb == "QUIT":
+            self.reply("221 Bye")
+            return False
+        else:
+            self.reply("502 command not implemented")
+        return True
+
+    def receive_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            self.server.stats["bytes_in"] += len(line)
+            if line in (b".\r\n", b".\n"):
+                break
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        data = b"".join(lines)
+        if self.server.bandwidth:
+            # the upload of the message body occupies the link before the reply
+            time.sleep(len(data) / self.server.bandwidth)
+        self.server.messages.append({**self.envelope, "data": data})
+        self.server.stats["messages"] += 1
+        self.envelope = None
+        self.reply("250 OK queued")
@@ -0,0 +1,131 @@
+# benchmarks/synthetic.py
+"""Deterministic synthetic mailboxes with a realistic MIME mix.
+
+Every message is derived from (seed, index) alone, so a mailbox of 200k
+messages keeps only the UID and seed of each entry and regenerates the raw
+bytes (through a small LRU cache) whenever the fake server reads them. The mix covers plain text,
+HTML-only newsletters, multipart/alternative, attachments and legacy
+non-UTF-8 charsets with RFC 2047 encoded headers; a share of messages are
+replies carrying In-Reply-To / References.
+"""
+import functools
+import random
+from email.header import Header
+from email.message import EmailMessage
+from email.mime.text import MIMEText
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fake_imap import FakeMailbox, parsed_message
+
+# (kind, weight) of the generated messages
+MESSAGE_MIX = (
+    ("plain", 35),
+    ("html", 15),
+    ("alternative", 30),
+    ("attachment", 8),
+    ("legacy", 12),
+)
+LEGACY_TEXTS = (
+    ("iso-8859-1", "Café, crème brûlée et façade à Noël"),
+    ("windows-1252", "Prices – “special” offer for € 9,99"),
+    ("koi8-r", "Привет, отчёт за неделю готов"),
+    ("shift_jis", "会議の議事録を送ります"),
+    ("iso-2022-jp", "来週の予定について"),
+)
+REPLY_RATIO = 0.2
+ATTACHMENT_SIZES = (8 * 1024, 48 * 1024, 200 * 1024)
+
+_WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt "
+          "ut labore et dolore magna aliqua quarterly report meeting invoice schedule update "
+          "project review budget deadline customer release").split()
+_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _paragraphs(rng, count):
+    return ["".join((" ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 40))).capitalize(), "."))
+            for _ in range(count)]
+
+
+def _html(paragraphs, index):
+    rows = "".join(f'<tr><td style="padding:4px;font-size:14px">{text}</td></tr>' for text in paragraphs)
+    return (f'<html><head><style>td {{ color: #333; }}</style></head><body>'
+            f'<table width="100%">{rows}</table>'
+            f'<p><a href="https://example.com/u/{index}?utm=mail&amp;id={index}">Unsubscribe</a> &ndash; '
+            f'&copy; Example&nbsp;Corp</p></body></html>')
+
+
+@functools.lru_cache(maxsize=512)
+def make_mixed_message(index, seed=0):
+    """Build message `index` of a synthetic mailbox as RFC822 bytes"""
+    rng = random.Random(seed * 1_000_003 + index)
+    kind = rng.choices([kind for kind, _ in MESSAGE_MIX], [weight for _, weight in MESSAGE_MIX])[0]
+    paragraphs = _paragraphs(rng, rng.randint(1, 12))
+
+    subject = f"{kind.capitalize()} message {index}"
+    headers = {
+        "From": f"Sender {index % 997} <sender{index % 997}@example.com>",
+        "To": "me@example.com",
+        "Date": format_datetime(_START + timedelta(minutes=index)),
+        "Message-ID": f"<synthetic-{seed}-{index}@example.com>",
+    }
+    if index > 1 and rng.random() < REPLY_RATIO:
+        parent = f"<synthetic-{seed}-{rng.randint(max(1, index - 50), index - 1)}@example.com>"
+        headers["In-Reply-To"] = headers["References"] = parent
+        subject = "Re: " + subject
+
+    if kind == "legacy":
+        # compat32 MIMEText keeps both the body and the encoded-word subject in the legacy charset
+        charset, text = LEGACY_TEXTS[index % len(LEGACY_TEXTS)]
+        msg = MIMEText("\n\n".join([text] + paragraphs + [text]), "plain", charset)
+        for name, value in headers.items():
+            msg[name] = value
+        msg["Subject"] = Header(f"{subject} {text[:12]}", charset)
+        return msg.as_bytes()
+
+    msg = EmailMessage()
+    for name, value in headers.items():
+        msg[name] = value
+    msg["Subject"] = subject
+    if kind == "html":
+        msg.set_content(_html(paragraphs, index), subtype="html")
+    else:
+        msg.set_content("\n\n".join(paragraphs))
+        if kind in ("alternative", "attachment"):
+            msg.add_alternative(_html(paragraphs, index), subtype="html")
+        if kind == "attachment":
+            size = rng.choice(ATTACHMENT_SIZES)
+            msg.add_attachment(rng.randbytes(size), maintype="application", subtype="pdf",
+                               filename=f"document-{index}.pdf")
+    for number, part in enumerate(part for part in msg.walk() if part.is_multipart()):
+        part.set_boundary(f"==synthetic-{seed}-{index}-{number}==")
+    return msg.as_bytes()
+
+
+class _SyntheticEntry(dict):
+    """Mailbox entry whose raw bytes are rebuilt on every access instead of stored"""
+
+    __slots__ = ()
+
+    def __missing__(self, key):
+        if key == "raw":
+            return make_mixed_message(self["uid"], self["seed"])
+        if key == "flags":
+            flags = self["flags"] = set()
+            return flags
+        raise KeyError(key)
+
+
+class SyntheticMailbox(FakeMailbox):
+    """FakeMailbox of `count` generated messages that costs ~200 bytes per message"""
+
+    def __init__(self, count, seed=0, uidvalidity=1):
+        super().__init__(uidvalidity=uidvalidity)
+        self.seed = seed
+        self.messages = [_SyntheticEntry(uid=uid, seed=seed) for uid in range(1, count + 1)]
+        self.next_uid = count + 1
+
+    def warm(self, count):
+        """Build and parse the newest `count` messages ahead of a timed run"""
+        for message in self.messages[-count:]:
+            parsed_message(message)
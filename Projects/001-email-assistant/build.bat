@@ -3,10 +3,34 @@ echo Building Email Client...
 
 pyinstaller --onefile ^
 --add-data "features/email_reader/email_reader.py;features/email_reader" ^
+--add-data "features/email_reader/imap_response.py;features/email_reader" ^
 --add-data "features/email_replier/email_replier.py;features/email_replier" ^
 --add-data "features/auth/auth.py;features/auth" ^
 --add-data "utils/config.py;utils" ^
 --add-data "utils/helpers.py;utils" ^
+--add-data "features/email_reader/bodystructure.py;features/email_reader" ^
+--add-data "utils/mail_cache.py;utils" ^
+--add-data "features/email_sync/email_sync.py;features/email_sync" ^
+--add-data "features/email_watcher/email_watcher.py;features/email_watcher" ^
+--add-data "features/mail_session/mail_session.py;features/mail_session" ^
+--add-data "features/multi_fetch/multi_fetch.py;features/multi_fetch" ^
+--add-data "features/email_search/email_search.py;features/email_search" ^
+--add-data "utils/search_index.py;utils" ^
+--add-data "features/email_reader/mime_stream.py;features/email_reader" ^
+--add-data "utils/email_record.py;utils" ^
+--add-data "utils/render_cache.py;utils" ^
+--add-data "utils/html_text.py;utils" ^
+--add-data "features/outbox/outbox.py;features/outbox" ^
+--add-data "features/headless/headless.py;features/headless" ^
+--add-data "features/email_threads/email_threads.py;features/email_threads" ^
+--add-data "features/attachments/attachments.py;features/attachments" ^
+--add-data "utils/profiler.py;utils" ^
+--add-data "features/inbox_view/inbox_view.py;features/inbox_view" ^
+--add-data "features/body_prefetch/body_prefetch.py;features/body_prefetch" ^
+--add-data "utils/parse_pool.py;utils" ^
+--add-data "features/archive/archive.py;features/archive" ^
+--add-data "features/list_index/list_index.py;features/list_index" ^
+--add-data "utils/body_store.py;utils" ^
 --hidden-import=questionary ^
 --hidden-import=prompt_toolkit ^
 --hidden-import=rich ^
@@ -0,0 +1,4 @@
+# features/archive/init.py
+from .archive import export_folder, import_archive, iter_archive
+
+__all__ = ['export_folder', 'import_archive', 'iter_archive']
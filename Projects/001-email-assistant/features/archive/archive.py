@@ -0,0 +1,355 @@
+# features/archive/archive.py
+import gzip
+import io
+import mmap
+import os
+import re
+import socket
+import time
+from email.utils import parsedate_to_datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from features.email_reader.email_reader import select_folder, build_email_records
+from features.email_reader.imap_response import compress_id_set, parse_fetch_response, find_fetch_item, internaldate_timestamp
+from utils.mail_cache import get_folder_state, set_folder_state, is_local_folder, max_cached_uid, store_records
+from utils.parse_pool import map_chunks
+
+ARCHIVE_FORMATS = ("mbox", "maildir")
+COMPRESSIONS = ("gzip", "zstd")
+EXPORT_BATCH_BYTES = 8 * 1024 * 1024
+EXPORT_LIST_WINDOW = 1000
+IMPORT_BATCH_SIZE = 500
+LOCAL_UIDVALIDITY = 1
+PARTIAL_SUFFIX = ".part"
+MAILDIR_FLAGS = {"\\Draft": "D", "\\Flagged": "F", "\\Answered": "R", "\\Seen": "S", "\\Deleted": "T"}
+# ':' is not allowed in Windows file names; mail tools there use '!' instead
+MAILDIR_INFO_SEPARATOR = "!" if os.name == "nt" else ":"
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_FROM_LINE = re.compile(rb"^(>*From )", re.MULTILINE)
+_QUOTED_FROM_LINE = re.compile(rb"^>(>*From )", re.MULTILINE)
+_DATE_HEADER = re.compile(rb"^Date:[ \t]*(.+?)\r?$", re.MULTILINE | re.IGNORECASE)
+_STATUS_HEADER = re.compile(rb"^(X-)?Status:[ \t]*(\w*)", re.MULTILINE | re.IGNORECASE)
+_MBOX_STATUS_FLAGS = {b"R": "\\Seen"}
+_MBOX_X_STATUS_FLAGS = {b"A": "\\Answered", b"F": "\\Flagged", b"D": "\\Deleted", b"T": "\\Draft"}
+_MAILDIR_INFO = re.compile(r"[:!]2,([A-Za-z]*)$")
+
+
+def export_folder(imap_conn, folder, path, archive_format="mbox", compression=None,
+                  batch_bytes=EXPORT_BATCH_BYTES, progress=None):
+    """Write every message of a folder to an mbox file or a Maildir directory.
+
+    Messages are listed in windows of EXPORT_LIST_WINDOW sequence numbers
+    (UID and size only) and downloaded with UID FETCH BODY.PEEK[] in
+    batches of about `batch_bytes`, each written out before the next is
+    requested, so memory stays at one batch (or one message, if larger)
+    whatever the folder size; nothing is marked read. mbox is written as
+    mboxrd to `path`.part and renamed when complete; Maildir keeps the IMAP
+    flags in the file names. compression is None, "gzip" or "zstd" (needs
+    the zstandard package). `progress(done, total)` counts messages.
+    Returns (count, error).
+    """
+    try:
+        writer = _open_writer(path, archive_format, compression)
+    except (ValueError, OSError) as e:
+        return None, str(e)
+
+    try:
+        count, error = _export_messages(imap_conn, folder, writer, batch_bytes, progress)
+    except Exception as e:
+        count, error = None, f"Export error: {str(e)}"
+    if error:
+        writer.abort()
+        return None, error
+    writer.close()
+    return count, None
+
+
+def import_archive(path, cache, folder, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """Parse an mbox file or Maildir directory into the local cache as `folder`.
+
+    Messages are read one at a time (uncompressed mbox files through mmap),
+    parsed in batches of `batch_size` by the bulk parser and stored with
+    consecutive UIDs after the folder's highest cached one, so the folder
+    can be listed and searched offline. `progress(count)` follows the
+    stored messages. The folder is marked local, so opening its messages
+    never goes to a server. Returns (count, error).
+    """
+    try:
+        uidvalidity, _ = get_folder_state(cache, folder)
+        if uidvalidity is None:
+            uidvalidity = LOCAL_UIDVALIDITY
+            set_folder_state(cache, folder, uidvalidity, local=True)
+        elif not is_local_folder(cache, folder):
+            return None, f"{folder} is a synced server folder; import into another name"
+        next_uid = max_cached_uid(cache, folder, uidvalidity) + 1
+
+        count = 0
+        batch = []
+        for raw, flags in iter_archive(path):
+            batch.append((next_uid, raw, flags))
+            next_uid += 1
+            if len(batch) >= batch_size:
+                count += _import_batch(cache, folder, uidvalidity, batch)
+                batch = []
+                if progress:
+                    progress(count)
+        if batch:
+            count += _import_batch(cache, folder, uidvalidity, batch)
+            if progress:
+                progress(count)
+        return count, None
+
+    except Exception as e:
+        return None, f"Import error: {str(e)}"
+
+
+def iter_archive(path):
+    """Yield (raw bytes, flags) for each message of an mbox file or Maildir directory"""
+    if os.path.isdir(path):
+        return _iter_maildir(path)
+    return _iter_mbox(path)
+
+
+def message_timestamp(internaldate, raw):
+    """Arrival time of a message: its INTERNALDATE, else its Date header, else now"""
+    timestamp = internaldate_timestamp(internaldate) if internaldate else None
+    if timestamp is not None:
+        return timestamp
+    match = _DATE_HEADER.search(raw, 0, _header_end(raw))
+    if match:
+        try:
+            return parsedate_to_datetime(match.group(1).decode("latin-1")).timestamp()
+        except (TypeError, ValueError):
+            pass
+    return time.time()
+
+
+def _export_messages(imap_conn, folder, writer, batch_bytes, progress):
+    status, data = select_folder(imap_conn, folder)
+    if status != "OK":
+        return None, f"Cannot select folder: {folder}"
+    total = int(data[0] or 0) if data else 0
+
+    count = 0
+    for uids in _export_batches(imap_conn, total, batch_bytes):
+        status, data = imap_conn.uid("FETCH", compress_id_set(uids), "(UID FLAGS INTERNALDATE BODY.PEEK[])")
+        if status != "OK":
+            return None, "Fetch failed"
+        for _, fields in parse_fetch_response(data):
+            raw = find_fetch_item(fields, "BODY[]")
+            if raw is None or fields.get("UID") is None:
+                continue
+            writer.write(raw, list(fields.get("FLAGS") or []),
+                         message_timestamp(fields.get("INTERNALDATE"), raw), int(fields["UID"]))
+            count += 1
+        # drop this batch before the next one is downloaded
+        data = None
+        if progress:
+            progress(count, total)
+    return count, None
+
+
+def _export_batches(imap_conn, total, batch_bytes):
+    """UID lists of about batch_bytes each, listed one window of sequence numbers at a time"""
+    for low in range(1, total + 1, EXPORT_LIST_WINDOW):
+        high = min(total, low + EXPORT_LIST_WINDOW - 1)
+        status, data = imap_conn.fetch(f"{low}:{high}", "(UID RFC822.SIZE)")
+        if status != "OK":
+            raise imap_conn.error("Listing messages failed")
+        batch, size = [], 0
+        for _, fields in parse_fetch_response(data):
+            if fields.get("UID") is None:
+                continue
+            message_size = int(fields.get("RFC822.SIZE") or 0)
+            if batch and size + message_size > batch_bytes:
+                yield batch
+                batch, size = [], 0
+            batch.append(int(fields["UID"]))
+            size += message_size
+        if batch:
+            yield batch
+
+
+def _import_batch(cache, folder, uidvalidity, batch):
+    records = map_chunks(build_email_records, [(uid, raw) for uid, raw, _ in batch])
+    stored = []
+    for record, (_, raw, flags) in zip(records, batch):
+        if record is None:
+            continue
+        record["flags"] = flags
+        record["size"] = len(raw)
+        stored.append(record)
+    store_records(cache, folder, uidvalidity, stored)
+    return len(stored)
+
+
+def _open_writer(path, archive_format, compression):
+    if compression not in (None,) + COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression needs the zstandard package (pip install zstandard)")
+    if archive_format == "mbox":
+        return _MboxWriter(path, compression)
+    if archive_format == "maildir":
+        return _MaildirWriter(path, compression)
+    raise ValueError(f"Unknown archive format: {archive_format}")
+
+
+def _open_output(path, compression):
+    if compression == "gzip":
+        return gzip.open(path, "wb")
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+    return open(path, "wb")
+
+
+def _open_input(path):
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.open(path, "rb")
+    if magic == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise ValueError(f"{path} is zstd-compressed; install the zstandard package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    return None
+
+
+class _MboxWriter:
+    """mboxrd output: From_ separator lines, LF line ends, quoted body From lines"""
+
+    def __init__(self, path, compression):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.file = _open_output(path + PARTIAL_SUFFIX, compression)
+
+    def write(self, raw, flags, timestamp, uid):
+        message = _FROM_LINE.sub(rb">\1", raw.replace(b"\r\n", b"\n"))
+        self.file.write(f"From MAILER-DAEMON {time.asctime(time.gmtime(timestamp))}\n".encode("ascii"))
+        self.file.write(message)
+        self.file.write(b"\n" if message.endswith(b"\n") else b"\n\n")
+
+    def close(self):
+        self.file.close()
+        os.replace(self.path + PARTIAL_SUFFIX, self.path)
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.path + PARTIAL_SUFFIX)
+        except OSError:
+            pass
+
+
+class _MaildirWriter:
+    """One file per message, written to tmp/ and renamed into cur/ with its flags"""
+
+    def __init__(self, path, compression):
+        for subdirectory in ("tmp", "new", "cur"):
+            os.makedirs(os.path.join(path, subdirectory), exist_ok=True)
+        self.path = path
+        self.compression = compression
+        self.host = socket.gethostname().replace("/", r"\057").replace(":", r"\072")
+        self.count = 0
+
+    def write(self, raw, flags, timestamp, uid):
+        self.count += 1
+        name = f"{int(timestamp)}.M{self.count}U{uid}P{os.getpid()}.{self.host}"
+        info = "".join(sorted(MAILDIR_FLAGS[flag] for flag in flags if flag in MAILDIR_FLAGS))
+        temp_path = os.path.join(self.path, "tmp", name)
+        with _open_output(temp_path, self.compression) as f:
+            f.write(raw)
+        os.utime(temp_path, (timestamp, timestamp))
+        os.replace(temp_path, os.path.join(self.path, "cur", f"{name}{MAILDIR_INFO_SEPARATOR}2,{info}"))
+
+    def close(self):
+        pass
+
+    def abort(self):
+        # messages already in cur/ are complete; keep them
+        pass
+
+
+def _iter_mbox(path):
+    reader = _open_input(path)
+    if reader is not None:
+        with reader:
+            yield from _split_mbox_lines(reader)
+        return
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield from _split_mbox_mapped(data)
+
+
+def _split_mbox_mapped(data):
+    size = len(data)
+    if data[:5] == b"From ":
+        start = 0
+    else:
+        start = data.find(b"\nFrom ")
+        if start < 0:
+            return
+        start += 1
+    while start < size:
+        body = data.find(b"\n", start) + 1 or size
+        end = data.find(b"\nFrom ", body)
+        end = size if end < 0 else end + 1
+        yield _mbox_message(data[body:end])
+        start = end
+
+
+def _split_mbox_lines(lines):
+    message = None
+    for line in lines:
+        if line.startswith(b"From "):
+            if message is not None:
+                yield _mbox_message(b"".join(message))
+            message = []
+        elif message is not None:
+            message.append(line)
+    if message is not None:
+        yield _mbox_message(b"".join(message))
+
+
+def _mbox_message(data):
+    """(raw, flags) of one mbox entry: separator blank line dropped, From lines unquoted"""
+    if data.endswith(b"\n\n"):
+        data = data[:-1]
+    elif data.endswith(b"\r\n\r\n"):
+        data = data[:-2]
+    raw = _QUOTED_FROM_LINE.sub(rb"\1", data)
+    flags = set()
+    for x_status, letters in _STATUS_HEADER.findall(raw, 0, _header_end(raw)):
+        mapping = _MBOX_X_STATUS_FLAGS if x_status else _MBOX_STATUS_FLAGS
+        flags.update(mapping[bytes([letter])] for letter in letters.upper() if bytes([letter]) in mapping)
+    return raw, sorted(flags)
+
+
+def _header_end(raw):
+    ends = [end for end in (raw.find(b"\r\n\r\n"), raw.find(b"\n\n")) if end >= 0]
+    return min(ends) if ends else len(raw)
+
+
+def _iter_maildir(path):
+    entries = []
+    for subdirectory in ("new", "cur"):
+        directory = os.path.join(path, subdirectory)
+        if os.path.isdir(directory):
+            entries.extend((name, directory) for name in os.listdir(directory) if not name.startswith("."))
+    for name, directory in sorted(entries):
+        info = _MAILDIR_INFO.search(name)
+        letters = info.group(1) if info else ""
+        flags = [flag for flag, letter in MAILDIR_FLAGS.items() if letter in letters]
+        file_path = os.path.join(directory, name)
+        reader = _open_input(file_path) or open(file_path, "rb")
+        with reader:
+            yield reader.read(), flags
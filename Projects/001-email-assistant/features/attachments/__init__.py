@@ -0,0 +1,4 @@
+# features/attachments/init.py
+from .attachments import list_attachments, fetch_structure, attachment_filename, download_path, download_attachment
+
+__all__ = ['list_attachments', 'fetch_structure', 'attachment_filename', 'download_path', 'download_attachment']
@@ -0,0 +1,157 @@
+# features/attachments/attachments.py
+import json
+import os
+import re
+
+from features.email_reader.bodystructure import parse_bodystructure, iter_leaf_parts, is_attachment
+from features.email_reader.email_reader import ensure_folder_selected, decode_header_value
+from features.email_reader.imap_response import parse_fetch_response, find_fetch_item
+from features.email_reader.mime_stream import transfer_decoder
+
+DOWNLOAD_DIR = "downloads"
+ATTACHMENT_CHUNK_BYTES = 1024 * 1024
+PARTIAL_SUFFIX = ".part"
+STATE_SUFFIX = ".part.json"
+
+_UNSAFE_FILENAME = re.compile(r'[\x00-\x1f<>:"/\\|?*]+')
+
+
+def list_attachments(structure):
+    """Attachment parts of a parsed BODYSTRUCTURE, in document order"""
+    return [part for part in iter_leaf_parts(structure) if is_attachment(part)]
+
+
+def fetch_structure(imap_conn, uid):
+    """UID FETCH the BODYSTRUCTURE of one message; returns (structure, error)"""
+    status, data = imap_conn.uid("FETCH", str(uid), "(UID BODYSTRUCTURE)")
+    if status != "OK":
+        return None, "Fetch failed"
+    for _, fields in parse_fetch_response(data):
+        if fields.get("BODYSTRUCTURE") is not None:
+            return parse_bodystructure(fields["BODYSTRUCTURE"]), None
+    return None, "Message not found"
+
+
+def attachment_filename(part):
+    """Decoded, filesystem-safe file name for an attachment part"""
+    name = part.get("filename")
+    try:
+        name = decode_header_value(name) if name else ""
+    except Exception:
+        pass
+    name = _UNSAFE_FILENAME.sub("_", os.path.basename(name.replace("\\", "/"))).strip(" .")
+    return name or f"attachment-{part['section']}.bin"
+
+
+def download_path(directory, part, uid):
+    """Target path for a part: the unfinished download of it if one exists, else a free name"""
+    path = os.path.join(directory, attachment_filename(part))
+    if _load_state(path, uid, part) is not None:
+        return path
+    stem, extension = os.path.splitext(path)
+    counter = 1
+    while os.path.exists(path) or os.path.exists(path + PARTIAL_SUFFIX):
+        path = f"{stem} ({counter}){extension}"
+        counter += 1
+    return path
+
+
+def download_attachment(imap_conn, uid, part, path, folder=None,
+                        chunk_size=ATTACHMENT_CHUNK_BYTES, progress=None):
+    """Stream one MIME part to `path` with BODY.PEEK[section]<offset.length> ranges.
+
+    Encoded bytes are decoded (base64 / quoted-printable) chunk by chunk and
+    appended to `path`.part, so memory stays at about one chunk whatever the
+    attachment size. After every chunk the encoded offset, the decoded
+    length and the decoder's carry-over are saved next to it; calling again
+    with the same uid, part and path resumes from there. The finished file
+    is renamed into place. `progress(done, total)` gets encoded byte counts.
+    Returns (path, error).
+    """
+    try:
+        if folder:
+            status, _ = ensure_folder_selected(imap_conn, folder)
+            if status != "OK":
+                return None, f"Cannot select folder: {folder}"
+
+        partial_path = path + PARTIAL_SUFFIX
+        decoder = transfer_decoder(part.get("encoding"))
+        state = _load_state(path, uid, part)
+        if state is None:
+            state = {"uid": int(uid), "section": part["section"], "size": part.get("size", 0),
+                     "offset": 0, "written": 0, "pending": ""}
+        elif state["pending"]:
+            decoder.pending = state["pending"].encode("latin-1")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _save_state(path, state)
+        with open(partial_path, "ab") as output:
+            output.truncate(state["written"])
+            output.seek(state["written"])
+            while True:
+                chunk, error = _fetch_range(imap_conn, uid, part["section"], state["offset"], chunk_size)
+                if error:
+                    return None, error
+                output.write(decoder.decode(chunk))
+                state["offset"] += len(chunk)
+                if progress:
+                    progress(state["offset"], state["size"])
+                if len(chunk) < chunk_size:
+                    break
+                output.flush()
+                state["written"] = output.tell()
+                state["pending"] = decoder.pending.decode("latin-1")
+                _save_state(path, state)
+            output.write(decoder.flush())
+
+        os.replace(partial_path, path)
+        _remove_state(path)
+        return path, None
+
+    except Exception as e:
+        return None, f"Download error: {str(e)}"
+
+
+def _fetch_range(imap_conn, uid, section, offset, length):
+    status, data = imap_conn.uid("FETCH", str(uid), f"(UID BODY.PEEK[{section}]<{offset}.{length}>)")
+    if status != "OK":
+        return None, "Fetch failed"
+    for _, fields in parse_fetch_response(data):
+        chunk = find_fetch_item(fields, f"BODY[{section}]")
+        if chunk is not None:
+            return chunk, None
+    if offset:
+        return b"", None
+    return None, "Attachment not found"
+
+
+def _load_state(path, uid, part):
+    """Saved progress of an interrupted download of the same part, or None"""
+    if not os.path.exists(path + PARTIAL_SUFFIX):
+        return None
+    try:
+        with open(path + STATE_SUFFIX, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (state.get("uid"), state.get("section"), state.get("size")) != (int(uid), part["section"], part.get("size", 0)):
+        return None
+    if os.path.getsize(path + PARTIAL_SUFFIX) < state.get("written", 0):
+        return None
+    return state
+
+
+def _save_state(path, state):
+    temp_path = path + STATE_SUFFIX + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path + STATE_SUFFIX)
+
+
+def _remove_state(path):
+    try:
+        os.remove(path + STATE_SUFFIX)
+    except OSError:
+        pass
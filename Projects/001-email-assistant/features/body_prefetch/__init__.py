@@ -0,0 +1,4 @@
+# features/body_prefetch/init.py
+from .body_prefetch import BodyPrefetcher, body_key
+
+__all__ = ['BodyPrefetcher', 'body_key']
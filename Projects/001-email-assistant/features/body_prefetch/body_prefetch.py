@@ -0,0 +1,166 @@
+# features/body_prefetch/body_prefetch.py
+import sys
+import threading
+from collections import OrderedDict
+
+from features.email_reader.email_reader import load_email_body
+
+DEFAULT_PREFETCH_BUDGET_MB = 16
+DEFAULT_APPLY_WAIT = 30
+
+
+def body_key(email):
+    """Identity of a message body that survives reloading the list"""
+    return (email.get("folder") or "INBOX", email.get("uidvalidity"), email.get("uid"))
+
+
+class BodyPrefetcher(threading.Thread):
+    """Background download of the bodies of the emails on screen.
+
+    Runs on its own connection from `connect()`, opened on first use, so it
+    never waits behind the shared session. show(emails) replaces the queue
+    with the listed messages that have no body yet, in list order (lists
+    are newest first); the message being downloaded finishes, the rest of
+    the previous list is dropped. Bodies are fetched with BODY.PEEK so
+    prefetching leaves messages unread, and kept in an LRU bounded by
+    `budget` bytes. apply(email) hands a body to the opened record, waiting
+    for it when it is the one in flight instead of fetching it twice.
+    The budget counts the decoded text (sys.getsizeof of the body string).
+    Copies of one message in several folders (same Message-ID and size)
+    are downloaded once and share the body.
+    """
+
+    def __init__(self, connect, budget=DEFAULT_PREFETCH_BUDGET_MB * 1024 * 1024):
+        super().__init__(name="body-prefetch", daemon=True)
+        self.connect = connect
+        self.budget = budget
+        self.conn = None
+        self.used = 0
+        self.stats = {"fetched": 0, "hits": 0, "waits": 0, "misses": 0,
+                      "evicted": 0, "cancelled": 0, "errors": 0}
+        self._bodies = OrderedDict()
+        self._queue = []
+        self._aliases = {}
+        self._current = None
+        self._stopped = False
+        self._changed = threading.Condition()
+
+    def show(self, emails):
+        """Prefetch these emails' bodies next, cancelling what is left of the previous list"""
+        queue = []
+        seen = set()
+        copies = {}
+        aliases = {}
+        for email in emails:
+            if email.get("uid") is None or email.get("body") is not None or email.get("local"):
+                continue
+            key = body_key(email)
+            if email.get("message_id"):
+                first = copies.setdefault((email["message_id"], email.get("size")), key)
+                if first != key:
+                    aliases[key] = first
+                    continue
+            if key not in seen:
+                seen.add(key)
+                queue.append((key, {"uid": email["uid"], "folder": key[0]}))
+        with self._changed:
+            self._aliases = aliases
+            self.stats["cancelled"] += sum(1 for key, _ in self._queue if key not in seen)
+            self._queue = [(key, target) for key, target in queue
+                           if key not in self._bodies and key != self._current]
+            self._changed.notify_all()
+
+    def apply(self, email, timeout=DEFAULT_APPLY_WAIT):
+        """Give the email its prefetched body; returns False when it has to be fetched"""
+        with self._changed:
+            key = self._aliases.get(body_key(email), body_key(email))
+            if key == self._current and key not in self._bodies:
+                self.stats["waits"] += 1
+                self._changed.wait_for(lambda: self._current != key, timeout)
+            entry = self._bodies.get(key)
+            if entry is None:
+                # the caller fetches it now; don't download it a second time
+                self._queue = [item for item in self._queue if item[0] != key]
+                self.stats["misses"] += 1
+                return False
+            self._bodies.move_to_end(key)
+            self.stats["hits"] += 1
+        email["body"], message_id, _ = entry
+        if message_id and not email.get("message_id"):
+            email["message_id"] = message_id
+        return True
+
+    def stop(self, timeout=5):
+        """Drop the queue, let the current download finish and log out"""
+        with self._changed:
+            self._stopped = True
+            self._queue = []
+            self._changed.notify_all()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def run(self):
+        try:
+            while True:
+                with self._changed:
+                    self._changed.wait_for(lambda: self._stopped or self._queue)
+                    if self._stopped:
+                        break
+                    key, target = self._queue.pop(0)
+                    self._current = key
+                record = None
+                try:
+                    record = self._download(target)
+                finally:
+                    with self._changed:
+                        self._current = None
+                        if record is not None:
+                            self._store(key, record)
+                        self._changed.notify_all()
+        finally:
+            self._close()
+
+    def _download(self, target):
+        record = dict(target)
+        try:
+            if self.conn is None:
+                self.conn = self.connect()
+        except Exception:
+            # offline or rejected: wait for the next list rather than retrying every message
+            self.stats["errors"] += 1
+            with self._changed:
+                self._queue = []
+            return None
+        try:
+            _, error = load_email_body(self.conn, record, peek=True)
+        except Exception as e:
+            error = str(e)
+        if error:
+            self.stats["errors"] += 1
+            self._close()
+            return None
+        self.stats["fetched"] += 1
+        return record
+
+    def _store(self, key, record):
+        body = record.get("body")
+        if body is None:
+            return
+        size = sys.getsizeof(body)
+        if size > self.budget:
+            return
+        self._bodies[key] = (body, record.get("message_id"), size)
+        self.used += size
+        while self.used > self.budget:
+            _, (_, _, evicted) = self._bodies.popitem(last=False)
+            self.used -= evicted
+            self.stats["evicted"] += 1
+
+    def _close(self):
+        conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        try:
+            conn.logout()
+        except Exception:
+            pass
@@ -1,4 +1,4 @@
 # features/email_reader/init.py
-from .email_reader import fetch_emails, fetch_single_email
+from .email_reader import fetch_emails, fetch_emails_by_uid, fetch_email_headers_by_uid, fetch_single_email, load_email_body, mark_seen
 
-__all__ = ['fetch_emails', 'fetch_single_email']
\ No newline at end of file
+__all__ = ['fetch_emails', 'fetch_emails_by_uid', 'fetch_email_headers_by_uid', 'fetch_single_email', 'load_email_body', 'mark_seen']
\ No newline at end of file
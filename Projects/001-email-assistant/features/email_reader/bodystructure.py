@@ -0,0 +1,129 @@
+# features/email_reader/bodystructure.py
+import base64
+import binascii
+import quopri
+
+
+def _params(value):
+    """Turn an IMAP ("key" "value" ...) list into a lowercase-keyed dict"""
+    if not isinstance(value, list):
+        return {}
+    return {str(k).lower(): v for k, v in zip(value[0::2], value[1::2]) if k is not None}
+
+
+def _disposition(value):
+    """Return (disposition type, params) from an IMAP disposition field"""
+    if not isinstance(value, list) or not value:
+        return None, {}
+    kind = value[0].lower() if isinstance(value[0], str) else None
+    return kind, _params(value[1] if len(value) > 1 else None)
+
+
+def parse_bodystructure(value, section=""):
+    """Parse a BODYSTRUCTURE list into a tree of part dicts"""
+    if not isinstance(value, list) or not value:
+        return None
+
+    if isinstance(value[0], list):
+        children = []
+        index = 0
+        while index < len(value) and isinstance(value[index], list):
+            child_section = f"{section}.{index + 1}" if section else str(index + 1)
+            children.append(parse_bodystructure(value[index], child_section))
+            index += 1
+        subtype = value[index] if index < len(value) else "mixed"
+        extension = value[index + 1:]
+        disposition, disposition_params = _disposition(extension[1] if len(extension) > 1 else None)
+        return {
+            "section": section,
+            "type": "multipart",
+            "subtype": (subtype or "mixed").lower(),
+            "params": _params(extension[0] if extension else None),
+            "disposition": disposition,
+            "filename": disposition_params.get("filename"),
+            "children": [child for child in children if child]
+        }
+
+    main_type = (value[0] or "application").lower()
+    subtype = (value[1] or "octet-stream").lower()
+    params = _params(value[2] if len(value) > 2 else None)
+
+    if main_type == "text":
+        extension_start = 8
+    elif main_type == "message" and subtype == "rfc822":
+        extension_start = 10
+    else:
+        extension_start = 7
+    disposition_field = value[extension_start + 1] if len(value) > extension_start + 1 else None
+    disposition, disposition_params = _disposition(disposition_field)
+
+    try:
+        size = int(value[6]) if len(value) > 6 and value[6] is not None else 0
+    except (TypeError, ValueError):
+        size = 0
+
+    return {
+        "section": section or "1",
+        "type": main_type,
+        "subtype": subtype,
+        "params": params,
+        "encoding": (value[5] or "7bit").lower() if len(value) > 5 else "7bit",
+        "size": size,
+        "disposition": disposition,
+        "filename": disposition_params.get("filename") or params.get("name"),
+        "children": []
+    }
+
+
+def iter_leaf_parts(part):
+    """Yield every non-multipart part in document order"""
+    if not part:
+        return
+    if part["type"] == "multipart":
+        for child in part["children"]:
+            yield from iter_leaf_parts(child)
+    else:
+        yield part
+
+
+def is_attachment(part):
+    """Check whether a part is an attachment rather than inline content"""
+    return part.get("disposition") == "attachment" or (
+        part["type"] != "text" and bool(part.get("filename")))
+
+
+def find_text_part(part):
+    """Find the preferred text part: first text/plain, else first text/html"""
+    html_part = None
+    for leaf in iter_leaf_parts(part):
+        if leaf["type"] != "text" or is_attachment(leaf):
+            continue
+        if leaf["subtype"] == "plain":
+            return leaf
+        if leaf["subtype"] == "html" and html_part is None:
+            html_part = leaf
+    return html_part
+
+
+def decode_partial_payload(data, encoding, charset=None):
+    """Decode a possibly truncated transfer-encoded payload to text"""
+    if not data:
+        return ""
+    encoding = (encoding or "7bit").lower()
+    try:
+        if encoding == "base64":
+            compact = b"".join(data.split())
+            compact = compact[:len(compact) - len(compact) % 4]
+            data = base64.b64decode(compact)
+        elif encoding == "quoted-printable":
+            cut = data.rfind(b"=", max(0, len(data) - 2))
+            if cut != -1:
+                data = data[:cut]
+            data = quopri.decodestring(data)
+    except (binascii.Error, ValueError):
+        pass
+
+    try:
+        return data.decode(charset or 'utf-8', errors='ignore')
+    except LookupError:
+        return data.decode('utf-8', errors='ignore')
@@ -1,68 +1,348 @@
 # features/email_reader/email_reader.py
-import email
-from email.header import decode_header
-import re
+import weakref
+from collections import deque
 
-def fetch_emails(imap_conn, num_emails=10, folder="INBOX"):
-    """Fetch emails with body text"""
+from utils.email_record import EmailRecord
+from utils.helpers import date_timestamp, decode_header_value, html_to_plain_text, clean_email_content
+from utils.parse_pool import map_chunks
+from utils.profiler import profiler
+from .bodystructure import parse_bodystructure, find_text_part, decode_partial_payload
+from .mime_stream import StreamingMimeParser, parse_message_stream
+from .imap_response import (chunk_ids, compress_id_set, parse_fetch_response, find_fetch_item, quote_mailbox,
+                            internaldate_timestamp)
+
+DEFAULT_FETCH_BATCH_SIZE = 50
+DEFAULT_PIPELINE_DEPTH = 4
+PREVIEW_BYTES = 512
+STREAM_CHUNK_BYTES = 256 * 1024
+LIST_HEADER_FIELDS = "FROM SUBJECT DATE MESSAGE-ID IN-REPLY-TO REFERENCES"
+LIST_FETCH_ITEMS = (f"(UID FLAGS INTERNALDATE RFC822.SIZE BODYSTRUCTURE "
+                    f"BODY.PEEK[HEADER.FIELDS ({LIST_HEADER_FIELDS})] BODY.PEEK[1]<0.{PREVIEW_BYTES}>)")
+
+_selected_folders = weakref.WeakKeyDictionary()
+
+def select_folder(imap_conn, folder, select_arg=None):
+    """SELECT a folder and remember it as the connection's current mailbox"""
+    status, data = imap_conn.select(select_arg or quote_mailbox(folder))
+    if status == "OK":
+        _selected_folders[imap_conn] = folder
+    else:
+        _selected_folders.pop(imap_conn, None)
+    return status, data
+
+def ensure_folder_selected(imap_conn, folder):
+    """SELECT folder unless it is already the connection's current mailbox"""
+    if _selected_folders.get(imap_conn) == folder and imap_conn.state == "SELECTED":
+        return "OK", None
+    return select_folder(imap_conn, folder)
+
+def fetch_emails(imap_conn, num_emails=10, folder="INBOX",
+                 batch_size=DEFAULT_FETCH_BATCH_SIZE, pipeline_depth=DEFAULT_PIPELINE_DEPTH,
+                 headers_only=False):
+    """Fetch the latest emails using batched UID FETCH.
+
+    With headers_only the records carry headers, flags, structure and a short
+    preview; the body is left as None until load_email_body fetches it.
+    """
     try:
-        status, _ = imap_conn.select(folder)
+        status, _ = select_folder(imap_conn, folder)
         if status != "OK":
             return None, f"Cannot select folder: {folder}"
 
-        status, messages = imap_conn.search(None, "ALL")
+        status, messages = imap_conn.uid("SEARCH", None, "ALL")
         if status != "OK":
             return None, "Search failed"
 
-        email_ids = messages[0].split()
-        latest_ids = email_ids[-num_emails:] if len(email_ids) > num_emails else email_ids
-        
-        emails_data = []
-        for email_id in reversed(latest_ids):
-            email_data = fetch_single_email(imap_conn, email_id)
-            if email_data:
-                emails_data.append(email_data)
-        
+        email_uids = messages[0].split()
+        latest_uids = email_uids[-num_emails:] if len(email_uids) > num_emails else email_uids
+
+        fetch_by_uid = fetch_email_headers_by_uid if headers_only else fetch_emails_by_uid
+        emails_data, error = fetch_by_uid(imap_conn, latest_uids, batch_size, pipeline_depth)
+        if error:
+            return None, error
+
+        emails_data.reverse()
         return emails_data, None
         
     except Exception as e:
         return None, f"Fetch error: {str(e)}"
 
+def fetch_emails_by_uid(imap_conn, uids, batch_size=DEFAULT_FETCH_BATCH_SIZE,
+                        pipeline_depth=DEFAULT_PIPELINE_DEPTH):
+    """Fetch full emails for the given UIDs in chunked, pipelined UID FETCHes"""
+    uids = [int(uid) for uid in uids]
+    if not uids:
+        return [], None
+
+    uid_sets = [compress_id_set(chunk) for chunk in chunk_ids(uids, batch_size)]
+    status, responses = uid_fetch_pipelined(imap_conn, uid_sets, "(UID RFC822)", pipeline_depth)
+    if status != "OK":
+        return None, "Fetch failed"
+
+    messages = [(int(fields["UID"]), fields["RFC822"]) for _, fields in responses
+                if fields.get("UID") is not None and fields.get("RFC822") is not None]
+    with profiler.span("parse messages"):
+        records = map_chunks(build_email_records, messages)
+    by_uid = {record["uid"]: record for record in records if record}
+
+    return [by_uid[uid] for uid in uids if uid in by_uid], None
+
+def fetch_email_headers_by_uid(imap_conn, uids, batch_size=DEFAULT_FETCH_BATCH_SIZE,
+                               pipeline_depth=DEFAULT_PIPELINE_DEPTH):
+    """Fetch list-mode records (headers, structure, preview) without bodies"""
+    uids = [int(uid) for uid in uids]
+    if not uids:
+        return [], None
+
+    uid_sets = [compress_id_set(chunk) for chunk in chunk_ids(uids, batch_size)]
+    status, responses = uid_fetch_pipelined(imap_conn, uid_sets, LIST_FETCH_ITEMS, pipeline_depth)
+    if status != "OK":
+        return None, "Fetch failed"
+
+    with profiler.span("parse headers"):
+        records = map_chunks(build_header_records, [
+            fields for _, fields in responses
+            if fields.get("UID") is not None and find_fetch_item(fields, "BODY[HEADER") is not None])
+    by_uid = {record["uid"]: record for record in records}
+
+    fetch_missing_previews(imap_conn, by_uid.values(), pipeline_depth)
+    return [by_uid[uid] for uid in uids if uid in by_uid], None
+
+def build_email_records(messages):
+    """Records for (uid, raw RFC822 bytes) pairs in order, None where parsing failed"""
+    records = []
+    for uid, raw in messages:
+        record = build_email_record(str(uid).encode(), raw)
+        if record:
+            record["uid"] = uid
+            record["size"] = len(raw)
+            record["timestamp"] = date_timestamp(record.get("date"))
+        records.append(record)
+    return records
+
+def build_header_records(fields_list):
+    """build_header_record over a list of parsed FETCH items, in order"""
+    return [build_header_record(fields) for fields in fields_list]
+
+def build_header_record(fields):
+    """Build a list-mode email record from parsed FETCH items"""
+    uid = int(fields["UID"])
+    structure = parse_bodystructure(fields.get("BODYSTRUCTURE"))
+    text_part = find_text_part(structure)
+
+    preview = ""
+    if text_part and text_part["section"] == "1":
+        preview = decode_preview(text_part, find_fetch_item(fields, "BODY[1]"))
+
+    record = EmailRecord(
+        find_fetch_item(fields, "BODY[HEADER") or b"",
+        id=str(uid),
+        uid=uid,
+        flags=list(fields.get("FLAGS") or []),
+        size=int(fields.get("RFC822.SIZE") or 0),
+        structure=structure,
+        preview=preview
+    )
+    # arrival time orders the list; the Date header stands in on servers that omit it
+    timestamp = internaldate_timestamp(fields.get("INTERNALDATE"))
+    record["timestamp"] = timestamp if timestamp is not None else date_timestamp(record.get("date"))
+    return record
+
+def decode_preview(text_part, data):
+    """Decode a partial text section into a short plain-text preview"""
+    if isinstance(data, str):
+        data = data.encode('utf-8', errors='ignore')
+    text = decode_partial_payload(data, text_part["encoding"], text_part["params"].get("charset"))
+    if text_part["subtype"] == "html":
+        text = html_to_plain_text(text)
+    return clean_email_content(text)
+
+def fetch_missing_previews(imap_conn, records, pipeline_depth=DEFAULT_PIPELINE_DEPTH):
+    """Fetch preview snippets for messages whose text part is not section 1"""
+    by_section = {}
+    for record in records:
+        text_part = find_text_part(record["structure"])
+        if text_part and text_part["section"] != "1":
+            by_section.setdefault(text_part["section"], []).append(record)
+    if not by_section:
+        return
+
+    commands = [(compress_id_set(r["uid"] for r in group), f"(UID BODY.PEEK[{section}]<0.{PREVIEW_BYTES}>)")
+                for section, group in by_section.items()]
+    _, responses = uid_fetch_commands(imap_conn, commands, pipeline_depth)
+
+    by_uid = {r["uid"]: r for group in by_section.values() for r in group}
+    for _, fields in responses:
+        record = by_uid.get(int(fields.get("UID") or 0))
+        if not record:
+            continue
+        text_part = find_text_part(record["structure"])
+        data = find_fetch_item(fields, f"BODY[{text_part['section']}]")
+        if data is not None:
+            record["preview"] = decode_preview(text_part, data)
+
+def load_email_body(imap_conn, email_record, peek=False):
+    """Download and parse the full message of a list-mode record on demand; peek leaves \\Seen unset"""
+    if email_record.get("body") is not None:
+        return email_record, None
+
+    try:
+        if email_record.get("folder"):
+            status, _ = ensure_folder_selected(imap_conn, email_record["folder"])
+            if status != "OK":
+                return email_record, f"Cannot select folder: {email_record['folder']}"
+
+        parser, error = stream_message(imap_conn, email_record["uid"], peek=peek)
+        if error:
+            return email_record, error
+
+        email_record["body"] = body_from_parser(parser)
+        if not peek and "\\Seen" not in (email_record.get("flags") or ()):
+            # the non-PEEK fetch set \\Seen on the server
+            email_record["flags"] = list(email_record.get("flags") or []) + ["\\Seen"]
+        if not email_record.get("message_id"):
+            email_record["message_id"] = (parser.headers["Message-ID"] or "").strip()
+        return email_record, None
+
+    except Exception as e:
+        return email_record, f"Fetch error: {str(e)}"
+
+def mark_seen(imap_conn, email_record):
+    """Set \\Seen on the server for a record whose body was shown without a FETCH (cache or prefetch)"""
+    if email_record.get("uid") is None or "\\Seen" in (email_record.get("flags") or ()):
+        return email_record, None
+    try:
+        if email_record.get("folder"):
+            status, _ = ensure_folder_selected(imap_conn, email_record["folder"])
+            if status != "OK":
+                return email_record, f"Cannot select folder: {email_record['folder']}"
+
+        status, data = imap_conn.uid("STORE", str(email_record["uid"]), "+FLAGS.SILENT", "(\\Seen)")
+        if status != "OK":
+            return email_record, f"Cannot mark as read: {data}"
+        email_record["flags"] = list(email_record.get("flags") or []) + ["\\Seen"]
+        return email_record, None
+
+    except Exception as e:
+        return email_record, f"Store error: {str(e)}"
+
+def uid_fetch_pipelined(imap_conn, uid_sets, items, pipeline_depth=DEFAULT_PIPELINE_DEPTH):
+    """Send several UID FETCH commands for the same items without waiting for each"""
+    return uid_fetch_commands(imap_conn, [(uid_set, items) for uid_set in uid_sets], pipeline_depth)
+
+def uid_fetch_commands(imap_conn, commands, pipeline_depth=DEFAULT_PIPELINE_DEPTH):
+    """Pipeline (uid_set, items) UID FETCH commands on one connection.
+
+    Keeps up to pipeline_depth commands in flight and collects the parsed
+    (sequence, fields) responses of all of them. Falls back to one command
+    at a time for connections without imaplib's low-level command API.
+    """
+    responses = []
+    if pipeline_depth <= 1 or not hasattr(imap_conn, "_command_complete"):
+        for uid_set, items in commands:
+            status, data = imap_conn.uid("FETCH", uid_set, items)
+            if status != "OK":
+                return status, responses
+            with profiler.span("parse FETCH response"):
+                responses.extend(parse_fetch_response(data))
+        return "OK", responses
+
+    pending = deque()
+    status = "OK"
+
+    def complete_oldest():
+        typ, _ = imap_conn._command_complete("UID", pending.popleft())
+        _, data = imap_conn._untagged_response(typ, [None], "FETCH")
+        with profiler.span("parse FETCH response"):
+            responses.extend(parse_fetch_response(data))
+        return typ
+
+    for uid_set, items in commands:
+        pending.append(imap_conn._command("UID", "FETCH", uid_set, items))
+        if len(pending) >= pipeline_depth:
+            typ = complete_oldest()
+            if typ != "OK":
+                status = typ
+
+    while pending:
+        typ = complete_oldest()
+        if typ != "OK":
+            status = typ
+
+    return status, responses
+
 def fetch_single_email(imap_conn, email_id):
     """Fetch single email details"""
     try:
-        status, msg_data = imap_conn.fetch(email_id, "(RFC822)")
-        if status != "OK":
+        parser, error = stream_message(imap_conn, email_id, by_uid=False)
+        if error:
             return None
 
-        msg = email.message_from_bytes(msg_data[0][1])
-        
-        return {
-            "id": email_id.decode(),
-            "sender": decode_header_value(msg["From"]),
-            "subject": decode_header_value(msg["Subject"]) or "(No Subject)",
-            "date": msg["Date"],
-            "body": extract_email_body(msg),
-            "raw_message": msg
-        }
+        return record_from_parser(email_id, parser)
         
     except Exception:
         return None
 
-def decode_header_value(header):
-    """Decode email header value"""
-    if not header:
-        return ""
-    
-    decoded_parts = decode_header(header)
-    result = []
-    for part, encoding in decoded_parts:
-        if isinstance(part, bytes):
-            result.append(part.decode(encoding or 'utf-8'))
+def stream_message(imap_conn, message_id, by_uid=True, sink=None, stop_early=True,
+                   chunk_size=STREAM_CHUNK_BYTES, peek=False):
+    """Download a message in BODY[]<offset.length> ranges through the streaming parser.
+
+    Stops requesting ranges once the parser has the text it needs, so large
+    attachments after the text part are never transferred. With peek the
+    ranges are fetched as BODY.PEEK[] and the message stays unread.
+    Returns (parser, error).
+    """
+    section = "BODY.PEEK[]" if peek else "BODY[]"
+    parser = StreamingMimeParser(sink, stop_early)
+    message_id = message_id.decode() if isinstance(message_id, bytes) else str(message_id)
+    offset = 0
+    while not parser.done:
+        items = f"(UID {section}<{offset}.{chunk_size}>)"
+        if by_uid:
+            status, data = imap_conn.uid("FETCH", message_id, items)
         else:
-            result.append(part)
-    
-    return ' '.join(result)
+            status, data = imap_conn.fetch(message_id, items)
+        if status != "OK":
+            return None, "Fetch failed"
+
+        chunk = None
+        for _, fields in parse_fetch_response(data):
+            chunk = find_fetch_item(fields, "BODY[]")
+        if not chunk:
+            break
+        with profiler.span("parse MIME stream"):
+            parser.feed(chunk)
+        offset += len(chunk)
+        if len(chunk) < chunk_size:
+            break
+
+    if offset == 0:
+        return None, "Message not found"
+    parser.close()
+    return parser, None
+
+def build_email_record(email_id, raw_bytes):
+    """Build an email record from raw RFC822 bytes"""
+    try:
+        return record_from_parser(email_id, parse_message_stream([raw_bytes]))
+    except Exception:
+        return None
+
+def record_from_parser(email_id, parser):
+    """Build an email record from a finished StreamingMimeParser"""
+    source = parser.text_source()
+    record = EmailRecord(parser.header_bytes, source,
+                         id=email_id.decode() if isinstance(email_id, bytes) else str(email_id))
+    if source is None:
+        record.body = "(No body content)"
+    return record
+
+def body_from_parser(parser):
+    """Cleaned body text from a parser, converting HTML when there is no plain part"""
+    text, subtype = parser.text_body()
+    if subtype == "html":
+        text = html_to_plain_text(text)
+    return clean_email_content(text) if text else "(No body content)"
 
 def extract_email_body(msg):
     """Extract text body from email"""
@@ -99,21 +379,3 @@ def extract_email_body(msg):
             body = msg.get_payload()
     
     return clean_email_content(body) if body else "(No body content)"
-
-def html_to_plain_text(html):
-    """Convert HTML to plain text"""
-    text = re.sub(r'<[^>]+>', ' ', html)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
-def clean_email_content(text):
-    """Clean email content by removing common clutter"""
-    if not text:
-        return ""
-    
-    lines = text.split('\n')
-    clean_lines = [line for line in lines if not line.strip().startswith('>')]
-    cleaned_text = '\n'.join(clean_lines)
-    cleaned_text = re.sub(r'\n\s*\n', '\n\n', cleaned_text)
-    
-    return cleaned_text.strip()
\ No newline at end of file
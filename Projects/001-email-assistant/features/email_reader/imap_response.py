@@ -0,0 +1,173 @@
+# features/email_reader/imap_response.py
+import re
+from datetime import datetime
+
+_LITERAL_MARKER = re.compile(rb'\{(\d+)\}$')
+_ATOM_SPECIALS = re.compile(r'[\s(){%*"\\\]]')
+
+
+def quote_mailbox(name):
+    """Quote a mailbox name for SELECT/EXAMINE when it contains specials"""
+    if len(name) >= 2 and name[0] == name[-1] == '"':
+        return name
+    if _ATOM_SPECIALS.search(name) is None:
+        return name
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def compress_id_set(ids):
+    """Compress sorted message ids into an IMAP sequence-set string"""
+    numbers = sorted({int(i) for i in ids})
+    if not numbers:
+        return ""
+
+    ranges = []
+    start = prev = numbers[0]
+    for number in numbers[1:]:
+        if number == prev + 1:
+            prev = number
+            continue
+        ranges.append(f"{start}:{prev}" if start != prev else str(start))
+        start = prev = number
+    ranges.append(f"{start}:{prev}" if start != prev else str(start))
+    return ",".join(ranges)
+
+
+def expand_id_set(id_set):
+    """Expand a sequence-set string such as "1:3,7" into a list of ints"""
+    ids = []
+    for part in str(id_set or "").split(","):
+        if not part:
+            continue
+        low, _, high = part.partition(":")
+        low, high = int(low), int(high or low)
+        ids.extend(range(min(low, high), max(low, high) + 1))
+    return ids
+
+
+def chunk_ids(ids, chunk_size):
+    """Split message ids into chunks of at most chunk_size"""
+    ids = list(ids)
+    chunk_size = max(1, int(chunk_size))
+    return [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+
+
+def _segments(data):
+    """Flatten imaplib response data into text and literal segments"""
+    for item in data:
+        if item is None:
+            continue
+        if isinstance(item, tuple):
+            head, literal = item[0], item[1]
+            yield "text", _LITERAL_MARKER.sub(b'', head)
+            yield "literal", literal
+        else:
+            yield "text", item
+
+
+def _tokenize(data):
+    """Tokenize FETCH response data into parens, atoms, strings and literals"""
+    tokens = []
+    for kind, value in _segments(data):
+        if kind == "literal":
+            tokens.append(("literal", value))
+            continue
+
+        text = value.decode('utf-8', errors='replace') if isinstance(value, bytes) else value
+        i, length = 0, len(text)
+        while i < length:
+            char = text[i]
+            if char in ' \r\n':
+                i += 1
+            elif char in '()':
+                tokens.append((char, char))
+                i += 1
+            elif char == '"':
+                i += 1
+                chars = []
+                while i < length and text[i] != '"':
+                    if text[i] == '\\' and i + 1 < length:
+                        i += 1
+                    chars.append(text[i])
+                    i += 1
+                tokens.append(("string", ''.join(chars)))
+                i += 1
+            else:
+                start = i
+                depth = 0
+                while i < length:
+                    char = text[i]
+                    if char == '[':
+                        depth += 1
+                    elif char == ']':
+                        depth -= 1
+                    elif depth <= 0 and char in ' ()':
+                        break
+                    i += 1
+                atom = text[start:i]
+                tokens.append(("atom", None if atom.upper() == "NIL" else atom))
+    return tokens
+
+
+def _parse_tokens(tokens, pos):
+    """Parse one value (list or scalar) starting at pos"""
+    kind, value = tokens[pos]
+    if kind == '(':
+        items = []
+        pos += 1
+        while pos < len(tokens) and tokens[pos][0] != ')':
+            item, pos = _parse_tokens(tokens, pos)
+            items.append(item)
+        return items, pos + 1
+    return value, pos + 1
+
+
+def parse_imap_list(data):
+    """Parse a parenthesized IMAP value such as BODYSTRUCTURE"""
+    tokens = _tokenize([data] if isinstance(data, (bytes, str)) else data)
+    if not tokens:
+        return None
+    value, _ = _parse_tokens(tokens, 0)
+    return value
+
+
+def parse_fetch_response(data):
+    """Parse imaplib FETCH data into (sequence number, {ITEM: value}) pairs"""
+    tokens = _tokenize(data)
+    results = []
+    pos = 0
+    while pos < len(tokens):
+        kind, value = tokens[pos]
+        if kind != "atom" or not (value or "").isdigit():
+            pos += 1
+            continue
+        if pos + 1 >= len(tokens) or tokens[pos + 1][0] != '(':
+            pos += 1
+            continue
+
+        items, pos = _parse_tokens(tokens, pos + 1)
+        fields = {}
+        for name, item_value in zip(items[0::2], items[1::2]):
+            if isinstance(name, str):
+                fields[name.upper()] = item_value
+        results.append((int(value), fields))
+    return results
+
+
+def find_fetch_item(fields, prefix):
+    """Return the first FETCH item whose name starts with prefix"""
+    prefix = prefix.upper()
+    for name, value in fields.items():
+        if name.startswith(prefix):
+            return value
+    return None
+
+
+def internaldate_timestamp(value):
+    """POSIX timestamp of an INTERNALDATE item such as "01-Jan-2024 10:00:00 +0100", or None"""
+    if isinstance(value, bytes):
+        value = value.decode("ascii", errors="replace")
+    try:
+        return datetime.strptime(value.strip(), "%d-%b-%Y %H:%M:%S %z").timestamp()
+    except (AttributeError, ValueError):
+        return None
@@ -0,0 +1,313 @@
+# features/email_reader/mime_stream.py
+import binascii
+import os
+import tempfile
+from email import policy
+from email.parser import BytesHeaderParser
+
+MAX_LINE_BYTES = 64 * 1024
+MAX_HEADER_BYTES = 256 * 1024
+MAX_TEXT_BYTES = 1024 * 1024
+
+
+class _NullWriter:
+    def write(self, data):
+        return len(data)
+
+    def close(self):
+        pass
+
+
+class DiscardSink:
+    """Drop non-text parts, keeping only their metadata"""
+
+    def open_part(self, info):
+        return _NullWriter()
+
+
+class TempFileSink:
+    """Spill decoded non-text parts to temporary files (info["path"])"""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.paths = []
+
+    def open_part(self, info):
+        handle = tempfile.NamedTemporaryFile(prefix="mail-part-", dir=self.directory, delete=False)
+        info["path"] = handle.name
+        self.paths.append(handle.name)
+        return handle
+
+    def cleanup(self):
+        """Delete every file this sink created"""
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.paths = []
+
+
+class _Base64Decoder:
+    def __init__(self):
+        self.pending = b""
+
+    def decode(self, data):
+        data = self.pending + b"".join(data.split())
+        usable = len(data) - len(data) % 4
+        self.pending = data[usable:]
+        return _a2b_base64(data[:usable])
+
+    def flush(self):
+        data, self.pending = self.pending, b""
+        return _a2b_base64(data + b"=" * (-len(data) % 4)) if data else b""
+
+
+class _QuotedPrintableDecoder:
+    def __init__(self):
+        self.pending = b""
+
+    def decode(self, data):
+        data = self.pending + data
+        cut = data.rfind(b"\n") + 1
+        if cut == 0 and len(data) > MAX_LINE_BYTES:
+            cut = len(data) - 2
+        self.pending = data[cut:]
+        return binascii.a2b_qp(data[:cut])
+
+    def flush(self):
+        data, self.pending = self.pending, b""
+        return binascii.a2b_qp(data)
+
+
+class _IdentityDecoder:
+    pending = b""
+
+    def decode(self, data):
+        return data
+
+    def flush(self):
+        return b""
+
+
+def _a2b_base64(data):
+    try:
+        return binascii.a2b_base64(data)
+    except binascii.Error:
+        return b""
+
+
+def transfer_decoder(encoding):
+    """Incremental Content-Transfer-Encoding decoder with decode(chunk)/flush().
+
+    Undecodable carry-over between chunks is kept in `decoder.pending`, which
+    callers may save and restore to resume decoding later.
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding == "base64":
+        return _Base64Decoder()
+    if encoding == "quoted-printable":
+        return _QuotedPrintableDecoder()
+    return _IdentityDecoder()
+
+
+class StreamingMimeParser:
+    """Incremental MIME parser that keeps only text parts in memory.
+
+    Feed raw message bytes in chunks of any size. Text parts are decoded into
+    buffers capped at `max_text_bytes`; every other leaf part is decoded into
+    a writer from `sink.open_part(info)`. With `stop_early` the parser is
+    `done` as soon as the first text/plain part is complete, so callers can
+    stop downloading. Memory use is bounded by the line, header and text caps
+    no matter how large the attachments are.
+    """
+
+    def __init__(self, sink=None, stop_early=True, max_text_bytes=MAX_TEXT_BYTES):
+        self.sink = sink or DiscardSink()
+        self.stop_early = stop_early
+        self.max_text_bytes = max_text_bytes
+        self.headers = None
+        self.header_bytes = b""
+        self.attachments = []
+        self.text = {}
+        self.done = False
+        self.bytes_fed = 0
+        self._buffer = bytearray()
+        self._boundaries = []
+        self._state = "headers"
+        self._header_lines = []
+        self._header_size = 0
+        self._part = None
+        self._pending_eol = b""
+        self._mid_line = False
+
+    def feed(self, data):
+        """Consume the next chunk of raw message bytes"""
+        if self.done:
+            return
+        self.bytes_fed += len(data)
+        self._buffer += data
+        start = 0
+        while not self.done:
+            end = self._buffer.find(b"\n", start)
+            if end < 0:
+                break
+            self._line(bytes(self._buffer[start:end + 1]))
+            start = end + 1
+        del self._buffer[:start]
+
+        if not self.done and len(self._buffer) > MAX_LINE_BYTES and self._state == "body":
+            self._payload(bytes(self._buffer), partial=True)
+            self._buffer.clear()
+
+    def close(self):
+        """Finish parsing after the last chunk"""
+        if self._buffer and not self.done:
+            self._line(bytes(self._buffer))
+            self._buffer.clear()
+        if self._state == "headers" and self._header_lines:
+            self._end_headers()
+        self._finish_part()
+        self._state = "epilogue"
+
+    def text_body(self):
+        """Return (text, subtype) of the preferred text part, plain before html"""
+        source = self.text_source()
+        if source is None:
+            return "", None
+        data, charset, subtype = source
+        return _decode_text(data, charset), subtype
+
+    def text_source(self):
+        """Return undecoded (bytes, charset, subtype) of the preferred text part, or None"""
+        for subtype in ("plain", "html"):
+            if subtype in self.text:
+                data, charset = self.text[subtype]
+                return data, charset, subtype
+        return None
+
+    def _line(self, line):
+        if self._state == "headers":
+            self._header_line(line)
+            return
+
+        if not self._mid_line and line.startswith(b"--") and self._boundaries:
+            marker = line.rstrip()
+            for depth in range(len(self._boundaries) - 1, -1, -1):
+                boundary = self._boundaries[depth]
+                if marker == boundary:
+                    self._finish_part()
+                    del self._boundaries[depth + 1:]
+                    self._state = "headers"
+                    return
+                if marker == boundary + b"--":
+                    self._finish_part()
+                    del self._boundaries[depth:]
+                    self._state = "epilogue"
+                    return
+
+        if self._state == "body":
+            self._payload(line)
+        self._mid_line = False
+
+    def _header_line(self, line):
+        if line in (b"\r\n", b"\n"):
+            self._end_headers()
+            return
+        if self._header_size < MAX_HEADER_BYTES:
+            self._header_lines.append(line)
+            self._header_size += len(line)
+
+    def _end_headers(self):
+        header_bytes = b"".join(self._header_lines)
+        headers = BytesHeaderParser(policy=policy.compat32).parsebytes(header_bytes)
+        self._header_lines, self._header_size = [], 0
+        is_top = self.headers is None
+        if is_top:
+            self.headers = headers
+            self.header_bytes = header_bytes
+
+        if headers.get_content_maintype() == "multipart" and headers.get_boundary():
+            self._boundaries.append(b"--" + headers.get_boundary().encode("latin-1", errors="replace"))
+            self._state = "epilogue"
+            return
+
+        content_type = headers.get_content_type()
+        disposition = str(headers.get("Content-Disposition", "")).lower()
+        subtype = headers.get_content_subtype()
+        is_text = (headers.get_content_maintype() == "text" and subtype in ("plain", "html")
+                   and "attachment" not in disposition)
+        if is_top and not is_text and headers.get_content_maintype() == "text":
+            subtype, is_text = "plain", True
+
+        part = {"decoder": transfer_decoder(headers.get("Content-Transfer-Encoding")), "size": 0}
+        if is_text and subtype not in self.text:
+            part["text"] = (subtype, bytearray(), headers.get_content_charset() or "utf-8")
+        else:
+            info = {"content_type": content_type, "filename": headers.get_filename(), "size": 0}
+            part["info"] = info
+            part["writer"] = self.sink.open_part(info)
+            self.attachments.append(info)
+        self._part = part
+        self._pending_eol = b""
+        self._state = "body"
+
+    def _payload(self, line, partial=False):
+        if self._part is None:
+            return
+        if partial:
+            content, eol = line, b""
+        else:
+            content = line.rstrip(b"\r\n")
+            eol = line[len(content):]
+        self._write(self._part, self._pending_eol + content)
+        self._pending_eol = eol
+        self._mid_line = partial
+
+    def _write(self, part, data):
+        decoded = part["decoder"].decode(data) if data else b""
+        self._store(part, decoded)
+
+    def _store(self, part, decoded):
+        if not decoded:
+            return
+        part["size"] += len(decoded)
+        if "text" in part:
+            buffer = part["text"][1]
+            buffer += decoded[:max(0, self.max_text_bytes - len(buffer))]
+        else:
+            part["writer"].write(decoded)
+            part["info"]["size"] = part["size"]
+
+    def _finish_part(self):
+        part, self._part = self._part, None
+        self._pending_eol = b""
+        if part is None:
+            return
+        self._store(part, part["decoder"].flush())
+
+        if "text" in part:
+            subtype, buffer, charset = part["text"]
+            self.text[subtype] = (bytes(buffer), charset)
+            if self.stop_early and subtype == "plain":
+                self.done = True
+        else:
+            part["writer"].close()
+
+
+def _decode_text(data, charset):
+    try:
+        return data.decode(charset, errors="replace")
+    except LookupError:
+        return data.decode("utf-8", errors="replace")
+
+
+def parse_message_stream(chunks, sink=None, stop_early=True, max_text_bytes=MAX_TEXT_BYTES):
+    """Run a StreamingMimeParser over an iterable of byte chunks"""
+    parser = StreamingMimeParser(sink, stop_early, max_text_bytes)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    parser.close()
+    return parser
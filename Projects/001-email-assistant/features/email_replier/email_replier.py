@@ -2,14 +2,15 @@
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import re
-from rich.console import Console
-from rich.panel import Panel
-from rich.text import Text
-
-console = Console()
 
 def interactive_reply(smtp_conn, original_email, sender_email):
     """Interactive email reply"""
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich.text import Text
+    from features.outbox.outbox import DeliveryWorker
+
+    console = Console()
     console.print(Panel(Text("Reply to Email", style="bold blue")))
     
     console.print(f"[bold]From:[/bold] {original_email['sender']}")
@@ -26,7 +27,11 @@ def interactive_reply(smtp_conn, original_email, sender_email):
     success, error = send_reply(smtp_conn, original_email, reply_body, sender_email)
     
     if success:
-        console.print(Panel(Text("Reply sent!", style="bold green")))
+        if isinstance(smtp_conn, DeliveryWorker):
+            sent_text = f"📤 Reply queued for {extract_email(original_email['sender'])}."
+        else:
+            sent_text = "Reply sent!"
+        console.print(Panel(Text(sent_text, style="bold green")))
         return True
     else:
         console.print(Panel(Text(f"Send failed: {error}", style="bold red")))
@@ -42,10 +47,10 @@ def send_reply(smtp_conn, original_email, reply_body, sender_email):
         msg['To'] = original_sender
         msg['Subject'] = f"Re: {original_email['subject']}"
         
-        if 'raw_message' in original_email and 'Message-ID' in original_email['raw_message']:
-            msg_id = original_email['raw_message']['Message-ID']
+        msg_id = original_email.get('message_id')
+        if msg_id:
             msg['In-Reply-To'] = msg_id
-            msg['References'] = msg_id
+            msg['References'] = f"{original_email.get('references', '')} {msg_id}".strip()
         
         formatted_body = format_reply(reply_body, original_email)
         msg.attach(MIMEText(formatted_body, 'plain'))
@@ -59,7 +64,9 @@ def send_reply(smtp_conn, original_email, reply_body, sender_email):
 def format_reply(reply_body, original_email):
     """Format reply with original message"""
     formatted = f"{reply_body}\n\n"
-    formatted += f"> On {original_email['date']}, {original_email['sender']} wrote:\n"
+    date = original_email.get('date')
+    intro = f"On {date}, {original_email['sender']} wrote:" if date else f"{original_email['sender']} wrote:"
+    formatted += f"> {intro}\n"
     formatted += "> " + original_email['body'][:300].replace('\n', '\n> ')
     return formatted
 
@@ -0,0 +1,4 @@
+# features/email_search/init.py
+from .email_search import build_search_criteria, open_search, fetch_search_page, next_page, previous_page
+
+__all__ = ['build_search_criteria', 'open_search', 'fetch_search_page', 'next_page', 'previous_page']
\ No newline at end of file
@@ -0,0 +1,206 @@
+# features/email_search/email_search.py
+from datetime import date, datetime
+
+from features.email_reader.email_reader import (
+    fetch_email_headers_by_uid, select_folder, DEFAULT_FETCH_BATCH_SIZE, DEFAULT_PIPELINE_DEPTH
+)
+from features.email_reader.imap_response import expand_id_set, parse_imap_list
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_VALUE_KEYS = {"FROM", "SUBJECT", "SINCE", "BEFORE", "TEXT", "TO", "BODY"}
+
+def build_search_criteria(sender=None, subject=None, since=None, unseen=False, text=None):
+    """Build (key, value) SEARCH criteria from optional filters"""
+    criteria = []
+    if sender:
+        criteria.append(("FROM", sender))
+    if subject:
+        criteria.append(("SUBJECT", subject))
+    if since:
+        criteria.append(("SINCE", format_search_date(since)))
+    if unseen:
+        criteria.append(("UNSEEN", None))
+    if text:
+        criteria.append(("TEXT", text))
+    return criteria or [("ALL", None)]
+
+def format_search_date(value):
+    """Format a date, datetime or YYYY-MM-DD string as an IMAP date (01-Jan-2024)"""
+    if isinstance(value, str):
+        value = datetime.strptime(value.strip(), "%Y-%m-%d").date()
+    if isinstance(value, datetime):
+        value = value.date()
+    if not isinstance(value, date):
+        raise ValueError(f"Invalid search date: {value!r}")
+    return f"{value.day:02d}-{_MONTHS[value.month - 1]}-{value.year}"
+
+def render_criteria(imap_conn, criteria):
+    """Render criteria as command text; a non-ASCII value is sent as the trailing literal"""
+    parts = []
+    literal = None
+    for key, value in sorted(criteria, key=lambda item: not _is_ascii(item[1])):
+        if value is None or key not in _VALUE_KEYS:
+            parts.append(key)
+        elif _is_ascii(value):
+            parts.append(f'{key} "' + value.replace('\\', '\\\\').replace('"', '\\"') + '"')
+        elif literal is None:
+            parts.append(key)
+            literal = value.encode('utf-8')
+        else:
+            raise ValueError("Only one non-ASCII search term is supported")
+    imap_conn.literal = literal
+    return " ".join(parts), literal is not None
+
+def _is_ascii(value):
+    return value is None or all(ord(char) < 128 for char in value)
+
+def open_search(imap_conn, folder="INBOX", criteria=None, page_size=10, sort_by_date=False):
+    """Run a server-side search and return a cursor positioned on the newest page.
+
+    Uses ESEARCH COUNT plus PARTIAL paging (RFC 4731/5267) when offered, so
+    only the requested page of UIDs ever crosses the wire; SORT (RFC 5256)
+    orders by date when requested and supported. Returns (cursor, error).
+    """
+    try:
+        criteria = criteria or [("ALL", None)]
+        status, _ = select_folder(imap_conn, folder)
+        if status != "OK":
+            return None, f"Cannot select folder: {folder}"
+
+        capabilities = set(imap_conn.capabilities)
+        use_sort = sort_by_date and "SORT" in capabilities
+        cursor = {
+            "folder": folder,
+            "criteria": criteria,
+            "page_size": max(1, int(page_size)),
+            "offset": 0,
+            "total": 0,
+            "uids": None,
+            "sort": use_sort
+        }
+
+        if use_sort and {"ESORT", "CONTEXT=SORT"} <= capabilities:
+            result = _esearch(imap_conn, "SORT", "RETURN (COUNT)", criteria, sort=True)
+            cursor["total"] = result.get("COUNT", 0)
+        elif use_sort:
+            cursor["uids"] = _plain_search(imap_conn, "SORT", criteria, sort=True)
+        elif "ESEARCH" in capabilities and ({"CONTEXT=SEARCH", "PARTIAL"} & capabilities):
+            result = _esearch(imap_conn, "SEARCH", "RETURN (COUNT)", criteria)
+            cursor["total"] = result.get("COUNT", 0)
+        elif "ESEARCH" in capabilities:
+            result = _esearch(imap_conn, "SEARCH", "RETURN (ALL)", criteria)
+            cursor["uids"] = list(reversed(expand_id_set(result.get("ALL", ""))))
+        else:
+            cursor["uids"] = list(reversed(_plain_search(imap_conn, "SEARCH", criteria)))
+
+        if cursor["uids"] is not None:
+            cursor["total"] = len(cursor["uids"])
+        return cursor, None
+
+    except Exception as e:
+        return None, f"Search error: {str(e)}"
+
+def fetch_search_page(imap_conn, cursor, batch_size=DEFAULT_FETCH_BATCH_SIZE,
+                      pipeline_depth=DEFAULT_PIPELINE_DEPTH):
+    """Fetch list-mode records for the cursor's current page"""
+    try:
+        uids = page_uids(imap_conn, cursor)
+        records, error = fetch_email_headers_by_uid(imap_conn, uids, batch_size, pipeline_depth)
+        if error:
+            return None, error
+        for record in records:
+            record["folder"] = cursor["folder"]
+        return records, None
+
+    except Exception as e:
+        return None, f"Search error: {str(e)}"
+
+def page_uids(imap_conn, cursor):
+    """Return the UIDs of the cursor's current page, newest first"""
+    offset, size, total = cursor["offset"], cursor["page_size"], cursor["total"]
+    if cursor["uids"] is not None:
+        return cursor["uids"][offset:offset + size]
+    if total == 0:
+        return []
+
+    if cursor["sort"]:
+        low, high = offset + 1, min(total, offset + size)
+        result = _esearch(imap_conn, "SORT", f"RETURN (PARTIAL {low}:{high})", cursor["criteria"], sort=True)
+        return _partial_uids(result)
+
+    high = total - offset
+    low = max(1, high - size + 1)
+    result = _esearch(imap_conn, "SEARCH", f"RETURN (PARTIAL {low}:{high})", cursor["criteria"])
+    return list(reversed(_partial_uids(result)))
+
+def next_page(cursor):
+    """Advance to the next (older) page; returns False on the last page"""
+    if cursor["offset"] + cursor["page_size"] >= cursor["total"]:
+        return False
+    cursor["offset"] += cursor["page_size"]
+    return True
+
+def previous_page(cursor):
+    """Go back to the previous (newer) page; returns False on the first page"""
+    if cursor["offset"] == 0:
+        return False
+    cursor["offset"] = max(0, cursor["offset"] - cursor["page_size"])
+    return True
+
+def page_label(cursor):
+    """Human readable position such as 'Page 2 of 14 (137 matches)'"""
+    pages = max(1, -(-cursor["total"] // cursor["page_size"]))
+    page = cursor["offset"] // cursor["page_size"] + 1
+    return f"Page {page} of {pages} ({cursor['total']} matches)"
+
+def _plain_search(imap_conn, command, criteria, sort=False):
+    text, has_literal = render_criteria(imap_conn, criteria)
+    if sort:
+        args = ["(REVERSE DATE)", "UTF-8", text]
+    else:
+        args = (["CHARSET", "UTF-8"] if has_literal else []) + [text]
+    status, data = imap_conn.uid(command, *args)
+    if status != "OK":
+        raise imap_conn.error(f"{command} failed")
+    return [int(uid) for uid in (data[0] or b"").split()]
+
+def _esearch(imap_conn, command, return_options, criteria, sort=False):
+    text, has_literal = render_criteria(imap_conn, criteria)
+    if sort:
+        args = [return_options, "(REVERSE DATE)", "UTF-8", text]
+    else:
+        args = [return_options] + (["CHARSET", "UTF-8"] if has_literal else []) + [text]
+    status, _ = imap_conn.uid(command, *args)
+    if status != "OK":
+        raise imap_conn.error(f"{command} failed")
+    _, data = imap_conn.response("ESEARCH")
+    return _parse_esearch(data)
+
+def _parse_esearch(data):
+    """Parse ESEARCH response data into {"COUNT": n, "ALL": set, "PARTIAL": [...]}"""
+    result = {}
+    for item in data or []:
+        if not item:
+            continue
+        text = item.decode('utf-8', errors='replace') if isinstance(item, bytes) else item
+        tokens = parse_imap_list(f"({text})") or []
+        tokens = [token for token in tokens if not isinstance(token, list) or token[:1] != ["TAG"]]
+        index = 0
+        while index < len(tokens):
+            key = tokens[index].upper() if isinstance(tokens[index], str) else None
+            if key == "UID":
+                index += 1
+                continue
+            value = tokens[index + 1] if index + 1 < len(tokens) else None
+            if key in ("COUNT", "MIN", "MAX"):
+                result[key] = int(value)
+            elif key in ("ALL", "PARTIAL"):
+                result[key] = value
+            index += 2
+    return result
+
+def _partial_uids(result):
+    partial = result.get("PARTIAL")
+    if not isinstance(partial, list) or len(partial) < 2 or partial[1] is None:
+        return []
+    return expand_id_set(partial[1])
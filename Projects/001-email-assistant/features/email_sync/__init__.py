@@ -0,0 +1,4 @@
+# features/email_sync/init.py
+from .email_sync import sync_folder, cache_email_body, cache_email_flags, load_cached_body
+
+__all__ = ['sync_folder', 'cache_email_body', 'cache_email_flags', 'load_cached_body']
\ No newline at end of file
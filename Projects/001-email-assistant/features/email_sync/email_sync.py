@@ -0,0 +1,197 @@
+# features/email_sync/email_sync.py
+import weakref
+
+from features.email_reader.email_reader import (
+    fetch_email_headers_by_uid, select_folder, DEFAULT_FETCH_BATCH_SIZE, DEFAULT_PIPELINE_DEPTH
+)
+from features.email_reader.imap_response import compress_id_set, parse_fetch_response, quote_mailbox
+from utils.body_store import put_body
+from utils.mail_cache import (
+    get_folder_state, set_folder_state, is_local_folder, reset_folder, max_cached_uid, cached_uids,
+    store_records, store_body, cached_body, update_flags, delete_uid_ranges, load_records, prune_changes
+)
+
+DEFAULT_SYNC_LIMIT = 500
+
+_qresync_enabled = weakref.WeakSet()
+
+def sync_folder(imap_conn, cache, folder="INBOX", num_emails=10,
+                batch_size=DEFAULT_FETCH_BATCH_SIZE, pipeline_depth=DEFAULT_PIPELINE_DEPTH,
+                sync_limit=DEFAULT_SYNC_LIMIT, account=None):
+    """Bring the cached copy of a folder up to date and return its newest records.
+
+    Only UIDs above the highest cached UID are downloaded, `sync_limit` per
+    FETCH batch and oldest first, so a long absence is caught up completely
+    (a first sync takes just the newest `num_emails`). Flag changes and
+    expunges are picked up through QRESYNC or CONDSTORE when the server
+    offers them, otherwise by re-checking the cached UIDs. A folder cached
+    for another `account` is dropped and synced afresh.
+    """
+    try:
+        if is_local_folder(cache, folder):
+            return None, f"{folder} is an imported archive with no server copy"
+        capabilities = set(imap_conn.capabilities)
+        cached_validity, cached_modseq = get_folder_state(cache, folder, account)
+        if cached_validity is None and get_folder_state(cache, folder)[0] is not None:
+            # rows of another account under the same folder name must not mix with this one's
+            reset_folder(cache, folder)
+        use_qresync = "QRESYNC" in capabilities and enable_qresync(imap_conn)
+        use_condstore = use_qresync or "CONDSTORE" in capabilities
+
+        mailbox = quote_mailbox(folder)
+        if use_qresync and cached_validity and cached_modseq:
+            select_arg = f"{mailbox} (QRESYNC ({cached_validity} {cached_modseq}))"
+        elif use_condstore:
+            select_arg = f"{mailbox} (CONDSTORE)"
+        else:
+            select_arg = mailbox
+
+        status, _ = select_folder(imap_conn, folder, select_arg)
+        if status != "OK":
+            return None, f"Cannot select folder: {folder}"
+
+        uidvalidity = _response_int(imap_conn, "UIDVALIDITY")
+        highest_modseq = _response_int(imap_conn, "HIGHESTMODSEQ") if use_condstore else 0
+        vanished = imap_conn.response("VANISHED")[1]
+        changed = imap_conn.response("FETCH")[1]
+
+        if cached_validity is not None and cached_validity != uidvalidity:
+            reset_folder(cache, folder)
+            cached_validity, cached_modseq = None, 0
+
+        highest_uid = max_cached_uid(cache, folder, uidvalidity) if cached_validity else 0
+        if highest_uid:
+            if use_qresync and cached_modseq:
+                apply_vanished(cache, folder, uidvalidity, vanished)
+                apply_flag_changes(cache, folder, uidvalidity, changed)
+            elif use_condstore and cached_modseq:
+                status, data = imap_conn.uid("FETCH", f"1:{highest_uid}", "(UID FLAGS)",
+                                             f"(CHANGEDSINCE {cached_modseq})")
+                if status == "OK":
+                    apply_flag_changes(cache, folder, uidvalidity, data)
+                remove_expunged(imap_conn, cache, folder, uidvalidity)
+            else:
+                remove_expunged(imap_conn, cache, folder, uidvalidity)
+                refresh_flags(imap_conn, cache, folder, uidvalidity, num_emails)
+
+        status, data = imap_conn.uid("SEARCH", None, f"UID {highest_uid + 1}:*")
+        if status != "OK":
+            return None, "Search failed"
+
+        new_uids = [int(uid) for uid in (data[0] or b"").split() if int(uid) > highest_uid]
+        if not highest_uid:
+            new_uids = new_uids[-num_emails:]
+        chunk = max(1, sync_limit)
+        for start in range(0, len(new_uids), chunk):
+            # oldest first: an interrupted catch-up resumes above what was stored, leaving no hole
+            records, error = fetch_email_headers_by_uid(imap_conn, new_uids[start:start + chunk],
+                                                        batch_size, pipeline_depth)
+            if error:
+                return None, error
+            store_records(cache, folder, uidvalidity, records)
+
+        set_folder_state(cache, folder, uidvalidity, highest_modseq, account)
+        prune_changes(cache)
+        return load_records(cache, folder, uidvalidity, limit=num_emails), None
+
+    except Exception as e:
+        return None, f"Sync error: {str(e)}"
+
+def enable_qresync(imap_conn):
+    """Enable QRESYNC once per connection (only legal before SELECT)"""
+    if imap_conn in _qresync_enabled:
+        return True
+    if imap_conn.state != "AUTH":
+        return False
+    try:
+        status, _ = imap_conn.enable("QRESYNC")
+    except imap_conn.error:
+        return False
+    if status == "OK":
+        _qresync_enabled.add(imap_conn)
+        return True
+    return False
+
+def cache_email_body(cache, email_record):
+    """Persist a lazily downloaded body, once per distinct text, for this record and its copies"""
+    if cache is None or email_record.get("body") is None:
+        return
+    if "uidvalidity" not in email_record:
+        # not a cached row (e.g. the unified inbox): still let copies elsewhere find it by Message-ID
+        put_body(cache, email_record["body"], email_record.get("message_id"), email_record.get("size"))
+        return
+    store_body(cache, email_record["folder"], email_record["uidvalidity"], email_record["uid"],
+               email_record["body"], email_record.get("message_id"), email_record.get("size"))
+
+def load_cached_body(cache, email_record):
+    """Fill in a record's body from the cache (its own row or a copy with the same Message-ID); True if it has one"""
+    if email_record.get("body") is not None:
+        return True
+    if cache is None:
+        return False
+    body = cached_body(cache, email_record.get("folder") or "INBOX", email_record.get("uidvalidity"),
+                       email_record.get("uid"), email_record.get("message_id"), email_record.get("size"))
+    if body is None:
+        return False
+    email_record["body"] = body
+    return True
+
+def cache_email_flags(cache, email_record):
+    """Persist a record's current flags to its cached row"""
+    if cache is None or "uidvalidity" not in email_record or email_record.get("uid") is None:
+        return
+    update_flags(cache, email_record["folder"], email_record["uidvalidity"],
+                 {email_record["uid"]: list(email_record.get("flags") or [])})
+
+def apply_flag_changes(cache, folder, uidvalidity, data):
+    """Store FLAGS from untagged or CHANGEDSINCE FETCH responses"""
+    flags_by_uid = {}
+    for _, fields in parse_fetch_response([item for item in data or [] if item]):
+        if fields.get("UID") is not None and fields.get("FLAGS") is not None:
+            flags_by_uid[int(fields["UID"])] = list(fields["FLAGS"])
+    if flags_by_uid:
+        update_flags(cache, folder, uidvalidity, flags_by_uid)
+
+def apply_vanished(cache, folder, uidvalidity, data):
+    """Delete UIDs reported by VANISHED (EARLIER) responses"""
+    ranges = []
+    for item in data or []:
+        if not item:
+            continue
+        text = item.decode() if isinstance(item, bytes) else item
+        uid_set = text.split()[-1]
+        for part in uid_set.split(","):
+            low, _, high = part.partition(":")
+            ranges.append((int(low), int(high or low)))
+    if ranges:
+        delete_uid_ranges(cache, folder, uidvalidity, ranges)
+
+def remove_expunged(imap_conn, cache, folder, uidvalidity):
+    """Drop cached UIDs that no longer exist on the server"""
+    uids = cached_uids(cache, folder, uidvalidity)
+    if not uids:
+        return
+    status, data = imap_conn.uid("SEARCH", None, f"UID {compress_id_set(uids)}")
+    if status != "OK":
+        return
+    existing = {int(uid) for uid in (data[0] or b"").split()}
+    gone = [(uid, uid) for uid in uids if uid not in existing]
+    if gone:
+        delete_uid_ranges(cache, folder, uidvalidity, gone)
+
+def refresh_flags(imap_conn, cache, folder, uidvalidity, num_emails):
+    """Re-read FLAGS for the newest cached page on servers without CONDSTORE"""
+    uids = [record["uid"] for record in load_records(cache, folder, uidvalidity, limit=num_emails)]
+    if not uids:
+        return
+    status, data = imap_conn.uid("FETCH", compress_id_set(uids), "(UID FLAGS)")
+    if status == "OK":
+        apply_flag_changes(cache, folder, uidvalidity, data)
+
+def _response_int(imap_conn, code):
+    """Read an integer response code such as UIDVALIDITY after SELECT"""
+    _, data = imap_conn.response(code)
+    try:
+        return int(data[-1]) if data and data[-1] is not None else 0
+    except (TypeError, ValueError):
+        return 0
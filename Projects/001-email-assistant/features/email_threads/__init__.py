@@ -0,0 +1,4 @@
+# features/email_threads/init.py
+from .email_threads import ThreadIndex, flatten_thread, thread_subject
+
+__all__ = ['ThreadIndex', 'flatten_thread', 'thread_subject']
@@ -0,0 +1,236 @@
+# features/email_threads/email_threads.py
+import re
+from email.utils import parsedate_tz, mktime_tz
+
+_MESSAGE_ID = re.compile(r'<[^<>\s]+>')
+_REPLY_PREFIX = re.compile(r'^\s*(?:(?:re|fwd?|aw|sv|antw)(?:\[\d+\])?\s*:\s*|\[[^\]]*\]\s*)+', re.IGNORECASE)
+
+
+def parse_message_ids(value):
+    """Message-IDs in a References / In-Reply-To header, in order"""
+    return _MESSAGE_ID.findall(value) if value else []
+
+
+def normalize_subject(subject):
+    """Subject without Re:/Fwd:/[list] prefixes, lower-cased, for grouping"""
+    subject = subject or ""
+    return " ".join(_REPLY_PREFIX.sub("", subject).split()).lower()
+
+
+def is_reply_subject(subject):
+    return bool(subject) and _REPLY_PREFIX.match(subject) is not None
+
+
+def message_timestamp(date_header):
+    """Seconds since the epoch from a Date header, 0 when unparsable"""
+    parsed = parsedate_tz(date_header) if date_header else None
+    if parsed is None:
+        return 0
+    try:
+        return mktime_tz(parsed)
+    except (OverflowError, ValueError):
+        return 0
+
+
+class Container:
+    """A node of the thread tree; `record` is None for referenced but unseen messages"""
+
+    __slots__ = ("message_id", "record", "parent", "children", "timestamp", "size", "latest")
+
+    def __init__(self, message_id):
+        self.message_id = message_id
+        self.record = None
+        self.parent = None
+        self.children = []
+        self.timestamp = 0
+        self.size = 0
+        self.latest = 0
+
+    def is_ancestor_of(self, other):
+        node = other
+        while node is not None:
+            if node is self:
+                return True
+            node = node.parent
+        return False
+
+    def root(self):
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node
+
+
+class ThreadIndex:
+    """Incremental JWZ-style conversation threading.
+
+    Every message is linked into the tree through its References and
+    In-Reply-To headers when it is added, so the cost of an update is the
+    length of its reference chain, not the size of the mailbox. Each node
+    keeps the message count and newest timestamp of its subtree, which
+    makes listing threads newest-first a sort of the roots only. Messages
+    without reference headers but with a "Re:" subject join the thread that
+    started with the same subject, as JWZ's subject grouping does.
+    """
+
+    def __init__(self):
+        self._containers = {}
+        self._roots = set()
+        self._subjects = {}
+        self._view = None
+
+    def __len__(self):
+        return sum(root.size for root in self._roots)
+
+    def update(self, records):
+        """Add or refresh many records; returns how many were new"""
+        added = 0
+        for record in records:
+            added += self.add(record)
+        return added
+
+    def add(self, record):
+        """Thread one record; returns False if it was already indexed (the record is refreshed)"""
+        get = record.get
+        message_id = self._message_id(record)
+        container = self._containers.get(message_id) or self._container(message_id)
+        if container.record is not None:
+            container.record = record
+            self._view = None
+            return False
+
+        container.record = record
+        timestamp = get("timestamp")
+        container.timestamp = timestamp if timestamp is not None else message_timestamp(get("date"))
+        self._adjust(container, 1, container.timestamp)
+
+        references = parse_message_ids(get("references"))
+        in_reply_to = get("in_reply_to")
+        if in_reply_to:
+            reply_to = parse_message_ids(in_reply_to)[:1]
+            if reply_to and (not references or references[-1] != reply_to[0]):
+                references += reply_to
+
+        parent = None
+        containers = self._containers
+        for reference in references:
+            if reference == message_id:
+                continue
+            node = containers.get(reference) or self._container(reference)
+            if parent is not None and node.parent is None and not node.is_ancestor_of(parent):
+                self._link(parent, node)
+            parent = node
+
+        if parent is not None:
+            if container.parent is not parent and not container.is_ancestor_of(parent):
+                self._unlink(container)
+                self._link(parent, container)
+        elif container.parent is None:
+            self._group_by_subject(container, get("subject"))
+        self._view = None
+        return True
+
+    def discard(self, record):
+        """Drop a message (e.g. expunged); its replies stay threaded under an empty node"""
+        container = self._containers.get(self._message_id(record))
+        if container is None or container.record is None:
+            return False
+        container.record = None
+        self._adjust(container, -1, None)
+        self._refresh_latest(container)
+        self._view = None
+        return True
+
+    def threads(self):
+        """Thread roots with messages, newest activity first"""
+        if self._view is None:
+            roots = [root for root in self._roots if root.size]
+            roots.sort(key=lambda root: root.latest, reverse=True)
+            self._view = roots
+        return self._view
+
+    def thread_of(self, record):
+        """Root container of the thread a record belongs to"""
+        container = self._containers.get(self._message_id(record))
+        return container.root() if container is not None else None
+
+    def _message_id(self, record):
+        message_id = (record.get("message_id") or "").strip()
+        if message_id:
+            return message_id
+        return f"<{record.get('folder')}/{record.get('uidvalidity')}/{record.get('uid') or record.get('id')}@local>"
+
+    def _container(self, message_id):
+        container = self._containers.get(message_id)
+        if container is None:
+            container = Container(message_id)
+            self._containers[message_id] = container
+            self._roots.add(container)
+        return container
+
+    def _link(self, parent, child):
+        child.parent = parent
+        parent.children.append(child)
+        self._roots.discard(child)
+        if child.size:
+            self._adjust(parent, child.size, child.latest)
+
+    def _unlink(self, child):
+        parent = child.parent
+        if parent is None:
+            return
+        parent.children.remove(child)
+        child.parent = None
+        self._roots.add(child)
+        if child.size:
+            self._adjust(parent, -child.size, None)
+            self._refresh_latest(parent)
+
+    def _adjust(self, node, size_delta, latest):
+        while node is not None:
+            node.size += size_delta
+            if latest is not None and latest > node.latest:
+                node.latest = latest
+            node = node.parent
+
+    def _refresh_latest(self, node):
+        while node is not None:
+            node.latest = max([node.timestamp if node.record is not None else 0] +
+                              [child.latest for child in node.children if child.size])
+            node = node.parent
+
+    def _group_by_subject(self, container, subject):
+        key = normalize_subject(subject)
+        if not key:
+            return
+        existing = self._subjects.get(key)
+        if existing is None or existing.record is None:
+            self._subjects[key] = container
+            return
+        if not is_reply_subject(subject):
+            return
+        root = existing.root()
+        if root is not container and not container.is_ancestor_of(root):
+            self._link(root, container)
+
+
+def flatten_thread(root):
+    """(depth, record) pairs of a thread in reading order; empty nodes are skipped"""
+    items = []
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if node.record is not None:
+            items.append((depth, node.record))
+            depth += 1
+        children = sorted(node.children, key=lambda child: child.timestamp or child.latest, reverse=True)
+        stack.extend((child, depth) for child in children)
+    return items
+
+
+def thread_subject(root):
+    """Subject of the thread's first message"""
+    node = root
+    while node.record is None and node.children:
+        node = min(node.children, key=lambda child: child.timestamp or child.latest)
+    return (node.record.get("subject") if node.record is not None else None) or "(No Subject)"
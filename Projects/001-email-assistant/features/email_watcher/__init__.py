@@ -0,0 +1,4 @@
+# features/email_watcher/init.py
+from .email_watcher import MailboxWatcher
+
+__all__ = ['MailboxWatcher']
\ No newline at end of file
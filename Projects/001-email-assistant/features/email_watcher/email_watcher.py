@@ -0,0 +1,154 @@
+# features/email_watcher/email_watcher.py
+import re
+import threading
+
+IDLE_TIMEOUT = 29 * 60
+DEFAULT_POLL_INTERVAL = 60
+
+_UNTAGGED_EVENT = re.compile(rb'^\* (\d+) (EXISTS|EXPUNGE|FETCH)\b', re.IGNORECASE)
+_LITERAL_SUFFIX = re.compile(rb'\{(\d+)\}\r?\n$')
+
+
+class MailboxWatcher(threading.Thread):
+    """Background IMAP IDLE listener (RFC 2177) with NOOP polling fallback.
+
+    Runs on its own connection from `connect()`. When the server reports
+    EXISTS, EXPUNGE or FETCH, IDLE is ended, `refresh(conn)` is called to
+    sync the folder incrementally and `on_update(records, events)` receives
+    the new list. IDLE is re-issued every 29 minutes as the RFC requires.
+    """
+
+    def __init__(self, connect, refresh, on_update, folder="INBOX",
+                 idle_timeout=IDLE_TIMEOUT, poll_interval=DEFAULT_POLL_INTERVAL, on_error=None):
+        super().__init__(name=f"imap-watcher-{folder}", daemon=True)
+        self.connect = connect
+        self.refresh = refresh
+        self.on_update = on_update
+        self.on_error = on_error
+        self.folder = folder
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.conn = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._idle_tag = None
+
+    def stop(self, timeout=5):
+        """Leave IDLE, stop the thread and log out"""
+        self._stopped.set()
+        self._end_idle()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def run(self):
+        try:
+            self.conn = self.connect()
+            records, error = self.refresh(self.conn)
+            if error:
+                raise RuntimeError(error)
+            supports_idle = "IDLE" in self.conn.capabilities
+
+            while not self._stopped.is_set():
+                if supports_idle:
+                    events, supports_idle = self._idle_cycle()
+                else:
+                    events = self._poll_cycle()
+
+                if events and not self._stopped.is_set():
+                    records, error = self.refresh(self.conn)
+                    if error:
+                        raise RuntimeError(error)
+                    self.on_update(records, events)
+
+        except Exception as e:
+            if not self._stopped.is_set() and self.on_error:
+                self.on_error(e)
+        finally:
+            try:
+                if self.conn is not None:
+                    self.conn.logout()
+            except Exception:
+                pass
+
+    def _idle_cycle(self):
+        """Run one IDLE command until an event, the re-IDLE timer or stop"""
+        conn = self.conn
+        tag = conn._new_tag()
+        conn.send(tag + b" IDLE\r\n")
+
+        events = []
+        while True:
+            line = conn.readline()
+            if not line:
+                raise conn.abort("connection closed before IDLE")
+            if line.startswith(b"+"):
+                break
+            if line.startswith(tag):
+                return events, False
+            match = _UNTAGGED_EVENT.match(line)
+            if match:
+                events.append((match.group(2).decode().upper(), int(match.group(1))))
+
+        with self._lock:
+            self._idle_tag = tag
+        if self._stopped.is_set():
+            self._end_idle()
+        timer = threading.Timer(self.idle_timeout, self._end_idle)
+        timer.daemon = True
+        timer.start()
+
+        if events:
+            self._end_idle()
+        try:
+            while True:
+                line = conn.readline()
+                if not line:
+                    raise conn.abort("connection closed during IDLE")
+                if line.startswith(tag):
+                    break
+
+                literal = _LITERAL_SUFFIX.search(line)
+                if literal:
+                    conn.read(int(literal.group(1)))
+                    conn.readline()
+
+                match = _UNTAGGED_EVENT.match(line)
+                if match:
+                    events.append((match.group(2).decode().upper(), int(match.group(1))))
+                    self._end_idle()
+        finally:
+            timer.cancel()
+            with self._lock:
+                self._idle_tag = None
+
+        return events, True
+
+    def _end_idle(self):
+        """Send DONE if an IDLE command is active; safe from any thread"""
+        with self._lock:
+            if self._idle_tag is None or self.conn is None:
+                return
+            self._idle_tag = None
+            try:
+                self.conn.send(b"DONE\r\n")
+            except OSError:
+                pass
+
+    def _poll_cycle(self):
+        """Wait poll_interval, then NOOP and collect mailbox events"""
+        if self._stopped.wait(self.poll_interval):
+            return []
+
+        for name in ("EXISTS", "EXPUNGE", "FETCH"):
+            self.conn.response(name)
+        status, _ = self.conn.noop()
+        if status != "OK":
+            raise self.conn.error("NOOP failed")
+
+        events = []
+        for name in ("EXISTS", "EXPUNGE", "FETCH"):
+            _, data = self.conn.response(name)
+            for item in data:
+                if item is not None:
+                    events.append((name, int(item.split()[0])))
+        return events
@@ -0,0 +1,4 @@
+# features/headless/init.py
+from .headless import run_command, build_parser
+
+__all__ = ['run_command', 'build_parser']
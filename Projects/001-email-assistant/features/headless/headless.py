@@ -0,0 +1,309 @@
+# features/headless/headless.py
+import argparse
+import json
+import os
+import sys
+
+from utils.config import load_config, get_int_setting, EMAIL_CONFIG_FILE, DEFAULT_PAGE_SIZE
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+RECORD_FIELDS = ("uid", "folder", "message_id", "in_reply_to", "sender", "subject", "date", "flags", "size", "preview")
+
+
+class CommandError(Exception):
+    """Failure reported as {"error": ...} with a non-zero exit code"""
+
+
+def build_parser():
+    """Argument parser for the list/read/send/reply/sync/export/import subcommands"""
+    parser = argparse.ArgumentParser(prog="main.py", description="Email client commands with JSON output. "
+                                     "Run without arguments for the interactive client.",
+                                     epilog="Put --profile (or --profile-trace PATH) before the command to "
+                                     "print per-command timings and bytes on stderr.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="newest messages of a folder")
+    list_parser.add_argument("--folder", default="INBOX")
+    list_parser.add_argument("--limit", type=int, default=None, help="number of messages (default: page_size)")
+    list_parser.add_argument("--offline", action="store_true", help="read the local cache only")
+
+    read_parser = commands.add_parser("read", help="one message including its body")
+    read_parser.add_argument("uid", type=int)
+    read_parser.add_argument("--folder", default="INBOX")
+    read_parser.add_argument("--offline", action="store_true", help="read the local cache only")
+
+    send_parser = commands.add_parser("send", help="send a new plain-text message")
+    send_parser.add_argument("--to", required=True)
+    send_parser.add_argument("--subject", required=True)
+    send_parser.add_argument("--body", help="message text (default: read stdin)")
+
+    reply_parser = commands.add_parser("reply", help="reply to a message")
+    reply_parser.add_argument("uid", type=int)
+    reply_parser.add_argument("--folder", default="INBOX")
+    reply_parser.add_argument("--body", help="reply text (default: read stdin)")
+
+    sync_parser = commands.add_parser("sync", help="update the local cache of a folder")
+    sync_parser.add_argument("--folder", default="INBOX")
+    sync_parser.add_argument("--limit", type=int, default=None, help="messages to report (default: page_size)")
+
+    export_parser = commands.add_parser("export", help="write a folder to an mbox file or Maildir directory")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--folder", default="INBOX")
+    export_parser.add_argument("--format", choices=("mbox", "maildir"), default="mbox")
+    export_parser.add_argument("--compress", choices=("gzip", "zstd"), default=None,
+                               help="compress the mbox file or each Maildir message (zstd needs zstandard)")
+
+    import_parser = commands.add_parser("import", help="load an mbox file or Maildir into the local cache")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--folder", default=None, help="cache folder (default: Archive/<name of path>)")
+    return parser
+
+
+def run_command(argv):
+    """Run one subcommand, print its JSON result and return the exit code.
+
+    Only argparse, json and the config helpers are loaded up front; protocol,
+    MIME and cache modules are imported by the command that needs them and
+    the UI libraries (questionary, rich) never are.
+    """
+    args = build_parser().parse_args(argv)
+    handler = COMMANDS[args.command]
+    try:
+        result = handler(args, load_config(EMAIL_CONFIG_FILE))
+    except CommandError as e:
+        write_json({"error": str(e)})
+        return EXIT_ERROR
+    except Exception as e:
+        write_json({"error": f"{type(e).__name__}: {e}"})
+        return EXIT_ERROR
+    write_json(result)
+    return EXIT_OK
+
+
+def write_json(payload):
+    """Print one JSON document per line on stdout"""
+    json.dump(payload, sys.stdout, ensure_ascii=False, default=str)
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+def record_to_json(record, include_body=False):
+    """Plain JSON fields of an email record"""
+    data = {field: record.get(field) for field in RECORD_FIELDS}
+    if include_body:
+        data["body"] = record.get("body")
+    return data
+
+
+def command_list(args, config):
+    """Newest messages, synced through the cache or read from it with --offline"""
+    limit = args.limit or get_int_setting(config, "page_size", DEFAULT_PAGE_SIZE)
+    if args.offline:
+        cache = _open_cache()
+        try:
+            records = _cached_records(cache, args.folder, limit, account=config.get("email_address"))
+        finally:
+            cache.close()
+        return {"folder": args.folder, "offline": True, "emails": [record_to_json(r) for r in records]}
+
+    records = _synced_records(config, args.folder, limit)
+    return {"folder": args.folder, "offline": False, "emails": [record_to_json(r) for r in records]}
+
+
+def command_sync(args, config):
+    """Incremental cache sync of a folder"""
+    limit = args.limit or get_int_setting(config, "page_size", DEFAULT_PAGE_SIZE)
+    records = _synced_records(config, args.folder, limit)
+    return {"folder": args.folder, "newest_uids": [r["uid"] for r in records]}
+
+
+def command_read(args, config):
+    """One message with its body, downloading the body on first read"""
+    record = _load_message(config, args.folder, args.uid, args.offline)
+    return record_to_json(record, include_body=True)
+
+
+def command_send(args, config):
+    """Send a plain-text message synchronously so the exit code reflects delivery"""
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    sender_email = _require_account(config)
+    body = _text_argument(args.body)
+    msg = MIMEMultipart()
+    msg['From'] = sender_email
+    msg['To'] = args.to
+    msg['Subject'] = args.subject
+    msg.attach(MIMEText(body, 'plain'))
+
+    session = _open_session(config)
+    try:
+        refused = session.send_message(msg)
+    finally:
+        session.close()
+    return {"sent": True, "to": args.to, "refused": sorted(refused or {})}
+
+
+def command_reply(args, config):
+    """Reply to a message by UID with the same threading headers as the interactive reply"""
+    from features.email_replier.email_replier import send_reply
+
+    sender_email = _require_account(config)
+    body = _text_argument(args.body)
+    session = _open_session(config)
+    try:
+        record = _load_message(config, args.folder, args.uid, offline=False, session=session)
+        success, error = send_reply(session, record, body, sender_email)
+    finally:
+        session.close()
+    if not success:
+        raise CommandError(f"Send failed: {error}")
+    return {"sent": True, "to": record.get("sender"), "subject": f"Re: {record.get('subject')}",
+            "in_reply_to": record.get("message_id")}
+
+
+def command_export(args, config):
+    """Stream a folder to a local archive in batched UID FETCHes"""
+    from features.archive.archive import export_folder
+
+    session = _open_session(config)
+    try:
+        count, error = session.run_imap(lambda conn: export_folder(
+            conn, args.folder, args.path, args.format, args.compress), idempotent=False)
+    finally:
+        session.close()
+    if error:
+        raise CommandError(error)
+    return {"folder": args.folder, "path": args.path, "format": args.format,
+            "compression": args.compress, "exported": count}
+
+
+def command_import(args, config):
+    """Parse a local archive into the cache so it can be listed and searched offline"""
+    from features.archive.archive import import_archive
+
+    if not os.path.exists(args.path):
+        raise CommandError(f"No such file or directory: {args.path}")
+    folder = args.folder or "Archive/" + os.path.basename(os.path.normpath(args.path))
+    cache = _open_cache()
+    try:
+        count, error = import_archive(args.path, cache, folder)
+    finally:
+        cache.close()
+    if error:
+        raise CommandError(error)
+    return {"path": args.path, "folder": folder, "imported": count}
+
+
+COMMANDS = {
+    "list": command_list,
+    "read": command_read,
+    "send": command_send,
+    "reply": command_reply,
+    "sync": command_sync,
+    "export": command_export,
+    "import": command_import,
+}
+
+
+def _require_account(config):
+    required_fields = ["email_address", "app_password", "imap_server", "imap_port", "smtp_server", "smtp_port"]
+    if not config or not all(config.get(field) for field in required_fields):
+        raise CommandError("Incomplete email configuration; run the interactive client to configure it")
+    return config["email_address"]
+
+
+def _text_argument(value):
+    text = value if value is not None else sys.stdin.read()
+    if not text.strip():
+        raise CommandError("Message body is empty")
+    return text
+
+
+def _open_session(config):
+    from features.mail_session.mail_session import MailSession
+
+    _require_account(config)
+    return MailSession(config)
+
+
+def _open_cache():
+    from utils.mail_cache import open_mail_cache
+    return open_mail_cache()
+
+
+def _cached_records(cache, folder, limit, before_uid=None, account=None):
+    from utils.mail_cache import get_folder_state, load_records
+
+    uidvalidity, _ = get_folder_state(cache, folder, account)
+    if uidvalidity is None:
+        return []
+    return load_records(cache, folder, uidvalidity, limit=limit, before_uid=before_uid)
+
+
+def _synced_records(config, folder, limit):
+    from features.email_sync.email_sync import sync_folder
+    from features.email_reader.email_reader import DEFAULT_FETCH_BATCH_SIZE, DEFAULT_PIPELINE_DEPTH
+
+    batch_size = get_int_setting(config, "fetch_batch_size", DEFAULT_FETCH_BATCH_SIZE)
+    pipeline_depth = get_int_setting(config, "pipeline_depth", DEFAULT_PIPELINE_DEPTH)
+    session = _open_session(config)
+    cache = _open_cache()
+    try:
+        records, error = session.run_imap(lambda conn: sync_folder(
+            conn, cache, folder=folder, num_emails=limit, batch_size=batch_size, pipeline_depth=pipeline_depth,
+            account=config.get("email_address")))
+    finally:
+        cache.close()
+        session.close()
+    if error:
+        raise CommandError(error)
+    return records
+
+
+def _load_message(config, folder, uid, offline, session=None):
+    """Cached record with body, downloading what is missing unless offline"""
+    cache = _open_cache()
+    try:
+        cached = _cached_records(cache, folder, 1, before_uid=uid + 1, account=config.get("email_address"))
+        record = cached[0] if cached and cached[0]["uid"] == uid else None
+        if record is not None:
+            from features.email_sync.email_sync import load_cached_body
+            if load_cached_body(cache, record):
+                return record
+        if offline or (record is not None and record.get("local")):
+            raise CommandError(f"UID {uid} in {folder} is not cached with its body")
+
+        own_session = session is None
+        session = session or _open_session(config)
+        try:
+            record, error = session.run_imap(lambda conn: _fetch_message(conn, folder, uid, record), folder=folder)
+        finally:
+            if own_session:
+                session.close()
+        if error:
+            raise CommandError(error)
+
+        from features.email_sync.email_sync import cache_email_body
+        cache_email_body(cache, record)
+        return record
+    finally:
+        cache.close()
+
+
+def _fetch_message(imap_conn, folder, uid, record=None):
+    from features.email_reader.email_reader import fetch_email_headers_by_uid, load_email_body, select_folder
+
+    if record is None:
+        status, _ = select_folder(imap_conn, folder)
+        if status != "OK":
+            return None, f"Cannot select folder: {folder}"
+        records, error = fetch_email_headers_by_uid(imap_conn, [uid])
+        if error:
+            return None, error
+        if not records:
+            return None, f"No message with UID {uid} in {folder}"
+        record = records[0]
+        record["folder"] = folder
+    return load_email_body(imap_conn, record)
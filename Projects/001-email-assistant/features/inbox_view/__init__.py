@@ -0,0 +1,4 @@
+# features/inbox_view/init.py
+from .inbox_view import PagedInbox, format_row, fetch_cursor_page
+
+__all__ = ['PagedInbox', 'format_row', 'fetch_cursor_page']
@@ -0,0 +1,170 @@
+# features/inbox_view/inbox_view.py
+import threading
+from collections import OrderedDict
+
+from features.email_reader.email_reader import ensure_folder_selected, DEFAULT_FETCH_BATCH_SIZE, DEFAULT_PIPELINE_DEPTH
+from features.email_search.email_search import fetch_search_page, next_page, previous_page, page_label
+
+DEFAULT_CACHED_PAGES = 8
+ROW_SENDER_WIDTH = 20
+ROW_DATE_WIDTH = 24
+
+
+def fetch_cursor_page(imap_conn, cursor, batch_size=DEFAULT_FETCH_BATCH_SIZE, pipeline_depth=DEFAULT_PIPELINE_DEPTH):
+    """Select the cursor's folder if needed and fetch its current page; returns (records, error)"""
+    status, _ = ensure_folder_selected(imap_conn, cursor["folder"])
+    if status != "OK":
+        return None, f"Cannot select folder: {cursor['folder']}"
+    return fetch_search_page(imap_conn, cursor, batch_size, pipeline_depth)
+
+
+class PagedInbox:
+    """Search cursor with a page cache and next-page prefetch.
+
+    `run_imap(operation)` runs operation(conn) on an IMAP connection, e.g.
+    MailSession.run_imap, and `open_cursor(conn)` returns (cursor, error)
+    like open_search. start() opens the cursor on a worker thread; after
+    that and after every move the next page is fetched in the background,
+    so paging forward while the user reads is served from memory. A move
+    to a page still being prefetched waits for that fetch instead of
+    issuing a second one. The newest `max_pages` pages are kept;
+    invalidate() drops them when the mailbox changed underneath.
+    """
+
+    def __init__(self, run_imap, open_cursor, batch_size=DEFAULT_FETCH_BATCH_SIZE,
+                 pipeline_depth=DEFAULT_PIPELINE_DEPTH, max_pages=DEFAULT_CACHED_PAGES):
+        self.run_imap = run_imap
+        self.open_cursor = open_cursor
+        self.cursor = None
+        self.error = None
+        self.batch_size = batch_size
+        self.pipeline_depth = pipeline_depth
+        self.max_pages = max(2, max_pages)
+        self.stats = {"hits": 0, "waits": 0, "fetches": 0, "prefetches": 0}
+        self._pages = OrderedDict()
+        self._inflight = {}
+        self._generation = 0
+        self._opened = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, prefetch=True):
+        """Open the cursor on a worker thread, then prefetch the second page if asked"""
+        threading.Thread(target=self._open, args=(prefetch,), name="inbox-cursor", daemon=True).start()
+        return self
+
+    def wait_open(self, timeout=None):
+        """Block until the cursor is open; returns the error or None"""
+        if not self._opened.wait(timeout):
+            return "Timed out opening the mailbox"
+        return self.error
+
+    def label(self):
+        return page_label(self.cursor)
+
+    def page(self):
+        """Records of the current page from the cache, a running prefetch or the server; (records, error)"""
+        offset = self.cursor["offset"]
+        with self._lock:
+            records = self._cached(offset)
+            done = self._inflight.get(offset)
+        if records is not None:
+            self.stats["hits"] += 1
+            return records, None
+        if done is not None:
+            self.stats["waits"] += 1
+            done.wait()
+            with self._lock:
+                records = self._cached(offset)
+            if records is not None:
+                return records, None
+
+        self.stats["fetches"] += 1
+        generation = self._generation
+        records, error = self._fetch(offset)
+        if error:
+            return None, error
+        self._store(generation, offset, records)
+        return records, None
+
+    def move(self, forward=True):
+        """Go one page older (forward) or newer; returns False at either end"""
+        return next_page(self.cursor) if forward else previous_page(self.cursor)
+
+    def prefetch_next(self):
+        """Fetch the page after the current one on a worker thread unless it is cached or running"""
+        offset = self.cursor["offset"] + self.cursor["page_size"]
+        if offset >= self.cursor["total"]:
+            return False
+        with self._lock:
+            if offset in self._pages or offset in self._inflight:
+                return False
+            done = self._inflight[offset] = threading.Event()
+            generation = self._generation
+        self.stats["prefetches"] += 1
+        threading.Thread(target=self._prefetch, args=(generation, offset, done),
+                         name="inbox-prefetch", daemon=True).start()
+        return True
+
+    def invalidate(self):
+        """Forget cached pages; running prefetches finish but their results are dropped"""
+        with self._lock:
+            self._generation += 1
+            self._pages.clear()
+
+    def _open(self, prefetch):
+        try:
+            self.cursor, self.error = self.run_imap(self.open_cursor)
+        except Exception as e:
+            self.error = f"Search error: {e}"
+        finally:
+            self._opened.set()
+        if prefetch and self.cursor is not None:
+            self.prefetch_next()
+
+    def _prefetch(self, generation, offset, done):
+        try:
+            records, error = self._fetch(offset)
+            if not error:
+                self._store(generation, offset, records)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._inflight.pop(offset, None)
+            done.set()
+
+    def _fetch(self, offset):
+        page_cursor = dict(self.cursor, offset=offset)
+        return self.run_imap(lambda conn: fetch_cursor_page(conn, page_cursor, self.batch_size, self.pipeline_depth))
+
+    def _cached(self, offset):
+        records = self._pages.get(offset)
+        if records is not None:
+            self._pages.move_to_end(offset)
+        return records
+
+    def _store(self, generation, offset, records):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._pages[offset] = records
+            self._pages.move_to_end(offset)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+
+def format_row(number, rendered, width, depth=0):
+    """One fixed-width list line: number, sender, subject and date, cut to the terminal width"""
+    indent = "  " * depth + ("↳ " if depth else "")
+    sender = _fit(rendered["sender"], ROW_SENDER_WIDTH)
+    date = _fit(rendered["date"], ROW_DATE_WIDTH)
+    prefix = f"{number:>3}. {indent}{sender}  "
+    subject_width = max(10, width - len(prefix) - ROW_DATE_WIDTH - 4)
+    return f"{prefix}{_fit(rendered['subject'], subject_width)}  {date}"
+
+
+def _fit(text, width):
+    text = " ".join((text or "").split())
+    if len(text) > width:
+        return text[:width - 1] + "…"
+    return text.ljust(width)
@@ -0,0 +1,4 @@
+# features/list_index/init.py
+from .list_index import ListIndex, SORT_KEYS, sender_key, parse_day
+
+__all__ = ['ListIndex', 'SORT_KEYS', 'sender_key', 'parse_day']
@@ -0,0 +1,138 @@
+# features/list_index/list_index.py
+import re
+import sys
+from array import array
+from datetime import datetime, timedelta
+from email.utils import parseaddr
+
+from utils.helpers import date_timestamp
+
+SORT_KEYS = ("date", "sender", "size")
+# newest and largest first, senders A-Z
+DESCENDING_BY_DEFAULT = frozenset({"date", "size"})
+FLAG_BITS = {"\\Seen": 1, "\\Flagged": 2, "\\Answered": 4}
+SEEN = FLAG_BITS["\\Seen"]
+
+_ANGLE_ADDRESS = re.compile(r'<([^<>]*)>\s*$')
+
+
+def sender_key(sender):
+    """Lower-cased address of a From header, for sorting and matching"""
+    sender = sender or ""
+    match = _ANGLE_ADDRESS.search(sender)
+    if match:
+        address = match.group(1)
+    else:
+        name, address = parseaddr(sender)
+        address = address or name or sender
+    return address.strip().lower()
+
+
+def parse_day(text):
+    """datetime.date of a YYYY-MM-DD string, None when empty; raises ValueError otherwise"""
+    text = (text or "").strip()
+    return datetime.strptime(text, "%Y-%m-%d").date() if text else None
+
+
+def day_start(day, days=0):
+    """Timestamp of local midnight at the start of a date, `days` later"""
+    return datetime.combine(day + timedelta(days=days), datetime.min.time()).timestamp()
+
+
+class ListIndex:
+    """Sort and filter keys of a message list, held in compact arrays.
+
+    Each record's timestamp, size, flags and normalized sender address are
+    read once when it is added: timestamps and sizes go into array('d') and
+    array('q'), flags into one byte each of a bytearray, senders into a
+    list of interned strings. The permutation for a sort key is built on
+    first use and kept until more records are added, so switching between
+    sorts and filters is a pass over positions, with no network and no
+    header parsing.
+    """
+
+    def __init__(self, records=()):
+        self.records = []
+        self.timestamps = array("d")
+        self.sizes = array("q")
+        self.flags = bytearray()
+        self.senders = []
+        self._orders = {}
+        self.extend(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def extend(self, records):
+        """Index more records; sort orders are rebuilt on next use"""
+        for record in records:
+            timestamp = record.get("timestamp")
+            if timestamp is None:
+                # records cached before timestamps were stored
+                timestamp = date_timestamp(record.get("date"))
+            bits = 0
+            for flag in record.get("flags") or ():
+                bits |= FLAG_BITS.get(flag, 0)
+            self.records.append(record)
+            self.timestamps.append(timestamp or 0.0)
+            self.sizes.append(int(record.get("size") or 0))
+            self.flags.append(bits)
+            self.senders.append(sys.intern(sender_key(record.get("sender"))))
+        self._orders.clear()
+
+    def order(self, sort="date", descending=None, unread=False, sender=None, since=None, until=None):
+        """Positions of the records that pass the filters, in sort order.
+
+        sort is "date", "sender", "size", or None for the order the records
+        were added in. since and until are datetime.date values, both
+        inclusive, in local time; sender matches part of the address.
+        """
+        positions = self._sorted(sort)
+        if descending is None:
+            descending = sort in DESCENDING_BY_DEFAULT
+        if descending:
+            positions = reversed(positions)
+
+        low = day_start(since) if since else None
+        high = day_start(until, 1) if until else None
+        needle = (sender or "").strip().lower()
+        if not (unread or needle) and low is None and high is None:
+            return list(positions)
+
+        flags, timestamps, senders = self.flags, self.timestamps, self.senders
+        matched = []
+        for position in positions:
+            if unread and flags[position] & SEEN:
+                continue
+            if low is not None and timestamps[position] < low:
+                continue
+            if high is not None and timestamps[position] >= high:
+                continue
+            if needle and needle not in senders[position]:
+                continue
+            matched.append(position)
+        return matched
+
+    def view(self, **options):
+        """Records in the order and with the filters of order(**options)"""
+        records = self.records
+        return [records[position] for position in self.order(**options)]
+
+    def _sorted(self, sort):
+        if sort is None:
+            return range(len(self.records))
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        order = self._orders.get(sort)
+        if order is None:
+            positions = range(len(self.records))
+            if sort == "sender":
+                # newest first within each sender: the second sort is stable
+                timestamps = self.timestamps
+                positions = sorted(positions, key=lambda position: -timestamps[position])
+                positions.sort(key=self.senders.__getitem__)
+            else:
+                keys = self.timestamps if sort == "date" else self.sizes
+                positions = sorted(positions, key=keys.__getitem__)
+            order = self._orders[sort] = array("l", positions)
+        return order
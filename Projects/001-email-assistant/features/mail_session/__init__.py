@@ -0,0 +1,4 @@
+# features/mail_session/init.py
+from .mail_session import MailSession
+
+__all__ = ['MailSession']
\ No newline at end of file
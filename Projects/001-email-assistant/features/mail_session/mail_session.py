@@ -0,0 +1,271 @@
+# features/mail_session/mail_session.py
+import imaplib
+import smtplib
+import ssl
+import threading
+import time
+
+from features.email_reader.email_reader import select_folder
+from utils.profiler import profiler, instrument_imap, instrument_smtp
+
+DEFAULT_KEEPALIVE_INTERVAL = 120
+DEFAULT_TIMEOUT = 30
+
+IMAP_FIELDS = ("email_address", "app_password", "imap_server", "imap_port")
+SMTP_FIELDS = ("email_address", "app_password", "smtp_server", "smtp_port")
+IMAP_DROP_ERRORS = (imaplib.IMAP4.abort, OSError, EOFError)
+SMTP_DROP_ERRORS = (smtplib.SMTPServerDisconnected, OSError)
+
+
+def _is_smtp_drop(error):
+    """A lost SMTP connection, as opposed to an error reply from the server"""
+    return isinstance(error, smtplib.SMTPServerDisconnected) or not isinstance(error, smtplib.SMTPException)
+
+
+def _is_error_result(result):
+    """Check for the (result, error) tuples returned by the reader functions"""
+    return isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], str) and bool(result[1])
+
+
+class _ResumingContext:
+    """SSLContext stand-in that offers a cached TLS session on every handshake"""
+
+    def __init__(self, context, session):
+        self.context = context
+        self.session = session
+
+    def wrap_socket(self, sock, server_hostname=None, **kwargs):
+        try:
+            return self.context.wrap_socket(sock, server_hostname=server_hostname,
+                                            session=self.session, **kwargs)
+        except ValueError:
+            return self.context.wrap_socket(sock, server_hostname=server_hostname, **kwargs)
+
+
+class MailSession:
+    """Owns the IMAP and SMTP connections of one account.
+
+    Connections are opened on first use, kept alive with NOOP from a
+    background thread and reopened transparently after a drop. TLS sessions
+    are cached per protocol so reconnects and extra connections can resume
+    instead of doing a full handshake. The object also quacks like an SMTP
+    connection (`send_message`) so existing senders can take it directly.
+    """
+
+    def __init__(self, config, keepalive_interval=DEFAULT_KEEPALIVE_INTERVAL, timeout=DEFAULT_TIMEOUT):
+        self.config = dict(config)
+        self.keepalive_interval = keepalive_interval
+        self.timeout = timeout
+        self.ssl_context = ssl.create_default_context()
+        self.stats = {"imap_connects": 0, "smtp_connects": 0, "tls_resumed": 0, "retries": 0}
+        self._imap = None
+        self._smtp = None
+        self._tls_sessions = {}
+        self._imap_lock = threading.RLock()
+        self._smtp_lock = threading.RLock()
+        self._last_used = {"imap": 0.0, "smtp": 0.0}
+        self._stopped = threading.Event()
+        self._keepalive = None
+
+    def open_imap(self):
+        """Open an extra authenticated IMAP connection owned by the caller"""
+        context = _ResumingContext(self.ssl_context, self._tls_sessions.get("imap"))
+        with profiler.span("connect+TLS", kind="imap"):
+            conn = imaplib.IMAP4_SSL(self.config["imap_server"], int(self.config["imap_port"]),
+                                     ssl_context=context, timeout=self.timeout)
+        instrument_imap(conn)
+        conn.login(self.config["email_address"], self.config["app_password"])
+        self._remember_tls_session("imap", conn.sock)
+        self.stats["imap_connects"] += 1
+        return conn
+
+    def open_smtp(self):
+        """Open an extra authenticated SMTP connection owned by the caller"""
+        context = _ResumingContext(self.ssl_context, self._tls_sessions.get("smtp"))
+        host, port = self.config["smtp_server"], int(self.config["smtp_port"])
+        with profiler.span("connect+TLS", kind="smtp"):
+            if port == smtplib.SMTP_SSL_PORT:
+                server = smtplib.SMTP_SSL(host, port, context=context, timeout=self.timeout)
+            else:
+                server = instrument_smtp(smtplib.SMTP(host, port, timeout=self.timeout))
+                server.starttls(context=context)
+        instrument_smtp(server)
+        server.login(self.config["email_address"], self.config["app_password"])
+        self._remember_tls_session("smtp", server.sock)
+        self.stats["smtp_connects"] += 1
+        return server
+
+    def imap(self):
+        """Return the shared IMAP connection, connecting if needed"""
+        with self._imap_lock:
+            if self._imap is None:
+                self._imap = self.open_imap()
+            self._last_used["imap"] = time.monotonic()
+            return self._imap
+
+    def smtp(self):
+        """Return the shared SMTP connection, connecting if needed"""
+        with self._smtp_lock:
+            if self._smtp is None:
+                self._smtp = self.open_smtp()
+            self._last_used["smtp"] = time.monotonic()
+            return self._smtp
+
+    def run_imap(self, operation, idempotent=True, folder=None):
+        """Run operation(conn) on the shared IMAP connection.
+
+        After a dropped connection the session reconnects, re-selects
+        `folder` when given, and retries once if the operation is idempotent.
+        """
+        with self._imap_lock:
+            try:
+                conn = self.imap()
+                result = operation(conn)
+                if not idempotent or not _is_error_result(result) or self._imap_alive(conn):
+                    return result
+            except IMAP_DROP_ERRORS:
+                if not idempotent:
+                    self._drop_imap()
+                    raise
+            self._drop_imap()
+            self.stats["retries"] += 1
+            conn = self.imap()
+            if folder:
+                select_folder(conn, folder)
+            return operation(conn)
+
+    def run_smtp(self, operation, idempotent=True):
+        """Run operation(server) on the shared SMTP connection.
+
+        After a dropped connection the session reconnects and retries once
+        if the operation is idempotent. Error replies (SMTPException other
+        than SMTPServerDisconnected) are raised without a retry.
+        """
+        with self._smtp_lock:
+            try:
+                return operation(self.smtp())
+            except SMTP_DROP_ERRORS as error:
+                if not _is_smtp_drop(error):
+                    raise
+                self._drop_smtp()
+                if not idempotent:
+                    raise
+            self.stats["retries"] += 1
+            return operation(self.smtp())
+
+    def send_message(self, msg, *args, **kwargs):
+        """smtplib-compatible send that survives idle SMTP timeouts.
+
+        A reused connection is checked with NOOP (and reopened if it has
+        dropped) before MAIL FROM; the message itself is sent at most once,
+        since a failure after DATA may still have delivered it.
+        """
+        with self._smtp_lock:
+            if self._smtp is not None:
+                self.run_smtp(self._smtp_noop)
+            return self.run_smtp(lambda server: server.send_message(msg, *args, **kwargs), idempotent=False)
+
+    def apply_config(self, config):
+        """Adopt edited settings of the same account (a ConfigStore subscriber).
+
+        Connections whose server or credentials changed are closed and
+        reopened with the new settings on next use.
+        """
+        if config.get("email_address") != self.config.get("email_address"):
+            return
+        old, self.config = self.config, dict(config)
+        if any(old.get(field) != self.config.get(field) for field in IMAP_FIELDS):
+            with self._imap_lock:
+                self._tls_sessions.pop("imap", None)
+                self._drop_imap()
+        if any(old.get(field) != self.config.get(field) for field in SMTP_FIELDS):
+            with self._smtp_lock:
+                self._tls_sessions.pop("smtp", None)
+                self._drop_smtp()
+
+    def start_keepalive(self):
+        """Start the background NOOP thread"""
+        if self._keepalive is None:
+            self._keepalive = threading.Thread(target=self._keepalive_loop, name="mail-keepalive", daemon=True)
+            self._keepalive.start()
+
+    def close(self):
+        """Stop the keepalive thread and log out of both servers"""
+        self._stopped.set()
+        with self._imap_lock:
+            if self._imap is not None:
+                try:
+                    self._imap.logout()
+                except Exception:
+                    pass
+                self._imap = None
+        with self._smtp_lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except Exception:
+                    pass
+                self._smtp = None
+
+    def _keepalive_loop(self):
+        while not self._stopped.wait(self.keepalive_interval / 2):
+            now = time.monotonic()
+            if self._imap is not None and now - self._last_used["imap"] >= self.keepalive_interval / 2:
+                self._noop(self._imap_lock, "imap")
+            if self._smtp is not None and now - self._last_used["smtp"] >= self.keepalive_interval / 2:
+                self._noop(self._smtp_lock, "smtp")
+
+    def _noop(self, lock, protocol):
+        if not lock.acquire(blocking=False):
+            return
+        try:
+            if protocol == "imap" and self._imap is not None:
+                self._imap.noop()
+            elif protocol == "smtp" and self._smtp is not None:
+                code, _ = self._smtp.noop()
+                if code != 250:
+                    self._drop_smtp()
+            self._last_used[protocol] = time.monotonic()
+        except IMAP_DROP_ERRORS + SMTP_DROP_ERRORS:
+            if protocol == "imap":
+                self._drop_imap()
+            else:
+                self._drop_smtp()
+        finally:
+            lock.release()
+
+    def _imap_alive(self, conn):
+        try:
+            status, _ = conn.noop()
+            return status == "OK"
+        except IMAP_DROP_ERRORS:
+            return False
+
+    def _smtp_noop(self, server):
+        code, reply = server.noop()
+        if code != 250:
+            raise smtplib.SMTPServerDisconnected(f"NOOP failed: {code} {reply!r}")
+
+    def _drop_imap(self):
+        conn, self._imap = self._imap, None
+        if conn is not None:
+            try:
+                conn.shutdown()
+            except Exception:
+                pass
+
+    def _drop_smtp(self):
+        server, self._smtp = self._smtp, None
+        if server is not None:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _remember_tls_session(self, protocol, sock):
+        session = getattr(sock, "session", None)
+        if session is None:
+            return
+        if getattr(sock, "session_reused", False):
+            self.stats["tls_resumed"] += 1
+        self._tls_sessions[protocol] = session
@@ -0,0 +1,4 @@
+# features/multi_fetch/init.py
+from .multi_fetch import fetch_unified_inbox, get_accounts
+
+__all__ = ['fetch_unified_inbox', 'get_accounts']
\ No newline at end of file
@@ -0,0 +1,119 @@
+# features/multi_fetch/multi_fetch.py
+import asyncio
+from collections.abc import Mapping
+
+from features.email_reader.email_reader import fetch_emails
+from utils.helpers import date_timestamp
+
+DEFAULT_MAX_CONNECTIONS = 4
+DEFAULT_FOLDERS = ("INBOX",)
+ACCOUNT_FIELDS = ("email_address", "app_password", "imap_server", "imap_port", "smtp_server", "smtp_port")
+SERVER_FIELDS = ("imap_server", "imap_port", "smtp_server", "smtp_port")
+
+def get_accounts(config):
+    """Return (accounts, errors): the primary account plus any extra `accounts` entries.
+
+    Extra accounts inherit server settings they do not override from the
+    primary account, never its password: an extra account without its own
+    `app_password` is left out and reported in errors, keyed by address.
+    """
+    if not config.get("email_address"):
+        return [], {}
+
+    primary = {field: config.get(field) for field in ACCOUNT_FIELDS}
+    accounts = [primary]
+    errors = {}
+    for extra in config.get("accounts") or []:
+        if not (isinstance(extra, Mapping) and extra.get("email_address")):
+            continue
+        if not extra.get("app_password"):
+            errors[extra["email_address"]] = "No app_password set for this account; skipped"
+            continue
+        account = {field: extra.get(field) for field in ACCOUNT_FIELDS}
+        for field in SERVER_FIELDS:
+            account[field] = account[field] or primary.get(field)
+        accounts.append(account)
+    return accounts, errors
+
+def get_unified_folders(config):
+    """Read the comma separated `unified_folders` setting"""
+    folders = [name.strip() for name in str(config.get("unified_folders", "")).split(",") if name.strip()]
+    return folders or list(DEFAULT_FOLDERS)
+
+def email_timestamp(email):
+    """Sort key: the timestamp set at ingest, else the Date header as a POSIX timestamp"""
+    timestamp = email.get("timestamp")
+    if timestamp is None:
+        timestamp = date_timestamp(email.get("date"))
+    return timestamp if timestamp is not None else 0.0
+
+def fetch_unified_inbox(accounts, folders, open_connection, num_emails=10,
+                        max_connections=DEFAULT_MAX_CONNECTIONS):
+    """Fetch every account/folder pair concurrently and merge newest first.
+
+    `open_connection(account)` returns an authenticated IMAP connection. At
+    most `max_connections` connections are open at once; connections are
+    reused across folders of the same account. Returns (emails, errors)
+    where errors maps "address/folder" to a message.
+    """
+    targets = [(account, folder) for account in accounts for folder in folders]
+    if not targets:
+        return [], {}
+    return asyncio.run(_fetch_all(targets, open_connection, num_emails, max(1, max_connections)))
+
+async def _fetch_all(targets, open_connection, num_emails, max_connections):
+    budget = asyncio.Semaphore(max_connections)
+    idle = {}
+    opened = []
+    errors = {}
+
+    async def acquire_connection(account):
+        pool = idle.setdefault(account["email_address"], [])
+        if pool:
+            return pool.pop()
+        if len(opened) >= max_connections:
+            for other in idle.values():
+                if other:
+                    spare = other.pop()
+                    opened.remove(spare)
+                    await asyncio.to_thread(_logout, spare)
+                    break
+        conn = await asyncio.to_thread(open_connection, account)
+        opened.append(conn)
+        return conn
+
+    async def fetch_target(account, folder):
+        address = account["email_address"]
+        async with budget:
+            pool = idle.setdefault(address, [])
+            try:
+                conn = await acquire_connection(account)
+            except Exception as e:
+                errors[f"{address}/{folder}"] = f"Connection failed: {e}"
+                return []
+
+            emails, error = await asyncio.to_thread(fetch_emails, conn, num_emails, folder,
+                                                    headers_only=True)
+            pool.append(conn)
+            if error:
+                errors[f"{address}/{folder}"] = error
+                return []
+            for email in emails:
+                email["account"] = address
+                email["folder"] = folder
+            return emails
+
+    try:
+        results = await asyncio.gather(*(fetch_target(account, folder) for account, folder in targets))
+    finally:
+        await asyncio.gather(*(asyncio.to_thread(_logout, conn) for conn in opened))
+
+    merged = [email for emails in results for email in emails]
+    merged.sort(key=email_timestamp, reverse=True)
+    return merged, errors
+
+def _logout(conn):
+    try:
+        conn.logout()
+    except Exception:
+        pass
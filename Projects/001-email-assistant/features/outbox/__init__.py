@@ -0,0 +1,4 @@
+# features/outbox/init.py
+from .outbox import Outbox, DeliveryWorker
+
+__all__ = ['Outbox', 'DeliveryWorker']
@@ -0,0 +1,345 @@
+# features/outbox/outbox.py
+import copy
+import io
+import json
+import os
+import re
+import smtplib
+import sqlite3
+import threading
+import time
+from collections import deque
+from email.generator import BytesGenerator
+from email.utils import getaddresses
+
+from utils.config import CONFIG_DIR, ensure_config_dir
+
+OUTBOX_DB_FILE = os.path.join(CONFIG_DIR, "outbox.db")
+DEFAULT_RATE_PER_MINUTE = 30
+DEFAULT_MAX_ATTEMPTS = 8
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+IDLE_DISCONNECT = 60
+DELIVERY_BATCH = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    subject TEXT,
+    raw BLOB NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, account, next_attempt);
+"""
+
+
+def message_envelope(msg):
+    """Return (sender, recipients, raw bytes) the way smtplib.send_message derives them"""
+    sender = msg["Sender"] or msg["From"]
+    recipients = [address for _, address in getaddresses(msg.get_all("To", []) + msg.get_all("Cc", []) +
+                                                         msg.get_all("Bcc", [])) if address]
+    if msg["Bcc"] is not None:
+        msg = copy.copy(msg)
+        del msg["Bcc"]
+    buffer = io.BytesIO()
+    BytesGenerator(buffer, policy=msg.policy.clone(linesep="\r\n")).flatten(msg, linesep="\r\n")
+    sender_address = getaddresses([sender or ""])[0][1] if sender else ""
+    return sender_address, recipients, buffer.getvalue()
+
+
+class Outbox:
+    """On-disk queue of outgoing messages, safe to share between threads"""
+
+    def __init__(self, path=OUTBOX_DB_FILE):
+        if path == OUTBOX_DB_FILE:
+            ensure_config_dir()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(self, msg, account):
+        """Persist a message for delivery and return its queue id"""
+        sender, recipients, raw = message_envelope(msg)
+        if not recipients:
+            raise ValueError("Message has no recipients")
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO outbox (account, sender, recipients, subject, raw, created, next_attempt) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (account, sender, json.dumps(recipients), msg["Subject"], raw, time.time(), 0))
+            return cursor.lastrowid
+
+    def due(self, account, limit=DELIVERY_BATCH):
+        """Queued messages of an account whose next attempt time has come"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, sender, recipients, raw, attempts FROM outbox "
+                "WHERE status = 'queued' AND account = ? AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (account, time.time(), limit)).fetchall()
+        return [{"id": row[0], "sender": row[1], "recipients": json.loads(row[2]), "raw": row[3],
+                 "attempts": row[4]} for row in rows]
+
+    def next_due_time(self, account):
+        """Earliest next_attempt of a queued message, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT MIN(next_attempt) FROM outbox WHERE status = 'queued' AND account = ?",
+                                   (account,)).fetchone()
+        return row[0]
+
+    def mark_sent(self, item_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM outbox WHERE id = ?", (item_id,))
+
+    def mark_retry(self, item_id, attempts, error, delay):
+        with self._lock, self._db:
+            self._db.execute("UPDATE outbox SET attempts = ?, last_error = ?, next_attempt = ? WHERE id = ?",
+                             (attempts, error, time.time() + delay, item_id))
+
+    def mark_failed(self, item_id, attempts, error):
+        with self._lock, self._db:
+            self._db.execute("UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                             (attempts, error, item_id))
+
+    def counts(self, account=None):
+        """Return {"queued": n, "failed": m}, optionally for one account"""
+        query = "SELECT status, COUNT(*) FROM outbox"
+        params = ()
+        if account is not None:
+            query += " WHERE account = ?"
+            params = (account,)
+        with self._lock:
+            rows = self._db.execute(query + " GROUP BY status", params).fetchall()
+        counts = {"queued": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def failed(self):
+        """Failed messages as dicts with subject, recipients and last error"""
+        with self._lock:
+            rows = self._db.execute("SELECT id, account, subject, recipients, attempts, last_error FROM outbox "
+                                    "WHERE status = 'failed' ORDER BY id").fetchall()
+        return [{"id": row[0], "account": row[1], "subject": row[2], "recipients": json.loads(row[3]),
+                 "attempts": row[4], "error": row[5]} for row in rows]
+
+    def retry_failed(self):
+        """Put every failed message back in the queue"""
+        with self._lock, self._db:
+            return self._db.execute("UPDATE outbox SET status = 'queued', attempts = 0, next_attempt = 0 "
+                                    "WHERE status = 'failed'").rowcount
+
+    def discard_failed(self):
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM outbox WHERE status = 'failed'").rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def retry_delay(attempts, base=RETRY_BASE_DELAY):
+    """Exponential backoff: 30 s, 60 s, 120 s ... capped at an hour"""
+    return min(RETRY_MAX_DELAY, base * 2 ** max(0, attempts - 1))
+
+
+def pipelined_send(server, sender, recipients, raw):
+    """Send one message with MAIL, RCPT... and DATA in a single PIPELINING round trip.
+
+    Returns the refused recipients like smtplib.sendmail and raises the same
+    exceptions.
+    """
+    server.ehlo_or_helo_if_needed()
+    commands = [f"MAIL FROM:{smtplib.quoteaddr(sender)}"]
+    commands += [f"RCPT TO:{smtplib.quoteaddr(recipient)}" for recipient in recipients]
+    commands.append("DATA")
+    server.send("".join(command + "\r\n" for command in commands))
+
+    mail_code, mail_reply = server.getreply()
+    refused = {}
+    for recipient in recipients:
+        code, reply = server.getreply()
+        if code not in (250, 251):
+            refused[recipient] = (code, reply)
+    data_code, data_reply = server.getreply()
+
+    if mail_code != 250 or data_code != 354:
+        if data_code == 354:
+            server.send(b".\r\n")
+            server.getreply()
+        server.rset()
+        if mail_code != 250:
+            raise smtplib.SMTPSenderRefused(mail_code, mail_reply, sender)
+        if len(refused) == len(recipients):
+            raise smtplib.SMTPRecipientsRefused(refused)
+        raise smtplib.SMTPDataError(data_code, data_reply)
+
+    data = re.sub(rb'(?:\r\n|\n|\r(?!\n))', b"\r\n", raw)
+    data = re.sub(rb'(?m)^\.', b"..", data)
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    server.send(data + b".\r\n")
+    code, reply = server.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, reply)
+    return refused
+
+
+def _is_permanent(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    code = getattr(error, "smtp_code", None)
+    return isinstance(code, int) and code >= 500
+
+
+class DeliveryWorker(threading.Thread):
+    """Background thread that drains one account's outbox.
+
+    Reuses a single authenticated SMTP connection (from `open_smtp`) for
+    every due message, pipelines each transaction when the server offers
+    PIPELINING, retries transient failures with exponential backoff and
+    sends at most `rate_per_minute` messages per minute. `send_message`
+    makes it a drop-in for an SMTP connection: it queues and returns.
+    """
+
+    def __init__(self, outbox, account, open_smtp, rate_per_minute=DEFAULT_RATE_PER_MINUTE,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, retry_base=RETRY_BASE_DELAY):
+        super().__init__(name=f"outbox-{account}", daemon=True)
+        self.outbox = outbox
+        self.account = account
+        self.open_smtp = open_smtp
+        self.rate_per_minute = max(1, rate_per_minute)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "connections": 0, "pipelined": 0}
+        self._events = deque()
+        self._sent_times = deque()
+        self._server = None
+        self._last_used = 0.0
+        self._connect_failures = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def send_message(self, msg, *args, **kwargs):
+        """Queue a message for background delivery (smtplib-compatible signature)"""
+        self.outbox.enqueue(msg, self.account)
+        self.wake()
+        return {}
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=10):
+        """Stop after the message in flight; queued mail stays on disk"""
+        self._stopped.set()
+        self._wake.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def drain_events(self):
+        """Return and clear (kind, text) delivery events for the UI"""
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+    def run(self):
+        try:
+            while not self._stopped.is_set():
+                items = self.outbox.due(self.account)
+                for item in items:
+                    if self._stopped.is_set() or not self._throttle():
+                        break
+                    if not self._deliver(item):
+                        break
+                if self._connect_failures:
+                    self._wake.wait(retry_delay(self._connect_failures, self.retry_base))
+                    self._wake.clear()
+                elif not items:
+                    self._wait_for_work()
+        finally:
+            self._disconnect()
+
+    def _wait_for_work(self):
+        if self._server is not None and time.monotonic() - self._last_used >= IDLE_DISCONNECT:
+            self._disconnect()
+        next_due = self.outbox.next_due_time(self.account)
+        timeout = IDLE_DISCONNECT if next_due is None else min(IDLE_DISCONNECT, max(0.0, next_due - time.time()))
+        self._wake.wait(timeout)
+        self._wake.clear()
+
+    def _throttle(self):
+        """Block until sending one more message keeps within the per-minute limit"""
+        while len(self._sent_times) >= self.rate_per_minute:
+            wait = 60 - (time.monotonic() - self._sent_times[0])
+            if wait <= 0:
+                self._sent_times.popleft()
+            elif self._stopped.wait(wait):
+                return False
+        return True
+
+    def _connection(self):
+        if self._server is None:
+            self._server = self.open_smtp()
+            self._last_used = time.monotonic()
+            self.stats["connections"] += 1
+        return self._server
+
+    def _disconnect(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                try:
+                    server.close()
+                except Exception:
+                    pass
+
+    def _deliver(self, item):
+        """Send one queued item; returns False when the connection itself is failing"""
+        attempts = item["attempts"] + 1
+        try:
+            server = self._connection()
+            self._connect_failures = 0
+        except Exception as e:
+            self._connect_failures += 1
+            delay = retry_delay(self._connect_failures, self.retry_base)
+            self.outbox.mark_retry(item["id"], item["attempts"], f"Connection failed: {e}", delay)
+            self._events.append(("error", f"SMTP connection failed, retrying in {delay}s: {e}"))
+            return False
+
+        try:
+            server.ehlo_or_helo_if_needed()
+            if server.has_extn("pipelining"):
+                refused = pipelined_send(server, item["sender"], item["recipients"], item["raw"])
+                self.stats["pipelined"] += 1
+            else:
+                refused = server.sendmail(item["sender"], item["recipients"], item["raw"])
+        except Exception as e:
+            if isinstance(e, smtplib.SMTPServerDisconnected) or not isinstance(e, smtplib.SMTPException):
+                self._disconnect()
+            if _is_permanent(e) or attempts >= self.max_attempts:
+                self.outbox.mark_failed(item["id"], attempts, str(e))
+                self.stats["failed"] += 1
+                self._events.append(("failed", f"Delivery failed for {', '.join(item['recipients'])}: {e}"))
+            else:
+                self.outbox.mark_retry(item["id"], attempts, str(e), retry_delay(attempts, self.retry_base))
+                self.stats["retried"] += 1
+            return self._server is not None
+
+        self._sent_times.append(time.monotonic())
+        self._last_used = time.monotonic()
+        self.outbox.mark_sent(item["id"])
+        self.stats["sent"] += 1
+        delivered = [r for r in item["recipients"] if r not in (refused or {})]
+        self._events.append(("sent", f"Sent to {', '.join(delivered)}"))
+        if refused:
+            self._events.append(("failed", f"Refused: {', '.join(refused)}"))
+        return True
@@ -1,8 +1,27 @@
 # main.py
-import questionary
-import imaplib
-import smtplib
 import sys
+
+if __name__ == "__main__":
+    # Bulk parsing spawns worker processes; a frozen executable must hand them off here
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    # --profile / --profile-trace PATH work for both the interactive client and the commands
+    try:
+        from utils.profiler import apply_profile_flags
+    except ImportError:
+        from profiler import apply_profile_flags
+    sys.argv[1:] = apply_profile_flags(sys.argv[1:])
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # Scripted use: dispatch before any UI or protocol module is imported
+    try:
+        from features.headless.headless import run_command
+    except ImportError:
+        from headless import run_command
+    sys.exit(run_command(sys.argv[1:]))
+
+import questionary
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
@@ -11,20 +30,61 @@ from email.mime.multipart import MIMEMultipart
 
 # Import modular features
 try:
-    from features.email_reader.email_reader import fetch_emails
+    from features.email_reader.email_reader import fetch_emails, load_email_body, mark_seen, DEFAULT_FETCH_BATCH_SIZE, DEFAULT_PIPELINE_DEPTH
     from features.email_replier.email_replier import interactive_reply
     from features.auth.auth import initialize_passkey, verify_passkey, change_passkey
-    from utils.config import load_config, save_config, EMAIL_CONFIG_FILE
-    from utils.helpers import clean_email_body, format_email_date, extract_clean_sender, wrap_text
+    from features.email_sync.email_sync import sync_folder, cache_email_body, cache_email_flags, load_cached_body
+    from features.email_watcher.email_watcher import MailboxWatcher
+    from features.mail_session.mail_session import MailSession, DEFAULT_KEEPALIVE_INTERVAL
+    from features.multi_fetch.multi_fetch import fetch_unified_inbox, get_accounts, get_unified_folders, DEFAULT_MAX_CONNECTIONS
+    from features.email_search.email_search import build_search_criteria, open_search
+    from features.outbox.outbox import Outbox, DeliveryWorker, DEFAULT_RATE_PER_MINUTE, DEFAULT_MAX_ATTEMPTS
+    from features.email_threads.email_threads import ThreadIndex, flatten_thread, thread_subject
+    from features.attachments.attachments import list_attachments, fetch_structure, attachment_filename, download_path, download_attachment, DOWNLOAD_DIR
+    from features.inbox_view.inbox_view import PagedInbox, format_row
+    from features.body_prefetch.body_prefetch import BodyPrefetcher, DEFAULT_PREFETCH_BUDGET_MB
+    from features.list_index.list_index import ListIndex, parse_day
+    from utils.mail_cache import open_mail_cache, get_folder_state, load_records, load_records_by_uid, last_change, changes_since
+    from utils.search_index import ensure_search_index, search_messages, snippet_segments
+    from utils.config import load_config, save_config, get_int_setting, config_store, EMAIL_CONFIG_FILE, DEFAULT_PAGE_SIZE
+    from utils.render_cache import RenderCache, terminal_width
+    from utils.profiler import profiler
 except ImportError:
     # For PyInstaller bundled executable
-    from email_reader import fetch_emails
+    from email_reader import fetch_emails, load_email_body, mark_seen, DEFAULT_FETCH_BATCH_SIZE, DEFAULT_PIPELINE_DEPTH
     from email_replier import interactive_reply
     from auth import initialize_passkey, verify_passkey, change_passkey
-    from config import load_config, save_config, EMAIL_CONFIG_FILE
-    from helpers import clean_email_body, format_email_date, extract_clean_sender, wrap_text
+    from email_sync import sync_folder, cache_email_body, cache_email_flags, load_cached_body
+    from email_watcher import MailboxWatcher
+    from mail_session import MailSession, DEFAULT_KEEPALIVE_INTERVAL
+    from multi_fetch import fetch_unified_inbox, get_accounts, get_unified_folders, DEFAULT_MAX_CONNECTIONS
+    from email_search import build_search_criteria, open_search
+    from outbox import Outbox, DeliveryWorker, DEFAULT_RATE_PER_MINUTE, DEFAULT_MAX_ATTEMPTS
+    from email_threads import ThreadIndex, flatten_thread, thread_subject
+    from attachments import list_attachments, fetch_structure, attachment_filename, download_path, download_attachment, DOWNLOAD_DIR
+    from inbox_view import PagedInbox, format_row
+    from body_prefetch import BodyPrefetcher, DEFAULT_PREFETCH_BUDGET_MB
+    from list_index import ListIndex, parse_day
+    from mail_cache import open_mail_cache, get_folder_state, load_records, load_records_by_uid, last_change, changes_since
+    from search_index import ensure_search_index, search_messages, snippet_segments
+    from config import load_config, save_config, get_int_setting, config_store, EMAIL_CONFIG_FILE, DEFAULT_PAGE_SIZE
+    from render_cache import RenderCache, terminal_width
+    from profiler import profiler
 
 console = Console()
+render_cache = RenderCache()
+body_prefetchers = {}
+
+MAILBOX_UPDATED = "📬 Mailbox updated"
+MAX_THREAD_INDENT = 6
+SORT_CHOICES = {
+    "📅 Newest first": ("date", True),
+    "📅 Oldest first": ("date", False),
+    "👤 Sender A-Z": ("sender", False),
+    "📦 Largest first": ("size", True),
+    "📦 Smallest first": ("size", False),
+    "🔢 As listed": (None, False)
+}
 
 def safe_ask(question_func, *args, **kwargs):
     """Safely ask questions with PyInstaller compatibility"""
@@ -65,47 +125,48 @@ def configure_email():
         console.print(Panel(Text("Configuration cancelled.", style="bold yellow")))
         return
 
-    if save_config(EMAIL_CONFIG_FILE, config_data):
+    if save_config(EMAIL_CONFIG_FILE, {**current_config, **config_data}):
         console.print(Panel(Text("✅ Email configuration saved!", style="bold green")))
     else:
         console.print(Panel(Text("❌ Failed to save configuration.", style="bold red")))
 
-def connect_imap():
-    """Connect to IMAP server"""
+def connect_session():
+    """Open the managed IMAP/SMTP session for the configured account"""
     config = load_config(EMAIL_CONFIG_FILE)
-    required_fields = ["email_address", "app_password", "imap_server", "imap_port"]
+    required_fields = ["email_address", "app_password", "imap_server", "imap_port", "smtp_server", "smtp_port"]
     
     if not config or not all(config.get(field) for field in required_fields):
         console.print(Panel(Text("❌ Incomplete email configuration.", style="bold yellow")))
         return None
 
+    keepalive_interval = get_int_setting(config, "keepalive_interval", DEFAULT_KEEPALIVE_INTERVAL)
+    session = MailSession(config, keepalive_interval=keepalive_interval)
+    if connect_imap(session) and connect_smtp(session):
+        session.start_keepalive()
+        return session
+
+    session.close()
+    return None
+
+def connect_imap(session):
+    """Connect to IMAP server"""
     try:
-        mail = imaplib.IMAP4_SSL(config["imap_server"], int(config["imap_port"]))
-        mail.login(config["email_address"], config["app_password"])
+        session.imap()
         console.print(Panel(Text("✅ IMAP connected!", style="bold green")))
-        return mail
+        return True
     except Exception as e:
         console.print(Panel(Text(f"❌ IMAP connection failed: {e}", style="bold red")))
-        return None
+        return False
 
-def connect_smtp():
+def connect_smtp(session):
     """Connect to SMTP server"""
-    config = load_config(EMAIL_CONFIG_FILE)
-    required_fields = ["email_address", "app_password", "smtp_server", "smtp_port"]
-    
-    if not config or not all(config.get(field) for field in required_fields):
-        console.print(Panel(Text("❌ Incomplete email configuration.", style="bold yellow")))
-        return None
-
     try:
-        server = smtplib.SMTP(config["smtp_server"], int(config["smtp_port"]))
-        server.starttls()
-        server.login(config["email_address"], config["app_password"])
+        session.smtp()
         console.print(Panel(Text("✅ SMTP connected!", style="bold green")))
-        return server
+        return True
     except Exception as e:
         console.print(Panel(Text(f"❌ SMTP connection failed: {e}", style="bold red")))
-        return None
+        return False
 
 def send_new_email(smtp_conn):
     """Send a new email"""
@@ -131,47 +192,243 @@ def send_new_email(smtp_conn):
         msg['Subject'] = subject
         msg.attach(MIMEText(body, 'plain'))
         smtp_conn.send_message(msg)
-        console.print(Panel(Text(f"✅ Sent to {recipient}!", style="bold green")))
+        sent_text = f"📤 Queued for {recipient}." if isinstance(smtp_conn, DeliveryWorker) else f"✅ Sent to {recipient}!"
+        console.print(Panel(Text(sent_text, style="bold green")))
     except Exception as e:
         console.print(Panel(Text(f"❌ Send failed: {e}", style="bold red")))
 
+@profiler.timed("render message")
 def view_email_details(email):
     """Display clean, formatted email details"""
-    clean_sender = extract_clean_sender(email['sender'])
-    clean_subject = email['subject'] or "(No Subject)"
-    clean_date = format_email_date(email['date'])
-    clean_body = clean_email_body(email['body'])
+    rendered = render_cache.render(email)
     
     console.print(Panel(Text("📧 Email Details", style="bold blue")))
-    console.print(f"[bold]From:[/bold] {clean_sender}")
-    console.print(f"[bold]Subject:[/bold] {clean_subject}")
-    console.print(f"[bold]Date:[/bold] {clean_date}")
+    console.print(f"[bold]From:[/bold] {rendered['sender']}")
+    console.print(f"[bold]Subject:[/bold] {rendered['subject']}")
+    console.print(f"[bold]Date:[/bold] {rendered['date']}")
     console.print(f"\n[bold]Message:[/bold]")
     console.print("-" * 70)
     
-    wrapped_text = wrap_text(clean_body, width=70)
-    console.print(wrapped_text)
+    console.print(render_cache.wrapped_body(email))
     console.print("-" * 70)
 
-def display_emails_with_actions(emails):
-    """Display emails with action options"""
-    console.print(Panel(Text(f"📧 Found {len(emails)} emails", style="bold green")))
-    
-    for i, email in enumerate(emails, 1):
-        clean_sender = extract_clean_sender(email['sender'])
-        clean_date = format_email_date(email['date'])
-        clean_preview = clean_email_body(email['body'])[:80] + "..." if len(clean_email_body(email['body'])) > 80 else clean_email_body(email['body'])
-        
-        console.print(f"\n[bold cyan]{i}.[/bold cyan]")
-        console.print(f"   👤 From: {clean_sender}")
-        console.print(f"   📝 Subject: {email['subject']}")
-        console.print(f"   📅 Date: {clean_date}")
-        console.print(f"   📄 Preview: {clean_preview}")
-        console.print("-" * 70)
-
-def handle_fetch_emails(imap_conn, smtp_conn):
+@profiler.timed("render list")
+def email_rows(emails, first_number=1):
+    """One selectable line per email of the visible window"""
+    width = terminal_width()
+    return [questionary.Choice(format_row(number, render_cache.render(email), width), value=email)
+            for number, email in enumerate(emails, first_number)]
+
+@profiler.timed("render threads")
+def thread_rows(live, num_threads):
+    """Rows of the newest conversations as indented trees under a header each"""
+    width = terminal_width()
+    rows = []
+    numbered = []
+    for root in live["threads"].threads()[:num_threads]:
+        rows.append(questionary.Separator(f"🧵 {thread_subject(root)} ({root.size} message{'s' if root.size != 1 else ''})"))
+        for depth, email in flatten_thread(root):
+            numbered.append(email)
+            rows.append(questionary.Choice(
+                format_row(len(numbered), render_cache.render(email), width, min(depth, MAX_THREAD_INDENT)), value=email))
+    live["thread_emails"] = numbered
+    return rows
+
+def window_actions(offset, page_size, total):
+    """Paging choices for a window of `page_size` rows at `offset` into `total`"""
+    actions = []
+    if offset + page_size < total:
+        actions.append("⏭️ Next page")
+    if offset > 0:
+        actions.append("⏮️ Previous page")
+    return actions
+
+def email_actions(email, session, cache=None, sessions=None, delivery=None):
+    """Show one selected email's summary and act on it"""
+    rendered = render_cache.render(email)
+    console.print(f"\n👤 [bold]{rendered['sender']}[/bold]  📅 {rendered['date']}")
+    console.print(f"📝 {rendered['subject']}")
+    if email.get('account'):
+        console.print(f"📂 Mailbox: {email['account']} / {email['folder']}")
+    console.print(f"📄 {rendered['preview']}")
+    if rendered['snippet']:
+        match = Text("🔎 Match: ")
+        for piece, matched in snippet_segments(rendered['snippet']):
+            match.append(piece, style="bold yellow" if matched else None)
+        console.print(match)
+
+    action = safe_ask(
+        questionary.select,
+        "What would you like to do?",
+        choices=["👁️ View email details", "📨 Reply to email", "📎 Save attachment", "↩️ Back to list"]
+    )
+    if not action or action == "↩️ Back to list":
+        return
+
+    email_session = session_for_email(email, session, sessions)
+    if action == "👁️ View email details":
+        if ensure_email_body(email_session, email, cache):
+            view_email_details(email)
+    elif action == "📨 Reply to email":
+        reply_to_email(email, email_session, cache, delivery)
+    elif action == "📎 Save attachment":
+        save_attachment(email, email_session)
+
+def ask_list_view(view):
+    """Ask for a sort order and filters; returns ListIndex.order options, or None when cancelled"""
+    current = next((label for label, choice in SORT_CHOICES.items()
+                    if choice == (view.get("sort"), view.get("descending"))), None)
+    label = safe_ask(questionary.select, "Sort by:", choices=list(SORT_CHOICES), default=current)
+    if label is None:
+        return None
+    sender = safe_ask(questionary.text, "From address contains (optional):", default=view.get("sender") or "")
+    if sender is None:
+        return None
+    since = safe_ask(questionary.text, "Since date YYYY-MM-DD (optional):",
+                     default=view["since"].isoformat() if view.get("since") else "")
+    if since is None:
+        return None
+    until = safe_ask(questionary.text, "Until date YYYY-MM-DD (optional):",
+                     default=view["until"].isoformat() if view.get("until") else "")
+    if until is None:
+        return None
+    unread = safe_ask(questionary.confirm, "Unread only?", default=bool(view.get("unread")))
+    if unread is None:
+        return None
+
+    try:
+        since, until = parse_day(since), parse_day(until)
+    except ValueError:
+        console.print(Panel(Text("❌ Please enter dates as YYYY-MM-DD.", style="bold red")))
+        return None
+    sort, descending = SORT_CHOICES[label]
+    return {"sort": sort, "descending": descending, "sender": sender.strip(),
+            "since": since, "until": until, "unread": unread}
+
+def describe_view(view):
+    """Short summary of a list's sort order and filters for its title"""
+    parts = [label for label, choice in SORT_CHOICES.items()
+             if choice == (view.get("sort"), view.get("descending")) and choice[0]]
+    if view.get("unread"):
+        parts.append("unread")
+    if view.get("sender"):
+        parts.append(f"from *{view['sender']}*")
+    if view.get("since") or view.get("until"):
+        since, until = view.get("since"), view.get("until")
+        parts.append(f"{since.isoformat() if since else '…'} to {until.isoformat() if until else '…'}")
+    return f" [{', '.join(parts)}]" if parts else ""
+
+def browse_emails(emails, title, session, cache=None, sessions=None, delivery=None, reload=None, view=None):
+    """Arrow-key list over an in-memory result, one page of rows at a time.
+
+    Sorting and filtering re-order the records already in memory through a
+    ListIndex; nothing is fetched or parsed again.
+    """
+    page_size = get_int_setting(load_config(EMAIL_CONFIG_FILE), "page_size", DEFAULT_PAGE_SIZE)
+    index = ListIndex(emails)
+    view = view or {"sort": None, "descending": False}
+    shown = index.view(**view)
+    offset = 0
+    while True:
+        window = shown[offset:offset + page_size]
+        actions = window_actions(offset, page_size, len(shown))
+        actions.append("↕️ Sort / filter")
+        if reload:
+            actions.append("🔄 Refresh email list")
+        actions.append("↩️ Back to main menu")
+        if shown:
+            label = f"{title}{describe_view(view)} ({offset + 1}-{offset + len(window)} of {len(shown)})"
+        else:
+            label = f"{title}{describe_view(view)} (no matching emails)"
+        prefetch_bodies(window, session, sessions, cache)
+        action = safe_ask(questionary.select, label,
+                          choices=email_rows(window, offset + 1) + [questionary.Separator()] + actions)
+
+        if not action or action == "↩️ Back to main menu":
+            break
+        elif not isinstance(action, str):
+            email_actions(action, session, cache, sessions, delivery)
+        elif action == "⏭️ Next page":
+            offset += page_size
+        elif action == "⏮️ Previous page":
+            offset = max(0, offset - page_size)
+        elif action == "↕️ Sort / filter":
+            new_view = ask_list_view(view)
+            if new_view is not None:
+                view = new_view
+                with profiler.span("sort list"):
+                    shown = index.view(**view)
+                offset = 0
+        elif action == "🔄 Refresh email list":
+            index = ListIndex(reload() or emails)
+            shown = index.view(**view)
+            offset = 0
+    prefetch_bodies([], session, sessions)
+
+def get_fetch_settings():
+    """Read page size and batching options from the email configuration"""
+    config = load_config(EMAIL_CONFIG_FILE)
+    return {
+        "num_emails": get_int_setting(config, "page_size", DEFAULT_PAGE_SIZE),
+        "batch_size": get_int_setting(config, "fetch_batch_size", DEFAULT_FETCH_BATCH_SIZE),
+        "pipeline_depth": get_int_setting(config, "pipeline_depth", DEFAULT_PIPELINE_DEPTH),
+        "headers_only": True
+    }
+
+def load_email_list(session, cache, fetch_settings):
+    """Sync the inbox through the local cache, or fetch directly without one"""
+    if cache is None:
+        return session.run_imap(lambda conn: fetch_emails(conn, **fetch_settings))
+
+    sync_settings = {key: value for key, value in fetch_settings.items() if key != "headers_only"}
+    sync_settings["account"] = session.config["email_address"]
+    return session.run_imap(lambda conn: sync_folder(conn, cache, **sync_settings))
+
+def start_mailbox_watcher(session, live, cache, fetch_settings):
+    """Start IDLE push updates for the open email list on a background connection"""
+    sync_settings = {key: value for key, value in fetch_settings.items() if key != "headers_only"}
+    sync_settings["account"] = session.config["email_address"]
+
+    def refresh(conn):
+        if cache is None:
+            return fetch_emails(conn, **fetch_settings)
+        thread_cache = open_mail_cache()
+        try:
+            return sync_folder(conn, thread_cache, **sync_settings)
+        finally:
+            thread_cache.close()
+
+    def on_update(records, events):
+        if not live.get("paged"):
+            live["emails"] = records
+        live["updated"] = True
+        interrupt_prompt(live.get("prompt"), MAILBOX_UPDATED)
+
+    def on_error(error):
+        live["watch_error"] = str(error)
+        interrupt_prompt(live.get("prompt"), MAILBOX_UPDATED)
+
+    watcher = MailboxWatcher(session.open_imap, refresh, on_update, on_error=on_error)
+    watcher.start()
+    return watcher
+
+def interrupt_prompt(question, result):
+    """Finish a running questionary prompt from another thread"""
+    application = getattr(question, "application", None)
+    loop = getattr(application, "loop", None)
+    if application is None or loop is None or not application.is_running:
+        return
+
+    def finish():
+        if application.is_running and not application.future.done():
+            application.exit(result=result)
+
+    loop.call_soon_threadsafe(finish)
+
+def handle_fetch_emails(session, cache=None, delivery=None):
     """Fetch emails and provide interactive options"""
-    fetched_emails, error = fetch_emails(imap_conn, num_emails=10)
+    fetch_settings = get_fetch_settings()
+    fetched_emails, error = load_email_list(session, cache, fetch_settings)
     
     if error:
         console.print(Panel(Text(f"❌ Error: {error}", style="bold red")))
@@ -180,82 +437,517 @@ def handle_fetch_emails(imap_conn, smtp_conn):
         console.print(Panel(Text("📭 No emails found.", style="bold yellow")))
         return
 
-    display_emails_with_actions(fetched_emails)
+    live = {"emails": fetched_emails, "updated": False, "prompt": None,
+            "pager": open_pager(session, fetch_settings), "paged": False,
+            "threaded": False, "threads": None, "thread_uid": 0, "thread_uidvalidity": None, "thread_change": 0, "thread_emails": []}
+    watcher = start_mailbox_watcher(session, live, cache, fetch_settings)
+    try:
+        email_list_loop(session, cache, fetch_settings, live, delivery)
+    finally:
+        watcher.stop()
+        prefetch_bodies([], session)
 
+def email_list_loop(session, cache, fetch_settings, live, delivery=None):
+    """Arrow-key list of the visible page; picking a row opens its actions, redrawn on push updates"""
     while True:
-        action = safe_ask(
-            questionary.select,
-            "What would you like to do?",
-            choices=[
-                f"📨 Reply to email (1-{len(fetched_emails)})",
-                f"👁️ View email details (1-{len(fetched_emails)})", 
-                "🔄 Refresh email list",
-                "↩️ Back to main menu"
-            ]
-        )
+        pager = live["pager"]
+        if live["threaded"]:
+            rows = thread_rows(live, fetch_settings["num_emails"])
+            title = f"🧵 {len(live['thread_emails'])} emails in conversations"
+            actions = ["📃 Flat view"]
+        else:
+            offset = pager.cursor["offset"] if live["paged"] else 0
+            rows = email_rows(live["emails"], offset + 1)
+            title = f"📄 {pager.label()}" if live["paged"] else f"📧 {len(live['emails'])} newest emails"
+            actions = ["🧵 Threaded view"]
+        actions.append("↕️ Sort / filter")
+        if pager.cursor is None:
+            # still opening: its total is unknown, so paging on waits for it
+            actions.append("⏭️ Next page")
+        else:
+            offset = pager.cursor["offset"] if live["paged"] else 0
+            actions += window_actions(offset, pager.cursor["page_size"], pager.cursor["total"])
+        actions += ["🔎 Search mailbox", "🔄 Refresh email list", "↩️ Back to main menu"]
+        prefetch_bodies(live["thread_emails"] if live["threaded"] else live["emails"], session, cache=cache)
 
+        question = questionary.select(title, choices=rows + [questionary.Separator()] + actions)
+        live["prompt"] = question
+        action = safe_ask(lambda: question)
+        live["prompt"] = None
+
+        if live.pop("watch_error", None):
+            console.print(Panel(Text("⚠️ Live updates stopped; use Refresh.", style="bold yellow")))
+        if live["updated"]:
+            live["updated"] = False
+            if live["threaded"]:
+                console.print(Panel(Text("📬 Mailbox updated", style="bold green")))
+                update_thread_index(cache, live, session.config["email_address"])
+            elif not live["paged"]:
+                console.print(Panel(Text("📬 Mailbox updated", style="bold green")))
+            else:
+                # cached pages may be shifted by the new mail
+                pager.invalidate()
+                pager.prefetch_next()
+                console.print(Panel(Text("📬 New mail arrived; use Refresh to see it.", style="bold green")))
+
+        if action == MAILBOX_UPDATED:
+            continue
         if not action:
             break
             
         if action == "↩️ Back to main menu":
             break
+        elif not isinstance(action, str):
+            email_actions(action, session, cache, delivery=delivery)
         elif action == "🔄 Refresh email list":
-            fetched_emails, error = fetch_emails(imap_conn, num_emails=10)
+            fetched_emails, error = load_email_list(session, cache, fetch_settings)
             if error:
                 console.print(Panel(Text(f"❌ Error: {error}", style="bold red")))
             elif fetched_emails:
-                display_emails_with_actions(fetched_emails)
+                live["emails"] = fetched_emails
+                live["pager"] = open_pager(session, fetch_settings)
+                live["paged"] = False
+                if live["threaded"]:
+                    update_thread_index(cache, live, session.config["email_address"])
             else:
                 console.print(Panel(Text("📭 No emails.", style="bold yellow")))
-        elif "Reply to email" in action:
-            handle_reply_action(fetched_emails, smtp_conn)
-        elif "View email details" in action:
-            handle_view_action(fetched_emails)
+        elif action == "🧵 Threaded view":
+            live["threaded"] = True
+            update_thread_index(cache, live, session.config["email_address"])
+        elif action == "📃 Flat view":
+            live["threaded"] = False
+        elif action == "⏭️ Next page":
+            live["threaded"] = False
+            handle_page_action(live, forward=True)
+        elif action == "⏮️ Previous page":
+            live["threaded"] = False
+            handle_page_action(live, forward=False)
+        elif action == "🔎 Search mailbox":
+            live["threaded"] = False
+            handle_search_action(session, fetch_settings, live)
+        elif action == "↕️ Sort / filter":
+            handle_sort_action(session, cache, live, delivery)
+
+def update_thread_index(cache, live, account=None):
+    """Thread the cached INBOX incrementally, or the loaded list without a cache.
+
+    Only messages above the highest UID already threaded are read, plus
+    the ones whose flags changed or that were deleted since the last
+    update (from the cache's change log), so a refresh costs as much as
+    what changed; a UIDVALIDITY change rebuilds.
+    """
+    if cache is None:
+        if live["threads"] is None:
+            live["threads"] = ThreadIndex()
+        live["threads"].update(live["emails"])
+        return
+
+    uidvalidity, _ = get_folder_state(cache, "INBOX", account)
+    changes = None
+    if live["threads"] is not None and uidvalidity == live["thread_uidvalidity"]:
+        changes = changes_since(cache, "INBOX", uidvalidity, live["thread_change"])
+    if changes is None:
+        live["threads"] = ThreadIndex()
+        live["thread_uid"] = 0
+        live["thread_uidvalidity"] = uidvalidity
+        live["thread_change"] = last_change(cache)
+    if uidvalidity is None:
+        live["threads"].update(live["emails"])
+        return
+
+    if changes is not None:
+        live["thread_change"], deleted, changed = changes
+        for uid, message_id in deleted:
+            live["threads"].discard({"message_id": message_id, "folder": "INBOX",
+                                     "uidvalidity": uidvalidity, "uid": uid})
+        live["threads"].update(load_records_by_uid(cache, "INBOX", uidvalidity,
+                                                   [uid for uid in changed if uid <= live["thread_uid"]]))
+
+    records = load_records(cache, "INBOX", uidvalidity, after_uid=live["thread_uid"])
+    records.reverse()
+    live["threads"].update(records)
+    if records:
+        live["thread_uid"] = records[-1]["uid"]
+
+def open_pager(session, fetch_settings, criteria=None, prefetch=True):
+    """Start a paged server-side search of the inbox; the cursor opens in the background"""
+    pager = PagedInbox(
+        session.run_imap,
+        lambda conn: open_search(conn, "INBOX", criteria, fetch_settings["num_emails"], sort_by_date=True),
+        fetch_settings["batch_size"], fetch_settings["pipeline_depth"])
+    return pager.start(prefetch)
+
+def show_pager_page(live, pager):
+    """Show the pager's current page and prefetch the one after it"""
+    emails, error = pager.page()
+    if error:
+        console.print(Panel(Text(f"❌ Error: {error}", style="bold red")))
+        return False
+    if not emails:
+        console.print(Panel(Text("📭 No matching emails.", style="bold yellow")))
+        return False
+
+    live["emails"] = emails
+    live["pager"] = pager
+    live["paged"] = True
+    pager.prefetch_next()
+    return True
+
+def handle_page_action(live, forward=True):
+    """Move the list one page older or newer, from the prefetched pages when possible"""
+    pager = live["pager"]
+    error = pager.wait_open()
+    if error:
+        console.print(Panel(Text(f"❌ Error: {error}", style="bold red")))
+        return
+    if not pager.move(forward):
+        console.print(Panel(Text("ℹ️ No more pages.", style="bold yellow")))
+        return
+    if not show_pager_page(live, pager):
+        pager.move(not forward)
+
+def handle_search_action(session, fetch_settings, live):
+    """Filter the list with a server-side IMAP search"""
+    sender = safe_ask(questionary.text, "From contains (optional):")
+    if sender is None:
+        return
+    subject = safe_ask(questionary.text, "Subject contains (optional):")
+    if subject is None:
+        return
+    text = safe_ask(questionary.text, "Text anywhere in message (optional):")
+    if text is None:
+        return
+    since = safe_ask(questionary.text, "Since date YYYY-MM-DD (optional):")
+    if since is None:
+        return
+    unseen = safe_ask(questionary.confirm, "Unread only?", default=False)
+    if unseen is None:
+        return
 
-def handle_reply_action(emails, smtp_conn):
-    """Handle email reply action"""
     try:
-        email_num = safe_ask(questionary.text, f"Enter email number to reply (1-{len(emails)}):")
-        
-        if not email_num:
-            return
-            
-        index = int(email_num) - 1
-        if 0 <= index < len(emails):
-            sender_email = load_config(EMAIL_CONFIG_FILE).get("email_address")
-            interactive_reply(smtp_conn, emails[index], sender_email)
-        else:
-            console.print(Panel(Text("❌ Invalid email number.", style="bold red")))
-            
+        criteria = build_search_criteria(sender=sender.strip(), subject=subject.strip(),
+                                         since=since.strip(), unseen=unseen, text=text.strip())
     except ValueError:
-        console.print(Panel(Text("❌ Please enter a valid number.", style="bold red")))
+        console.print(Panel(Text("❌ Please enter the date as YYYY-MM-DD.", style="bold red")))
+        return
 
-def handle_view_action(emails):
-    """Handle email view action"""
-    try:
-        email_num = safe_ask(questionary.text, f"Enter email number to view (1-{len(emails)}):")
-        
-        if not email_num:
+    pager = open_pager(session, fetch_settings, criteria, prefetch=False)
+    error = pager.wait_open()
+    if error:
+        console.print(Panel(Text(f"❌ Error: {error}", style="bold red")))
+        return
+    show_pager_page(live, pager)
+
+def handle_sort_action(session, cache, live, delivery=None):
+    """Sort and filter every cached inbox message in memory, or the loaded list without a cache"""
+    view = ask_list_view({"sort": "date", "descending": True})
+    if view is None:
+        return
+
+    emails, title = live["emails"], "📧 Loaded emails"
+    if cache is not None:
+        uidvalidity, _ = get_folder_state(cache, "INBOX", session.config["email_address"])
+        records = load_records(cache, "INBOX", uidvalidity) if uidvalidity is not None else []
+        if records:
+            emails, title = records, "📧 Cached inbox"
+    browse_emails(emails, title, session, cache, delivery=delivery, view=view)
+
+def ensure_email_body(session, email, cache=None):
+    """Download the full body of a list-mode email before it is shown, and mark it read"""
+    was_seen = "\\Seen" in (email.get("flags") or ())
+    if email.get("local"):
+        # imported archive: the cache is the only copy, nothing goes to a server
+        if not load_cached_body(cache, email):
+            console.print(Panel(Text("❌ This archived message has no stored body.", style="bold red")))
+            return False
+        if not was_seen:
+            email["flags"] = list(email.get("flags") or []) + ["\\Seen"]
+            cache_email_flags(cache, email)
+        return True
+
+    prefetcher = body_prefetchers.get(session.config["email_address"])
+    stored = load_cached_body(cache, email)
+    if not stored and prefetcher is not None and prefetcher.apply(email):
+        cache_email_body(cache, email)
+        stored = True
+    if stored:
+        # no FETCH went to the server, so \Seen has to be set explicitly
+        _, error = session.run_imap(lambda conn: mark_seen(conn, email), folder=email.get('folder', "INBOX"))
+        if error:
+            console.print(Panel(Text(f"⚠️ Could not mark as read: {error}", style="bold yellow")))
+    else:
+        _, error = session.run_imap(lambda conn: load_email_body(conn, email),
+                                    folder=email.get('folder', "INBOX"))
+        if error:
+            console.print(Panel(Text(f"❌ Error: {error}", style="bold red")))
+            return False
+        cache_email_body(cache, email)
+    if not was_seen:
+        cache_email_flags(cache, email)
+    return True
+
+def reply_to_email(email, session, cache=None, delivery=None):
+    """Load the body if needed and compose a reply"""
+    if not ensure_email_body(session, email, cache):
+        return
+    sender_email = email.get("account") or load_config(EMAIL_CONFIG_FILE).get("email_address")
+    interactive_reply(delivery_for(session, delivery), email, sender_email)
+
+def format_size(size):
+    """Human-readable byte count"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def save_attachment(email, session):
+    """Save one attachment of an email, resuming an interrupted download of it"""
+    uid = email.get('uid')
+    if uid is None:
+        console.print(Panel(Text("❌ This email has no UID; refresh the list first.", style="bold red")))
+        return
+    if email.get('local'):
+        console.print(Panel(Text("❌ Attachments of imported archive messages are not stored.", style="bold red")))
+        return
+    folder = email.get('folder', "INBOX")
+
+    structure = email.get('structure')
+    if structure is None:
+        structure, error = session.run_imap(lambda conn: fetch_structure(conn, uid), folder=folder)
+        if error:
+            console.print(Panel(Text(f"❌ Error: {error}", style="bold red")))
             return
-            
-        index = int(email_num) - 1
-        if 0 <= index < len(emails):
-            view_email_details(emails[index])
-        else:
-            console.print(Panel(Text("❌ Invalid email number.", style="bold red")))
-            
-    except ValueError:
-        console.print(Panel(Text("❌ Please enter a valid number.", style="bold red")))
+    attachments = list_attachments(structure)
+    if not attachments:
+        console.print(Panel(Text("📭 This email has no attachments.", style="bold yellow")))
+        return
+
+    choices = [questionary.Choice(f"{attachment_filename(part)} ({format_size(part['size'])} encoded)", value=part)
+               for part in attachments]
+    part = safe_ask(questionary.select, "Which attachment?", choices=choices)
+    if not part:
+        return
+
+    path = download_path(DOWNLOAD_DIR, part, uid)
+    shown = [-1]
+
+    def progress(done, total):
+        percent = min(100, done * 100 // total) if total else 0
+        if percent // 10 > shown[0]:
+            shown[0] = percent // 10
+            console.print(f"   ⬇️ {percent}% of {format_size(total)}")
+
+    saved, error = session.run_imap(
+        lambda conn: download_attachment(conn, uid, part, path, folder=folder, progress=progress), folder=folder)
+    if error:
+        console.print(Panel(Text(f"❌ Error: {error} (run again to resume)", style="bold red")))
+        return
+    console.print(Panel(Text(f"📎 Saved to {saved}", style="bold green")))
+
+def body_prefetcher(session):
+    """Return the account's body prefetcher, starting it on first use; None when disabled"""
+    address = session.config["email_address"]
+    if address not in body_prefetchers:
+        budget_mb = get_int_setting(load_config(EMAIL_CONFIG_FILE), "prefetch_budget_mb", DEFAULT_PREFETCH_BUDGET_MB)
+        prefetcher = None
+        if budget_mb > 0:
+            prefetcher = BodyPrefetcher(session.open_imap, budget_mb * 1024 * 1024)
+            prefetcher.start()
+        body_prefetchers[address] = prefetcher
+    return body_prefetchers[address]
+
+def prefetch_bodies(emails, session, sessions=None, cache=None):
+    """Download the bodies of the emails on screen in the background, per account.
+
+    Bodies already in the local body store (this copy or another folder's)
+    are filled in from it first and never downloaded.
+    """
+    listed = {}
+    for email in emails:
+        if cache is not None:
+            load_cached_body(cache, email)
+        if email.get("local"):
+            continue
+        email_session = session_for_email(email, session, sessions)
+        listed.setdefault(email_session.config["email_address"], (email_session, []))[1].append(email)
+    for address, prefetcher in body_prefetchers.items():
+        if prefetcher is not None and address not in listed:
+            prefetcher.show([])
+    for email_session, account_emails in listed.values():
+        prefetcher = body_prefetcher(email_session)
+        if prefetcher is not None:
+            prefetcher.show(account_emails)
+
+def close_prefetchers():
+    """Stop the body prefetchers and log their connections out"""
+    for prefetcher in body_prefetchers.values():
+        if prefetcher is not None:
+            prefetcher.stop()
+    body_prefetchers.clear()
+
+def session_for_email(email, session, sessions=None):
+    """Pick the session of the account an email was fetched from"""
+    if sessions and email.get("account") in sessions:
+        return sessions[email["account"]]
+    return session
+
+def account_session(sessions, account):
+    """Return the session for an account, creating it on first use"""
+    address = account["email_address"]
+    if address not in sessions:
+        sessions[address] = MailSession(account)
+    return sessions[address]
+
+def load_unified_inbox(sessions):
+    """Fetch all configured accounts and folders concurrently"""
+    config = load_config(EMAIL_CONFIG_FILE)
+    accounts, skipped = get_accounts(config)
+    for address, error in skipped.items():
+        console.print(Panel(Text(f"⚠️ {address}: {error}", style="bold yellow")))
+    emails, errors = fetch_unified_inbox(
+        accounts,
+        get_unified_folders(config),
+        lambda account: account_session(sessions, account).open_imap(),
+        num_emails=get_int_setting(config, "page_size", DEFAULT_PAGE_SIZE),
+        max_connections=get_int_setting(config, "max_connections", DEFAULT_MAX_CONNECTIONS)
+    )
+    for mailbox, error in errors.items():
+        console.print(Panel(Text(f"⚠️ {mailbox}: {error}", style="bold yellow")))
+    return emails
+
+def handle_unified_inbox(session, sessions, cache=None, delivery=None):
+    """Show a merged, date-ordered view of every configured mailbox"""
+    emails = load_unified_inbox(sessions)
+    if not emails:
+        console.print(Panel(Text("📭 No emails found.", style="bold yellow")))
+        return
+
+    browse_emails(emails, "📧 Unified inbox", session, cache, sessions=sessions, delivery=delivery,
+                  reload=lambda: load_unified_inbox(sessions))
+
+def open_cache():
+    """Open the local message cache, or continue without one"""
+    try:
+        cache = open_mail_cache()
+    except Exception as e:
+        console.print(Panel(Text(f"⚠️ Local cache unavailable: {e}", style="bold yellow")))
+        return None
+    if not ensure_search_index(cache):
+        console.print(Panel(Text("⚠️ Offline search unavailable (SQLite without FTS5).", style="bold yellow")))
+    return cache
+
+def handle_local_search(session, cache, delivery=None):
+    """Ranked full-text search over locally cached mail, no network needed"""
+    if cache is None:
+        console.print(Panel(Text("❌ Offline search needs the local cache.", style="bold red")))
+        return
+
+    query = safe_ask(questionary.text, "Search for (sender, subject or text):")
+    if not query:
+        return
+
+    result, error = search_messages(cache, query)
+    if error:
+        console.print(Panel(Text(f"❌ Error: {error}", style="bold red")))
+        return
+    emails, elapsed = result
+    if not emails:
+        console.print(Panel(Text("📭 No matching emails in the local cache.", style="bold yellow")))
+        return
+
+    console.print(Panel(Text(f"🔍 {len(emails)} matches in {elapsed * 1000:.1f} ms", style="bold cyan")))
+    browse_emails(emails, "🔍 Matches", session, cache, delivery=delivery)
+
+def open_outbox():
+    """Open the persistent outbox; without one mail is sent synchronously"""
+    try:
+        outbox = Outbox()
+    except Exception as e:
+        console.print(Panel(Text(f"⚠️ Outbox unavailable, sending directly: {e}", style="bold yellow")))
+        outbox = None
+    return {"outbox": outbox, "workers": {}}
+
+def delivery_for(session, delivery=None):
+    """Return the account's background sender, starting it on first use"""
+    if not delivery or delivery["outbox"] is None:
+        return session
+    config = session.config
+    address = config["email_address"]
+    worker = delivery["workers"].get(address)
+    if worker is None:
+        worker = DeliveryWorker(delivery["outbox"], address, session.open_smtp,
+                                rate_per_minute=get_int_setting(config, "send_rate_per_minute", DEFAULT_RATE_PER_MINUTE),
+                                max_attempts=get_int_setting(config, "send_max_attempts", DEFAULT_MAX_ATTEMPTS))
+        worker.start()
+        delivery["workers"][address] = worker
+    return worker
+
+def report_delivery_events(delivery):
+    """Print what the background senders did since the last prompt"""
+    styles = {"sent": ("✅", "bold green"), "failed": ("❌", "bold red"), "error": ("⚠️", "bold yellow")}
+    for worker in delivery["workers"].values():
+        for kind, text in worker.drain_events():
+            icon, style = styles[kind]
+            console.print(Panel(Text(f"{icon} {text}", style=style)))
+
+def handle_outbox(delivery):
+    """Show queued and failed outgoing mail, retry or discard failures"""
+    outbox = delivery["outbox"]
+    if outbox is None:
+        console.print(Panel(Text("❌ Outbox unavailable.", style="bold red")))
+        return
+
+    counts = outbox.counts()
+    lines = [f"📤 Queued: {counts['queued']}   ❌ Failed: {counts['failed']}"]
+    for item in outbox.failed():
+        lines.append(f"  • {item['subject'] or '(No Subject)'} → {', '.join(item['recipients'])}: {item['error']}")
+    console.print(Panel(Text("\n".join(lines), style="bold cyan"), title="Outbox"))
+    if not counts["failed"]:
+        return
+
+    action = safe_ask(questionary.select, "Failed messages:",
+                      choices=["🔁 Retry failed", "🗑️ Discard failed", "↩️ Back"])
+    if action == "🔁 Retry failed":
+        retried = outbox.retry_failed()
+        for worker in delivery["workers"].values():
+            worker.wake()
+        console.print(Panel(Text(f"🔁 {retried} messages queued again.", style="bold green")))
+    elif action == "🗑️ Discard failed":
+        discarded = outbox.discard_failed()
+        console.print(Panel(Text(f"🗑️ {discarded} messages discarded.", style="bold yellow")))
+
+def close_outbox(delivery):
+    """Stop the senders; anything still queued goes out on the next connect"""
+    for worker in delivery["workers"].values():
+        worker.stop()
+    report_delivery_events(delivery)
+    outbox = delivery["outbox"]
+    if outbox is None:
+        return
+    queued = outbox.counts()["queued"]
+    if queued:
+        console.print(Panel(Text(f"📤 {queued} messages stay in the outbox until next time.", style="bold yellow")))
+    outbox.close()
 
-def email_operations_loop(imap_conn, smtp_conn):
+def email_operations_loop(session):
     """Main email operations loop"""
+    cache = open_cache()
+    sessions = {session.config["email_address"]: session}
+    unsubscribe_config = config_store.subscribe(EMAIL_CONFIG_FILE, session.apply_config)
+    delivery = open_outbox()
+    delivery_for(session, delivery)
     while True:
+        report_delivery_events(delivery)
         action = safe_ask(
             questionary.select,
             "Email Operations:",
             choices=[
                 "📨 Fetch Emails", 
+                "🗂️ Unified Inbox",
+                "🔍 Search",
                 "✉️ Send New Email", 
+                "📤 Outbox",
                 "🔌 Disconnect"
             ]
         )
@@ -264,15 +956,23 @@ def email_operations_loop(imap_conn, smtp_conn):
             break
             
         if action == "📨 Fetch Emails":
-            handle_fetch_emails(imap_conn, smtp_conn)
+            handle_fetch_emails(session, cache, delivery)
+        elif action == "🗂️ Unified Inbox":
+            handle_unified_inbox(session, sessions, cache, delivery)
+        elif action == "🔍 Search":
+            handle_local_search(session, cache, delivery)
         elif action == "✉️ Send New Email":
-            send_new_email(smtp_conn)
+            send_new_email(delivery_for(session, delivery))
+        elif action == "📤 Outbox":
+            handle_outbox(delivery)
         elif action == "🔌 Disconnect":
-            try:
-                imap_conn.logout()
-                smtp_conn.quit()
-            except:
-                pass
+            close_outbox(delivery)
+            close_prefetchers()
+            unsubscribe_config()
+            for open_session in sessions.values():
+                open_session.close()
+            if cache is not None:
+                cache.close()
             console.print(Panel(Text("🔌 Disconnected.", style="bold green")))
             break
 
@@ -304,10 +1004,9 @@ def main():
             elif action == "🔐 Change Passkey":
                 change_passkey()
             elif action == "📥 Connect to Inbox":
-                imap_conn = connect_imap()
-                smtp_conn = connect_smtp()
-                if imap_conn and smtp_conn:
-                    email_operations_loop(imap_conn, smtp_conn)
+                session = connect_session()
+                if session:
+                    email_operations_loop(session)
             elif action == "🚪 Exit":
                 console.print(Panel(Text("👋 Goodbye!", style="bold red")))
                 break
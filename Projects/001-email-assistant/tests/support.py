@@ -0,0 +1,30 @@
+# tests/support.py
+"""Shared helpers for tests that talk to the fake servers in benchmarks/"""
+import imaplib
+import smtplib
+
+from features.mail_session.mail_session import MailSession
+
+
+class PlainSession(MailSession):
+    """MailSession that connects to the plain-TCP fake servers without TLS"""
+
+    def __init__(self, imap_server=None, smtp_server=None):
+        config = {"email_address": "me@example.com", "app_password": "secret"}
+        if imap_server is not None:
+            config.update(imap_server=imap_server.host, imap_port=imap_server.port)
+        if smtp_server is not None:
+            config.update(smtp_server=smtp_server.host, smtp_port=smtp_server.port)
+        super().__init__(config, timeout=5)
+
+    def open_imap(self):
+        conn = imaplib.IMAP4(self.config["imap_server"], self.config["imap_port"], timeout=self.timeout)
+        conn.login(self.config["email_address"], self.config["app_password"])
+        self.stats["imap_connects"] += 1
+        return conn
+
+    def open_smtp(self):
+        server = smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"], timeout=self.timeout)
+        server.login(self.config["email_address"], self.config["app_password"])
+        self.stats["smtp_connects"] += 1
+        return server
@@ -0,0 +1,148 @@
+# tests/test_archive.py
+import os
+import tempfile
+import unittest
+
+from benchmarks.fake_imap import FakeIMAPServer, FakeMailbox, make_simple_message
+from features.archive.archive import export_folder, import_archive, iter_archive
+from features.body_prefetch.body_prefetch import BodyPrefetcher
+from features.email_sync.email_sync import sync_folder, load_cached_body
+from utils.mail_cache import open_mail_cache, get_folder_state, is_local_folder, load_records
+from utils.search_index import ensure_search_index, search_messages
+from tests.support import PlainSession
+
+
+def write_mbox(path, raws):
+    with open(path, "wb") as mbox:
+        for raw in raws:
+            mbox.write(b"From sender@example.com Mon Jan  1 00:00:00 2024\n")
+            mbox.write(raw.replace(b"\r\n", b"\n").replace(b"\nFrom ", b"\n>From "))
+            mbox.write(b"\n")
+
+
+TRICKY_MESSAGE = (b"From: a@example.com\r\nSubject: Tricky lines\r\nMessage-ID: <tricky@example.com>\r\n\r\n"
+                  b"From the top\r\n>From quoted once\r\nend\r\n")
+
+
+class ExportImportRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.mailbox = FakeMailbox([make_simple_message(1), TRICKY_MESSAGE, make_simple_message(3)])
+        self.mailbox.messages[0]["flags"] = {"\\Seen", "\\Flagged"}
+        self.server = FakeIMAPServer({"INBOX": self.mailbox})
+        self.server.start()
+        self.session = PlainSession(imap_server=self.server)
+        self.cache = open_mail_cache(":memory:")
+        ensure_search_index(self.cache)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.stop()
+        self.cache.close()
+        self.directory.cleanup()
+
+    def export(self, name, archive_format="mbox", compression=None):
+        path = os.path.join(self.directory.name, name)
+        count, error = self.session.run_imap(
+            lambda conn: export_folder(conn, "INBOX", path, archive_format, compression, batch_bytes=1024))
+        self.assertEqual((count, error), (3, None))
+        return path
+
+    def check_import(self, path, folder):
+        self.assertEqual(import_archive(path, self.cache, folder), (3, None))
+        records = load_records(self.cache, folder, 1)
+        self.assertEqual(sorted(record["subject"] for record in records),
+                         ["Benchmark message 1", "Benchmark message 3", "Tricky lines"])
+        tricky = next(record for record in records if record["message_id"] == "<tricky@example.com>")
+        self.assertTrue(load_cached_body(self.cache, tricky))
+        # the ">From" line reads as a quote and is dropped from the shown body
+        self.assertEqual(tricky["body"].splitlines(), ["From the top", "end"])
+        (found, _), error = search_messages(self.cache, "Tricky")
+        self.assertIsNone(error)
+        self.assertIn(folder, [record["folder"] for record in found])
+        return records
+
+    def test_mbox_round_trip(self):
+        for compression in (None, "gzip"):
+            path = self.export(f"inbox-{compression or 'plain'}.mbox", compression=compression)
+            raws = [raw for raw, _ in iter_archive(path)]
+            # mboxrd keeps "From " body lines intact; mbox lines end in LF
+            self.assertEqual(raws, [message["raw"].replace(b"\r\n", b"\n") for message in self.mailbox.messages])
+            self.check_import(path, f"Archive/{compression or 'plain'}")
+        # exporting reads with BODY.PEEK, so nothing became read
+        self.assertEqual([sorted(message["flags"]) for message in self.mailbox.messages],
+                         [["\\Flagged", "\\Seen"], [], []])
+
+    def test_maildir_round_trip_keeps_flags(self):
+        path = self.export("inbox-maildir", archive_format="maildir")
+        archived = sorted(iter_archive(path), key=lambda item: item[0])
+        self.assertEqual(sorted(raw for raw, _ in archived), sorted(message["raw"] for message in self.mailbox.messages))
+        records = self.check_import(path, "Archive/maildir")
+        flags = {record["subject"]: sorted(record.get("flags") or []) for record in records}
+        self.assertEqual(flags["Benchmark message 1"], ["\\Flagged", "\\Seen"])
+        self.assertEqual(flags["Tricky lines"], [])
+
+
+class LocalArchiveFolderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = open_mail_cache(":memory:")
+        ensure_search_index(self.cache)
+        self.path = os.path.join(self.directory.name, "old.mbox")
+        write_mbox(self.path, [make_simple_message(index) for index in range(1, 4)])
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_imported_folder_is_local(self):
+        count, error = import_archive(self.path, self.cache, "Archive/old")
+        self.assertEqual((count, error), (3, None))
+        self.assertTrue(is_local_folder(self.cache, "Archive/old"))
+        # readable whatever account is configured
+        uidvalidity, _ = get_folder_state(self.cache, "Archive/old", "me@example.com")
+        records = load_records(self.cache, "Archive/old", uidvalidity)
+        self.assertEqual(len(records), 3)
+        self.assertTrue(all(record.get("local") for record in records))
+        self.assertTrue(all(not record.get("flags") for record in records))
+
+        (found, _), error = search_messages(self.cache, "Benchmark")
+        self.assertIsNone(error)
+        self.assertTrue(found and all(record.get("local") for record in found))
+
+    def test_local_folder_never_reaches_the_server(self):
+        import_archive(self.path, self.cache, "Archive/old")
+        records = load_records(self.cache, "Archive/old", 1)
+        for record in records:
+            record["body"] = None
+
+        prefetcher = BodyPrefetcher(lambda: self.fail("prefetcher connected for a local message"))
+        prefetcher.show(records)
+        self.assertFalse(prefetcher.apply(records[0], timeout=0))
+
+        mailbox = FakeMailbox([make_simple_message(9)])
+        with FakeIMAPServer({"Archive/old": mailbox}) as server:
+            session = PlainSession(imap_server=server)
+            try:
+                result, error = session.run_imap(lambda conn: sync_folder(conn, self.cache, "Archive/old"))
+            finally:
+                session.close()
+        self.assertIsNone(result)
+        self.assertIn("imported archive", error)
+        self.assertEqual(len(load_records(self.cache, "Archive/old", 1)), 3)
+
+    def test_synced_folder_is_not_imported_into(self):
+        mailbox = FakeMailbox([make_simple_message(1)])
+        with FakeIMAPServer({"INBOX": mailbox}) as server:
+            session = PlainSession(imap_server=server)
+            try:
+                session.run_imap(lambda conn: sync_folder(conn, self.cache, "INBOX", account="me@example.com"))
+            finally:
+                session.close()
+        count, error = import_archive(self.path, self.cache, "INBOX")
+        self.assertIsNone(count)
+        self.assertIn("server folder", error)
+
+
+if __name__ == "__main__":
+    unittest.main()
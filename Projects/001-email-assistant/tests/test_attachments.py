@@ -0,0 +1,78 @@
+# tests/test_attachments.py
+import os
+import tempfile
+import unittest
+
+from benchmarks.fake_imap import FakeIMAPServer, FakeMailbox, make_attachment_message
+from features.attachments.attachments import (PARTIAL_SUFFIX, STATE_SUFFIX, download_attachment, download_path,
+                                              fetch_structure, list_attachments)
+from tests.support import PlainSession
+
+ATTACHMENT = bytes(range(256)) * 1024
+CHUNK = 32 * 1024
+
+
+class Interrupted(Exception):
+    pass
+
+
+class AttachmentResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.mailbox = FakeMailbox([make_attachment_message(1, attachment_size=len(ATTACHMENT))])
+        self.server = FakeIMAPServer({"INBOX": self.mailbox})
+        self.server.start()
+        self.session = PlainSession(imap_server=self.server)
+        parts, error = self.session.run_imap(self.attachment_parts)
+        self.assertIsNone(error)
+        self.part, = parts
+
+    def tearDown(self):
+        self.session.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def attachment_parts(self, conn):
+        conn.select("INBOX")
+        structure, error = fetch_structure(conn, 1)
+        return (list_attachments(structure) if structure else None), error
+
+    def download(self, path, progress=None):
+        return self.session.run_imap(
+            lambda conn: download_attachment(conn, 1, self.part, path, "INBOX", chunk_size=CHUNK, progress=progress))
+
+    def test_interrupted_download_resumes_where_it_stopped(self):
+        path = download_path(self.directory.name, self.part, 1)
+        self.assertEqual(os.path.basename(path), "report-1.bin")
+
+        def stop_after_three(done, total):
+            if done >= 3 * CHUNK:
+                raise Interrupted()
+        saved, error = self.download(path, stop_after_three)
+        self.assertIsNone(saved)
+        self.assertIn("Download error", error)
+        self.assertTrue(os.path.exists(path + PARTIAL_SUFFIX))
+        self.assertTrue(os.path.exists(path + STATE_SUFFIX))
+        # the same part maps back onto its unfinished download
+        self.assertEqual(download_path(self.directory.name, self.part, 1), path)
+
+        offsets = []
+        saved, error = self.download(path, lambda done, total: offsets.append(done))
+        self.assertEqual((saved, error), (path, None))
+        # the chunk in flight when it stopped was not saved, so it is fetched again
+        self.assertEqual(offsets[0], 3 * CHUNK)
+        with open(path, "rb") as handle:
+            self.assertEqual(handle.read(), ATTACHMENT)
+        self.assertFalse(os.path.exists(path + PARTIAL_SUFFIX))
+        self.assertFalse(os.path.exists(path + STATE_SUFFIX))
+        self.assertNotIn("\\Seen", self.mailbox.messages[0]["flags"])
+
+    def test_finished_file_is_not_overwritten(self):
+        path = download_path(self.directory.name, self.part, 1)
+        self.assertEqual(self.download(path), (path, None))
+        second = download_path(self.directory.name, self.part, 1)
+        self.assertEqual(os.path.basename(second), "report-1 (1).bin")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# tests/test_body_store.py
+import unittest
+import zlib
+from unittest import mock
+
+from utils import body_store
+from utils.body_store import DICTIONARY_SAMPLES, body_store_stats, find_body, get_body, prune_bodies, put_body
+from utils.mail_cache import cached_body, open_mail_cache, store_records
+
+SIGNATURE = ("\n-- \nJane Example | Accounts Receivable | Example Corporation\n"
+             "This message and any attachments are confidential and intended only for the addressee.\n"
+             "If you received it in error please notify the sender and delete it.\n")
+
+
+def forget_decoded():
+    """Drop the decoded-body and dictionary memos so the next read decompresses"""
+    body_store._decoded.clear()
+    body_store._dictionaries.clear()
+
+
+class BodyDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = open_mail_cache(":memory:")
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_same_text_is_stored_once(self):
+        body = "Meeting moved to Thursday." + SIGNATURE
+        records = [{"uid": 1, "message_id": "<a@example.com>", "size": 900, "body": body}]
+        store_records(self.cache, "INBOX", 1, records)
+        store_records(self.cache, "Archive", 7, [dict(records[0], uid=40)])
+        digest = put_body(self.cache, body, "<b@example.com>")
+        self.assertEqual(body_store_stats(self.cache)["bodies"], 1)
+
+        forget_decoded()
+        self.assertEqual(get_body(self.cache, digest), body)
+        self.assertEqual(cached_body(self.cache, "Archive", 7, 40), body)
+        # a copy elsewhere is found by Message-ID, but only when the size agrees
+        self.assertEqual(find_body(self.cache, "<a@example.com>", 900), (digest, body))
+        self.assertEqual(find_body(self.cache, "<a@example.com>", 901), (None, None))
+
+    def test_prune_keeps_referenced_blobs(self):
+        store_records(self.cache, "INBOX", 1, [{"uid": 1, "message_id": "<kept@example.com>", "body": "kept"}])
+        put_body(self.cache, "orphan", "<gone@example.com>")
+        self.assertEqual(prune_bodies(self.cache), 1)
+        self.assertEqual(cached_body(self.cache, "INBOX", 1, 1), "kept")
+        self.assertEqual(find_body(self.cache, "<gone@example.com>"), (None, None))
+
+
+class DictionaryTrainingTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = open_mail_cache(":memory:")
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_dictionary_is_built_and_used(self):
+        for index in range(DICTIONARY_SAMPLES):
+            put_body(self.cache, f"Invoice {index} is attached, total {index * 13} EUR." + SIGNATURE)
+        stats = body_store_stats(self.cache)
+        self.assertIsNotNone(stats["dictionary"])
+
+        body = "Invoice 9999 is overdue." + SIGNATURE
+        digest = put_body(self.cache, body)
+        dictionary, length, stored = self.cache.execute(
+            "SELECT dictionary, length, LENGTH(data) FROM body_blobs WHERE digest = ?", (digest,)).fetchone()
+        self.assertEqual(dictionary, stats["dictionary"])
+        self.assertEqual(length, len(body))
+        self.assertLess(stored, len(zlib.compress(body.encode())))
+
+        forget_decoded()
+        self.assertEqual(get_body(self.cache, digest), body)
+        # bodies stored before the dictionary still read back
+        self.assertTrue(get_body(self.cache, body_store.body_digest("Invoice 0 is attached, total 0 EUR." + SIGNATURE)))
+
+    def test_failed_training_waits_for_new_samples(self):
+        # no line recurs across bodies, so there is nothing to train on
+        with mock.patch.object(body_store, "_train_dictionary", wraps=body_store._train_dictionary) as train:
+            for index in range(2 * DICTIONARY_SAMPLES):
+                put_body(self.cache, f"Unique body number {index:06d}\n", f"<{index}@example.com>")
+        self.assertEqual(train.call_count, 2)
+        self.assertIsNone(body_store._current_dictionary(self.cache))
+
+
+if __name__ == "__main__":
+    unittest.main()
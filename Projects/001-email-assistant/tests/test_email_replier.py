@@ -0,0 +1,67 @@
+# tests/test_email_replier.py
+import email
+import time
+import unittest
+
+from benchmarks.fake_smtp import FakeSMTPServer
+from utils.email_record import EmailRecord
+from features.email_replier.email_replier import send_reply
+from features.outbox.outbox import Outbox, DeliveryWorker
+from tests.support import PlainSession
+
+NO_DATE_HEADERS = (b"From: Alice <alice@example.com>\r\n"
+                   b"Subject: Lunch\r\n"
+                   b"Message-ID: <lunch-1@example.com>\r\n")
+
+
+class ReplyWithoutDateTest(unittest.TestCase):
+    def test_missing_date_reads_as_none(self):
+        record = EmailRecord(NO_DATE_HEADERS, body="Are you free?")
+        self.assertIsNone(record["date"])
+        self.assertNotIn("date", record)
+        with self.assertRaises(KeyError):
+            record["no_such_field"]
+
+    def test_reply_to_message_without_date(self):
+        record = EmailRecord(NO_DATE_HEADERS, body="Are you free?")
+        with FakeSMTPServer() as server:
+            session = PlainSession(smtp_server=server)
+            try:
+                ok, error = send_reply(session, record, "Yes, noon works.", "me@example.com")
+            finally:
+                session.close()
+        self.assertEqual((ok, error), (True, None))
+        self.assertEqual(len(server.messages), 1)
+        sent = email.message_from_bytes(server.messages[0]["data"])
+        self.assertEqual(sent["To"], "alice@example.com")
+        self.assertEqual(sent["In-Reply-To"], "<lunch-1@example.com>")
+        text = sent.get_payload()[0].get_payload(decode=True).decode()
+        self.assertIn("> Alice <alice@example.com> wrote:", text)
+        self.assertNotIn("None", text)
+
+
+class ReplyThroughOutboxTest(unittest.TestCase):
+    def test_queued_reply_is_delivered_once(self):
+        record = EmailRecord(NO_DATE_HEADERS, body="Are you free?")
+        outbox = Outbox(":memory:")
+        with FakeSMTPServer() as server:
+            session = PlainSession(smtp_server=server)
+            worker = DeliveryWorker(outbox, "me@example.com", session.open_smtp)
+            worker.start()
+            try:
+                ok, error = send_reply(worker, record, "Yes, noon works.", "me@example.com")
+                deadline = time.monotonic() + 5
+                while not server.messages and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.1)
+            finally:
+                worker.stop()
+                session.close()
+                outbox.close()
+        self.assertEqual((ok, error), (True, None))
+        self.assertEqual(len(server.messages), 1)
+        self.assertEqual(server.messages[0]["to"], ["<alice@example.com>"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# tests/test_email_sync.py
+import unittest
+
+from benchmarks.fake_imap import FakeIMAPServer, FakeMailbox, make_simple_message
+from features.email_sync.email_sync import sync_folder
+from utils.mail_cache import open_mail_cache, get_folder_state, cached_uids
+from tests.support import PlainSession
+
+
+class SyncFolderTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = open_mail_cache(":memory:")
+
+    def tearDown(self):
+        self.cache.close()
+
+    def sync(self, mailbox, account="me@example.com", **options):
+        with FakeIMAPServer({"INBOX": mailbox}) as server:
+            session = PlainSession(imap_server=server)
+            try:
+                return session.run_imap(lambda conn: sync_folder(conn, self.cache, "INBOX", account=account,
+                                                                 **options))
+            finally:
+                session.close()
+
+    def test_large_batch_of_new_mail_is_cached_completely(self):
+        mailbox = FakeMailbox([make_simple_message(index) for index in range(1, 4)])
+        _, error = self.sync(mailbox, num_emails=10, sync_limit=5)
+        self.assertIsNone(error)
+        self.assertEqual(cached_uids(self.cache, "INBOX", 1), [1, 2, 3])
+
+        for index in range(4, 16):
+            mailbox.append(make_simple_message(index))
+        records, error = self.sync(mailbox, num_emails=10, sync_limit=5)
+        self.assertIsNone(error)
+        self.assertEqual(cached_uids(self.cache, "INBOX", 1), list(range(1, 16)))
+        self.assertEqual([record["uid"] for record in records], list(range(15, 5, -1)))
+
+    def test_first_sync_takes_newest_page_only(self):
+        mailbox = FakeMailbox([make_simple_message(index) for index in range(1, 13)])
+        _, error = self.sync(mailbox, num_emails=4, sync_limit=5)
+        self.assertIsNone(error)
+        self.assertEqual(cached_uids(self.cache, "INBOX", 1), [9, 10, 11, 12])
+
+    def test_other_account_does_not_reuse_cached_rows(self):
+        first = FakeMailbox([make_simple_message(index) for index in range(1, 6)])
+        self.sync(first, account="me@example.com", num_emails=10)
+        self.assertEqual(get_folder_state(self.cache, "INBOX", "me@example.com")[0], 1)
+
+        # same UIDVALIDITY on the second account's server, fewer messages
+        second = FakeMailbox([make_simple_message(index) for index in range(100, 103)])
+        records, error = self.sync(second, account="work@example.com", num_emails=10)
+        self.assertIsNone(error)
+        self.assertEqual(cached_uids(self.cache, "INBOX", 1), [1, 2, 3])
+        self.assertEqual([record["subject"] for record in records],
+                         [f"Benchmark message {index}" for index in (102, 101, 100)])
+        self.assertEqual(get_folder_state(self.cache, "INBOX", "me@example.com"), (None, 0))
+
+        second.append(make_simple_message(103))
+        records, error = self.sync(second, account="work@example.com", num_emails=10)
+        self.assertIsNone(error)
+        self.assertEqual(cached_uids(self.cache, "INBOX", 1), [1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
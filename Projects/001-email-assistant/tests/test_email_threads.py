@@ -0,0 +1,68 @@
+# tests/test_email_threads.py
+import unittest
+
+from benchmarks.fake_imap import FakeIMAPServer, FakeMailbox, make_simple_message
+from features.email_sync.email_sync import sync_folder
+from features.email_threads.email_threads import ThreadIndex
+from utils.mail_cache import (
+    open_mail_cache, load_records, load_records_by_uid, last_change, changes_since, prune_changes
+)
+from tests.support import PlainSession
+
+
+class ThreadIndexChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.mailbox = FakeMailbox([make_simple_message(index) for index in range(1, 6)])
+        self.server = FakeIMAPServer({"INBOX": self.mailbox})
+        self.server.start()
+        self.session = PlainSession(imap_server=self.server)
+        self.cache = open_mail_cache(":memory:")
+        self.sync()
+        self.index = ThreadIndex()
+        self.seq = last_change(self.cache)
+        self.index.update(load_records(self.cache, "INBOX", 1))
+
+    def tearDown(self):
+        self.session.close()
+        self.server.stop()
+        self.cache.close()
+
+    def sync(self):
+        _, error = self.session.run_imap(lambda conn: sync_folder(conn, self.cache, "INBOX", num_emails=10,
+                                                                  account="me@example.com"))
+        self.assertIsNone(error)
+
+    def catch_up(self):
+        self.seq, deleted, changed = changes_since(self.cache, "INBOX", 1, self.seq)
+        for uid, message_id in deleted:
+            self.index.discard({"message_id": message_id, "folder": "INBOX", "uidvalidity": 1, "uid": uid})
+        self.index.update(load_records_by_uid(self.cache, "INBOX", 1, changed))
+
+    def subjects(self):
+        return sorted(root.record["subject"] for root in self.index.threads())
+
+    def test_expunged_message_leaves_the_index(self):
+        del self.mailbox.messages[1]
+        self.sync()
+        self.catch_up()
+        self.assertEqual(len(self.index), 4)
+        self.assertNotIn("Benchmark message 2", self.subjects())
+
+    def test_flag_change_refreshes_the_indexed_record(self):
+        self.mailbox.messages[4]["flags"].add("\\Seen")
+        self.sync()
+        self.catch_up()
+        newest = next(root.record for root in self.index.threads() if root.record["uid"] == 5)
+        self.assertIn("\\Seen", newest["flags"])
+        self.assertEqual(len(self.index), 5)
+
+    def test_pruned_log_asks_for_a_reload(self):
+        del self.mailbox.messages[0]
+        del self.mailbox.messages[0]
+        self.sync()
+        prune_changes(self.cache, keep=1)
+        self.assertIsNone(changes_since(self.cache, "INBOX", 1, self.seq))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+# tests/test_html_text.py
+import time
+import unittest
+
+from utils.html_text import html_to_text
+
+
+class UnclosedSkippedTagTest(unittest.TestCase):
+    def test_unclosed_head_ends_at_body(self):
+        self.assertEqual(html_to_text("<HEAD>title stuff<body>body"), "body")
+
+    def test_unclosed_title_ends_at_block_tag(self):
+        self.assertEqual(html_to_text("<title>Newsletter<p>First paragraph</p><p>Second</p>"),
+                         "First paragraph\n\nSecond")
+
+    def test_unclosed_title_ends_at_head_close(self):
+        self.assertEqual(html_to_text("<html><head><title>Hi</head><body>Hello there</body></html>"), "Hello there")
+
+    def test_unclosed_style_ends_at_block_tag(self):
+        self.assertEqual(html_to_text("<style>td { color: red; }<div>Kept text</div>"), "Kept text")
+
+    def test_closed_skipped_tags_are_dropped(self):
+        html = "<head><title>T</title><style>p {}</style><script>x < 1</script></head><body><p>Body</p>"
+        self.assertEqual(html_to_text(html), "Body")
+
+    def test_unclosed_script_at_end_is_dropped(self):
+        self.assertEqual(html_to_text("<p>Text</p><script>track(1)"), "Text")
+
+
+class HostileMarkupTest(unittest.TestCase):
+    def test_many_unclosed_skipped_tags_stay_linear(self):
+        # 224 KB of unclosed <head>s took over ten seconds with a rescan per tag
+        html = "<head><p>x</p>" * 16000
+        started = time.perf_counter()
+        text = html_to_text(html)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(text.split(), ["x"] * 16000)
+
+    def test_unclosed_tag_before_closed_one(self):
+        self.assertEqual(html_to_text("<title>a<p>one</p><style>b{}</style><p>two</p>"), "one\n\ntwo")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# tests/test_imap_response.py
+import unittest
+
+from benchmarks.fake_imap import FakeIMAPServer, FakeMailbox, make_simple_message
+from features.email_reader.imap_response import (chunk_ids, compress_id_set, expand_id_set, find_fetch_item,
+                                                  parse_fetch_response, parse_imap_list)
+from tests.support import PlainSession
+
+
+class IdSetTest(unittest.TestCase):
+    def test_compress_merges_runs_and_sorts(self):
+        self.assertEqual(compress_id_set([7, b"3", "1", 2, 9, 8, 2]), "1:3,7:9")
+        self.assertEqual(compress_id_set([5]), "5")
+        self.assertEqual(compress_id_set([]), "")
+
+    def test_expand_inverts_compress(self):
+        ids = [1, 2, 3, 10, 12, 13, 40]
+        self.assertEqual(expand_id_set(compress_id_set(ids)), ids)
+        self.assertEqual(expand_id_set("5:3"), [3, 4, 5])
+
+    def test_chunk_ids(self):
+        self.assertEqual(chunk_ids(range(5), 2), [[0, 1], [2, 3], [4]])
+        self.assertEqual(chunk_ids([1, 2], 0), [[1], [2]])
+
+
+class FetchParserTest(unittest.TestCase):
+    def test_atoms_strings_nil_and_sections(self):
+        data = [b'1 (UID 7 FLAGS (\\Seen $Label) X-NAME "a \\"quoted\\" (name)" '
+                b'BODY[HEADER.FIELDS (FROM DATE)]<0> NIL)']
+        (seq, fields), = parse_fetch_response(data)
+        self.assertEqual(seq, 1)
+        self.assertEqual(fields["UID"], "7")
+        self.assertEqual(fields["FLAGS"], ["\\Seen", "$Label"])
+        self.assertEqual(fields["X-NAME"], 'a "quoted" (name)')
+        self.assertIn("BODY[HEADER.FIELDS (FROM DATE)]<0>", fields)
+        self.assertIsNone(find_fetch_item(fields, "body[header"))
+
+    def test_literals_and_several_messages(self):
+        data = [(b'1 (UID 3 BODY[] {5}', b'hello'), b' RFC822.SIZE 5)',
+                (b'2 (UID 4 BODY[] {3}', b'(x)'), b')']
+        parsed = parse_fetch_response(data)
+        self.assertEqual([seq for seq, _ in parsed], [1, 2])
+        self.assertEqual(parsed[0][1]["BODY[]"], b"hello")
+        self.assertEqual(parsed[0][1]["RFC822.SIZE"], "5")
+        # a literal is opaque even when it looks like list syntax
+        self.assertEqual(parsed[1][1]["BODY[]"], b"(x)")
+
+    def test_untagged_noise_is_skipped(self):
+        data = [b'EXISTS', None, b'2 (UID 9)']
+        self.assertEqual(parse_fetch_response(data), [(2, {"UID": "9"})])
+
+    def test_nested_list(self):
+        value = parse_imap_list(b'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 12 1)')
+        self.assertEqual(value, ["TEXT", "PLAIN", ["CHARSET", "utf-8"], None, None, "7BIT", "12", "1"])
+
+    def test_real_fetch_response(self):
+        raws = [make_simple_message(index, body_size=300) for index in (1, 2, 3)]
+        with FakeIMAPServer({"INBOX": FakeMailbox(raws)}) as server:
+            session = PlainSession(imap_server=server)
+            try:
+                def fetch(conn):
+                    conn.select("INBOX")
+                    status, data = conn.uid("FETCH", compress_id_set([1, 2, 3]), "(UID FLAGS RFC822.SIZE BODY.PEEK[])")
+                    return data, None if status == "OK" else status
+                data, error = session.run_imap(fetch)
+            finally:
+                session.close()
+        self.assertIsNone(error)
+        parsed = parse_fetch_response(data)
+        self.assertEqual([fields["UID"] for _, fields in parsed], ["1", "2", "3"])
+        for (_, fields), raw in zip(parsed, raws):
+            self.assertEqual(fields["FLAGS"], [])
+            self.assertEqual(int(fields["RFC822.SIZE"]), len(raw))
+            self.assertEqual(find_fetch_item(fields, "BODY["), raw)
+
+
+if __name__ == "__main__":
+    unittest.main()
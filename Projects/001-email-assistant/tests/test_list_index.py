@@ -0,0 +1,90 @@
+# tests/test_list_index.py
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+from features.list_index.list_index import ListIndex, parse_day, sender_key
+from utils import helpers
+from utils.helpers import format_email_date
+
+
+def on_day(day):
+    """Patch helpers.date so that today() is `day`"""
+    class FixedDate(date):
+        @classmethod
+        def today(cls):
+            return day
+    return mock.patch.object(helpers, "date", FixedDate)
+
+
+def stamp(*args):
+    return datetime(*args).timestamp()
+
+
+RECORDS = [
+    {"uid": 1, "sender": "Carol <CAROL@example.com>", "timestamp": stamp(2024, 2, 28, 9), "size": 300, "flags": ["\\Seen"]},
+    {"uid": 2, "sender": "alice@example.com", "timestamp": stamp(2024, 2, 29, 23, 30), "size": 100, "flags": []},
+    {"uid": 3, "sender": "Bob <bob@example.com>", "timestamp": stamp(2024, 3, 1, 0, 15), "size": 200,
+     "flags": ["\\Seen", "\\Flagged"]},
+    {"uid": 4, "sender": "Alice <alice@example.com>", "timestamp": stamp(2024, 3, 1, 8), "size": 50, "flags": []},
+    # cached before timestamps were stored: the Date header is parsed instead
+    {"uid": 5, "sender": "dave@example.com", "date": "Thu, 29 Feb 2024 12:00:00 +0000", "size": 400},
+]
+
+
+class ListIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ListIndex(RECORDS)
+
+    def uids(self, **options):
+        return [record["uid"] for record in self.index.view(**options)]
+
+    def test_sorts(self):
+        self.assertEqual(self.uids(sort="date"), [4, 3, 2, 5, 1])
+        self.assertEqual(self.uids(sort="date", descending=False), [1, 5, 2, 3, 4])
+        self.assertEqual(self.uids(sort="size"), [5, 1, 3, 2, 4])
+        # A-Z by address, newest first within a sender
+        self.assertEqual(self.uids(sort="sender"), [4, 2, 3, 1, 5])
+        self.assertEqual(self.uids(sort=None), [1, 2, 3, 4, 5])
+        with self.assertRaises(ValueError):
+            self.index.order(sort="subject")
+
+    def test_filters(self):
+        self.assertEqual(self.uids(unread=True), [4, 2, 5])
+        self.assertEqual(self.uids(sender="ALICE"), [4, 2])
+        self.assertEqual(self.uids(since=parse_day("2024-03-01")), [4, 3])
+        self.assertEqual(self.uids(until=parse_day("2024-02-29"), sort="date", descending=False), [1, 5, 2])
+        self.assertEqual(self.uids(since=date(2024, 2, 29), until=date(2024, 2, 29), unread=True), [2, 5])
+
+    def test_extend_rebuilds_orders(self):
+        self.uids(sort="size")
+        self.index.extend([{"uid": 6, "sender": "eve@example.com", "timestamp": stamp(2024, 3, 2), "size": 999}])
+        self.assertEqual(self.uids(sort="size")[0], 6)
+        self.assertEqual(len(self.index), 6)
+
+    def test_sender_key_and_parse_day(self):
+        self.assertEqual(sender_key('"Smith, J" <J.Smith@Example.com>'), "j.smith@example.com")
+        self.assertEqual(sender_key(None), "")
+        self.assertIsNone(parse_day("  "))
+        with self.assertRaises(ValueError):
+            parse_day("01/03/2024")
+
+
+class FormatEmailDateTest(unittest.TestCase):
+    def test_first_of_the_month(self):
+        with on_day(date(2024, 3, 1)):
+            self.assertEqual(format_email_date(None, stamp(2024, 3, 1, 9, 5)), "Today at 09:05 AM")
+            self.assertEqual(format_email_date(None, stamp(2024, 2, 29, 23, 30)), "Yesterday at 11:30 PM")
+            self.assertEqual(format_email_date(None, stamp(2024, 2, 28, 9)), "Feb 28, 2024 at 09:00 AM")
+
+    def test_first_of_the_year(self):
+        with on_day(date(2025, 1, 1)):
+            self.assertEqual(format_email_date(None, stamp(2024, 12, 31, 18)), "Yesterday at 06:00 PM")
+
+    def test_unparsable_date(self):
+        self.assertEqual(format_email_date("not a date at all, really not"), "not a date at all, really")
+        self.assertEqual(format_email_date(None), "Unknown date")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# tests/test_mail_session.py
+import smtplib
+import socket
+import unittest
+from email.message import EmailMessage
+
+from benchmarks.fake_smtp import FakeSMTPServer
+from tests.support import PlainSession
+
+
+def make_message(to="you@example.com"):
+    msg = EmailMessage()
+    msg["From"] = "me@example.com"
+    msg["To"] = to
+    msg["Subject"] = "Hello"
+    msg.set_content("Hello there.")
+    return msg
+
+
+class SendMessageTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeSMTPServer()
+        self.server.start()
+        self.session = PlainSession(smtp_server=self.server)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.stop()
+
+    def test_error_reply_is_raised_without_resending(self):
+        self.server.fail_next = [451]
+        with self.assertRaises(smtplib.SMTPSenderRefused):
+            self.session.send_message(make_message())
+        self.assertEqual(self.server.messages, [])
+        self.assertEqual(self.session.stats["retries"], 0)
+        self.assertEqual(self.server.stats["connections"], 1)
+
+    def test_refused_recipient_is_raised(self):
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            self.session.send_message(make_message("reject@example.com"))
+        self.assertEqual(self.server.messages, [])
+        self.assertEqual(self.server.stats["connections"], 1)
+
+    def test_dropped_connection_is_reopened_before_sending(self):
+        self.session.send_message(make_message())
+        self.session.smtp().sock.shutdown(socket.SHUT_RDWR)
+        self.session.send_message(make_message())
+        self.assertEqual(len(self.server.messages), 2)
+        self.assertEqual(self.session.stats["smtp_connects"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
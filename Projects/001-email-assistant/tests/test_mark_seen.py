@@ -0,0 +1,66 @@
+# tests/test_mark_seen.py
+import time
+import unittest
+
+from benchmarks.fake_imap import FakeIMAPServer, FakeMailbox, make_simple_message
+from features.body_prefetch.body_prefetch import BodyPrefetcher
+from features.email_reader.email_reader import mark_seen
+from features.email_sync.email_sync import sync_folder, cache_email_flags
+from utils.mail_cache import open_mail_cache, load_records
+from tests.support import PlainSession
+
+
+class PrefetchedBodySeenTest(unittest.TestCase):
+    def setUp(self):
+        self.mailbox = FakeMailbox([make_simple_message(1), make_simple_message(2)])
+        self.server = FakeIMAPServer({"INBOX": self.mailbox})
+        self.server.start()
+        self.session = PlainSession(imap_server=self.server)
+        self.cache = open_mail_cache(":memory:")
+
+    def tearDown(self):
+        self.session.close()
+        self.server.stop()
+        self.cache.close()
+
+    def test_opening_prefetched_body_sets_seen(self):
+        records, error = self.session.run_imap(lambda conn: sync_folder(conn, self.cache, "INBOX", num_emails=2))
+        self.assertIsNone(error)
+        email = next(record for record in records if record["uid"] == 2)
+
+        prefetcher = BodyPrefetcher(self.session.open_imap)
+        prefetcher.start()
+        try:
+            prefetcher.show(records)
+            deadline = time.monotonic() + 5
+            while prefetcher.stats["fetched"] < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(prefetcher.apply(email))
+        finally:
+            prefetcher.stop()
+        # BODY.PEEK: prefetching alone leaves the message unread
+        self.assertNotIn("\\Seen", self.mailbox.messages[1]["flags"])
+
+        _, error = self.session.run_imap(lambda conn: mark_seen(conn, email), folder="INBOX")
+        self.assertIsNone(error)
+        cache_email_flags(self.cache, email)
+
+        self.assertIn("\\Seen", self.mailbox.messages[1]["flags"])
+        self.assertNotIn("\\Seen", self.mailbox.messages[0]["flags"])
+        self.assertIn("\\Seen", email["flags"])
+        cached = {record["uid"]: record for record in load_records(self.cache, "INBOX", email["uidvalidity"])}
+        self.assertIn("\\Seen", cached[2]["flags"])
+        self.assertNotIn("\\Seen", cached[1].get("flags") or [])
+
+    def test_already_seen_message_sends_no_store(self):
+        self.mailbox.messages[0]["flags"].add("\\Seen")
+        email = {"uid": 1, "folder": "INBOX", "flags": ["\\Seen"]}
+        self.session.imap()
+        self.server.reset_stats()
+        _, error = self.session.run_imap(lambda conn: mark_seen(conn, email), folder="INBOX")
+        self.assertIsNone(error)
+        self.assertEqual(self.server.stats["commands"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# tests/test_mime_stream.py
+import os
+import unittest
+from email import message_from_bytes, policy
+
+from benchmarks.fake_imap import FakeIMAPServer, FakeMailbox, make_attachment_message, make_simple_message
+from features.email_reader.email_reader import stream_message
+from features.email_reader.mime_stream import StreamingMimeParser, TempFileSink, parse_message_stream
+from tests.support import PlainSession
+
+QP_MESSAGE = (b"From: a@example.com\r\nSubject: qp\r\nContent-Type: text/plain; charset=utf-8\r\n"
+              b"Content-Transfer-Encoding: quoted-printable\r\n\r\n"
+              b"Caf=C3=A9 au lait, a long line that has to be soft=\r\n wrapped.\r\n")
+
+
+def chunks_of(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class StreamingMimeParserTest(unittest.TestCase):
+    def test_result_does_not_depend_on_chunk_size(self):
+        raw = make_attachment_message(1, attachment_size=4096)
+        expected = message_from_bytes(raw, policy=policy.default).get_body(("plain",)).get_payload(decode=True)
+        for size in (1, 7, 64, 1000, len(raw)):
+            parser = parse_message_stream(chunks_of(raw, size), stop_early=False)
+            self.assertEqual(parser.text["plain"][0], expected, size)
+            self.assertIn("html", parser.text)
+            self.assertEqual([info["size"] for info in parser.attachments], [4096])
+            self.assertEqual(parser.headers["Subject"], "Report 1")
+
+    def test_attachment_spills_to_sink(self):
+        raw = make_attachment_message(2, attachment_size=8192)
+        sink = TempFileSink()
+        try:
+            parser = parse_message_stream(chunks_of(raw, 500), sink=sink, stop_early=False)
+            info, = parser.attachments
+            self.assertEqual(info["filename"], "report-2.bin")
+            with open(info["path"], "rb") as handle:
+                self.assertEqual(handle.read(), bytes(range(256)) * 32)
+        finally:
+            sink.cleanup()
+        self.assertFalse(os.path.exists(info["path"]))
+
+    def test_stops_after_plain_text(self):
+        raw = make_attachment_message(3, attachment_size=256 * 1024)
+        parser = StreamingMimeParser()
+        fed = 0
+        for chunk in chunks_of(raw, 1024):
+            parser.feed(chunk)
+            fed += len(chunk)
+            if parser.done:
+                break
+        self.assertTrue(parser.done)
+        self.assertLess(fed, len(raw) // 10)
+        text, subtype = parser.text_body()
+        self.assertEqual(subtype, "plain")
+        self.assertIn("Please find report 3 attached.", text)
+
+    def test_quoted_printable_and_text_cap(self):
+        parser = parse_message_stream(chunks_of(QP_MESSAGE, 5))
+        self.assertEqual(parser.text_body(), ("Café au lait, a long line that has to be soft wrapped.", "plain"))
+        parser = parse_message_stream([QP_MESSAGE], max_text_bytes=4)
+        self.assertEqual(parser.text["plain"][0], b"Caf\xc3")
+
+    def test_stream_message_fetches_only_the_ranges_it_needs(self):
+        mailbox = FakeMailbox([make_attachment_message(1, attachment_size=1_000_000), make_simple_message(2)])
+        with FakeIMAPServer({"INBOX": mailbox}) as server:
+            session = PlainSession(imap_server=server)
+            try:
+                def stream(conn):
+                    conn.select("INBOX")
+                    return stream_message(conn, 1, chunk_size=16 * 1024, peek=True)
+                parser, error = session.run_imap(stream)
+            finally:
+                session.close()
+        self.assertIsNone(error)
+        self.assertEqual(parser.bytes_fed, 16 * 1024)
+        self.assertIn("Please find report 1 attached.", parser.text_body()[0])
+        self.assertNotIn("\\Seen", mailbox.messages[0]["flags"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+# tests/test_multi_fetch.py
+import unittest
+
+from features.multi_fetch.multi_fetch import get_accounts
+
+PRIMARY = {"email_address": "me@example.com", "app_password": "primary-secret",
+           "imap_server": "imap.example.com", "imap_port": 993,
+           "smtp_server": "smtp.example.com", "smtp_port": 587}
+
+
+class GetAccountsTest(unittest.TestCase):
+    def test_extra_account_without_password_is_skipped(self):
+        config = dict(PRIMARY, accounts=[{"email_address": "other@elsewhere.org", "imap_server": "imap.elsewhere.org"}])
+        accounts, errors = get_accounts(config)
+        self.assertEqual([account["email_address"] for account in accounts], ["me@example.com"])
+        self.assertIn("other@elsewhere.org", errors)
+        self.assertNotIn("primary-secret", [account["app_password"] for account in accounts[1:]])
+
+    def test_extra_account_inherits_only_server_settings(self):
+        config = dict(PRIMARY, accounts=[{"email_address": "work@example.com", "app_password": "work-secret",
+                                          "imap_server": "imap.work.example"}])
+        accounts, errors = get_accounts(config)
+        self.assertEqual(errors, {})
+        extra = accounts[1]
+        self.assertEqual(extra["app_password"], "work-secret")
+        self.assertEqual(extra["imap_server"], "imap.work.example")
+        self.assertEqual((extra["imap_port"], extra["smtp_server"], extra["smtp_port"]),
+                         (993, "smtp.example.com", 587))
+
+    def test_no_primary_account(self):
+        self.assertEqual(get_accounts({}), ([], {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
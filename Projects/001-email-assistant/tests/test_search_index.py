@@ -0,0 +1,41 @@
+# tests/test_search_index.py
+import unittest
+
+from utils.mail_cache import open_mail_cache, store_records
+from utils.search_index import MATCH_START, MATCH_END, ensure_search_index, search_messages, snippet_segments
+
+
+class SnippetTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = open_mail_cache(":memory:")
+        ensure_search_index(self.cache)
+        store_records(self.cache, "INBOX", 1, [{
+            "uid": 1, "sender": "Bob <bob@example.com>", "subject": "Budget",
+            "body": "The [bold] draft of the quarterly budget is attached for review.",
+        }])
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_snippet_marks_matches_without_markup_brackets(self):
+        (records, _), error = search_messages(self.cache, "quarterly")
+        self.assertIsNone(error)
+        self.assertEqual(len(records), 1)
+        snippet = records[0]["snippet"]
+        self.assertIn(f"{MATCH_START}quarterly{MATCH_END}", snippet)
+        self.assertNotIn("[quarterly]", snippet)
+
+        segments = snippet_segments(snippet)
+        self.assertEqual([text for text, matched in segments if matched], ["quarterly"])
+        self.assertEqual("".join(text for text, _ in segments), snippet.replace(MATCH_START, "").replace(MATCH_END, ""))
+        # text that looks like rich markup is kept verbatim, never as a match
+        self.assertIn("[bold]", "".join(text for text, matched in segments if not matched))
+
+    def test_segments_of_leading_match(self):
+        self.assertEqual(snippet_segments(f"{MATCH_START}budget{MATCH_END} is due"),
+                         [("budget", True), (" is due", False)])
+        self.assertEqual(snippet_segments(None), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
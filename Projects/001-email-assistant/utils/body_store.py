@@ -0,0 +1,246 @@
+# utils/body_store.py
+import hashlib
+import threading
+import zlib
+from collections import Counter, OrderedDict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BODY_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS body_blobs (
+    digest TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    dictionary TEXT,
+    length INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS body_refs (
+    message_id TEXT PRIMARY KEY,
+    size INTEGER,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS body_dictionaries (
+    digest TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS body_dictionary_attempts (
+    codec TEXT PRIMARY KEY,
+    last_blob INTEGER NOT NULL
+);
+"""
+
+CODEC = "zstd" if zstandard is not None else "zlib"
+ZSTD_LEVEL = 6
+ZLIB_LEVEL = 6
+# bodies stored before a dictionary is built from them
+DICTIONARY_SAMPLES = 200
+ZSTD_DICTIONARY_BYTES = 64 * 1024
+# zlib only looks back 32 KB, so a larger preset dictionary is wasted
+ZLIB_DICTIONARY_BYTES = 32 * 1024
+DECODED_CACHE_ENTRIES = 64
+
+_DECODE_ERRORS = (zlib.error, LookupError) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+_dictionaries = {}
+_decoded = OrderedDict()
+_lock = threading.Lock()
+
+
+def body_digest(body):
+    """Content address of a body: SHA-256 of its UTF-8 text"""
+    return hashlib.sha256(body.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def put_body(cache, body, message_id=None, size=None):
+    """Store a body once and point its Message-ID at it; returns the digest.
+
+    Text already stored under the same digest (another folder's copy, or
+    the same message in another account) is not compressed or written
+    again.
+    """
+    digest = body_digest(body)
+    with cache:
+        exists = cache.execute("SELECT 1 FROM body_blobs WHERE digest = ?", (digest,)).fetchone()
+        if not exists:
+            dictionary = _current_dictionary(cache)
+            codec, data = _compress(body.encode("utf-8", errors="surrogatepass"), dictionary)
+            cache.execute("INSERT INTO body_blobs (digest, codec, dictionary, length, data) VALUES (?, ?, ?, ?, ?)",
+                          (digest, codec, dictionary[0] if dictionary else None, len(body), data))
+        if message_id:
+            cache.execute("INSERT INTO body_refs (message_id, size, digest) VALUES (?, ?, ?) "
+                          "ON CONFLICT(message_id) DO UPDATE SET size = excluded.size, digest = excluded.digest",
+                          (message_id, size or None, digest))
+    if not exists:
+        _maybe_build_dictionary(cache)
+    return digest
+
+
+def get_body(cache, digest):
+    """Decompressed text of a stored body, or None when missing or unreadable here.
+
+    Recently decoded bodies are shared, so records of the same message in
+    several folders hold one string.
+    """
+    if not digest:
+        return None
+    with _lock:
+        body = _decoded.get(digest)
+        if body is not None:
+            _decoded.move_to_end(digest)
+            return body
+
+    row = cache.execute("SELECT codec, dictionary, data FROM body_blobs WHERE digest = ?", (digest,)).fetchone()
+    if row is None:
+        return None
+    codec, dictionary_digest, data = row
+    dictionary = _load_dictionary(cache, dictionary_digest) if dictionary_digest else None
+    if dictionary_digest and dictionary is None:
+        return None
+    try:
+        body = _decompress(codec, data, dictionary).decode("utf-8", errors="surrogatepass")
+    except _DECODE_ERRORS:
+        # e.g. a zstd blob read on a machine without zstandard: fetch the body again
+        return None
+
+    with _lock:
+        _decoded[digest] = body
+        while len(_decoded) > DECODED_CACHE_ENTRIES:
+            _decoded.popitem(last=False)
+    return body
+
+
+def find_body(cache, message_id, size=None):
+    """(digest, body) stored under a Message-ID, or (None, None).
+
+    When both sides know the message size it has to match, so a reused
+    Message-ID does not hand out another message's text.
+    """
+    if not message_id:
+        return None, None
+    row = cache.execute("SELECT size, digest FROM body_refs WHERE message_id = ?", (message_id,)).fetchone()
+    if row is None or (size and row[0] and size != row[0]):
+        return None, None
+    body = get_body(cache, row[1])
+    return (row[1], body) if body is not None else (None, None)
+
+
+def prune_bodies(cache):
+    """Drop Message-ID references and blobs no cached message uses any more; returns blobs deleted"""
+    with cache:
+        cache.execute("DELETE FROM body_refs WHERE message_id NOT IN "
+                      "(SELECT message_id FROM messages WHERE message_id IS NOT NULL)")
+        deleted = cache.execute(
+            "DELETE FROM body_blobs WHERE digest NOT IN "
+            "(SELECT body_digest FROM messages WHERE body_digest IS NOT NULL) "
+            "AND digest NOT IN (SELECT digest FROM body_refs)").rowcount
+    return deleted
+
+
+def body_store_stats(cache):
+    """Blob count, text bytes and stored bytes, and the dictionary in use"""
+    count, length, stored = cache.execute(
+        "SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(LENGTH(data)), 0) FROM body_blobs").fetchone()
+    dictionary = _current_dictionary(cache)
+    return {"bodies": count, "text_chars": length, "stored_bytes": stored,
+            "codec": CODEC, "dictionary": dictionary[0] if dictionary else None}
+
+
+def _compress(data, dictionary):
+    if CODEC == "zstd":
+        options = {"dict_data": zstandard.ZstdCompressionDict(dictionary[1])} if dictionary else {}
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL, **options).compress(data)
+    if dictionary:
+        compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS, 9,
+                                      zlib.Z_DEFAULT_STRATEGY, dictionary[1])
+    else:
+        compressor = zlib.compressobj(ZLIB_LEVEL)
+    return "zlib", compressor.compress(data) + compressor.flush()
+
+
+def _decompress(codec, data, dictionary):
+    if codec == "zlib":
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS, dictionary) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+    if codec == "zstd":
+        if zstandard is None:
+            raise LookupError("zstandard is not installed")
+        options = {"dict_data": zstandard.ZstdCompressionDict(dictionary)} if dictionary else {}
+        return zstandard.ZstdDecompressor(**options).decompress(data)
+    raise LookupError(f"Unknown body codec: {codec}")
+
+
+def _current_dictionary(cache):
+    row = cache.execute("SELECT digest FROM body_dictionaries WHERE codec = ? ORDER BY rowid DESC LIMIT 1",
+                        (CODEC,)).fetchone()
+    if row is None:
+        return None
+    data = _load_dictionary(cache, row[0])
+    return (row[0], data) if data is not None else None
+
+
+def _load_dictionary(cache, digest):
+    with _lock:
+        data = _dictionaries.get(digest)
+    if data is None:
+        row = cache.execute("SELECT data FROM body_dictionaries WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        data = bytes(row[0])
+        with _lock:
+            _dictionaries[digest] = data
+    return data
+
+
+def _maybe_build_dictionary(cache):
+    """Build the shared dictionary once DICTIONARY_SAMPLES bodies exist without one.
+
+    When training yields nothing, the newest blob is recorded and the next
+    attempt waits for DICTIONARY_SAMPLES more bodies.
+    """
+    if _current_dictionary(cache) is not None:
+        return
+    row = cache.execute("SELECT last_blob FROM body_dictionary_attempts WHERE codec = ?", (CODEC,)).fetchone()
+    last_blob = row[0] if row else 0
+    count = cache.execute("SELECT COUNT(*) FROM body_blobs WHERE dictionary IS NULL AND rowid > ?",
+                          (last_blob,)).fetchone()[0]
+    if count < DICTIONARY_SAMPLES:
+        return
+    digests = [row[0] for row in cache.execute(
+        "SELECT digest FROM body_blobs WHERE dictionary IS NULL ORDER BY rowid DESC LIMIT ?", (DICTIONARY_SAMPLES,))]
+    samples = [body.encode("utf-8", errors="surrogatepass")
+               for body in (get_body(cache, digest) for digest in digests) if body]
+    data = _train_dictionary(samples)
+    if not data:
+        with cache:
+            cache.execute("INSERT INTO body_dictionary_attempts (codec, last_blob) "
+                          "SELECT ?, COALESCE(MAX(rowid), 0) FROM body_blobs WHERE true "
+                          "ON CONFLICT(codec) DO UPDATE SET last_blob = excluded.last_blob", (CODEC,))
+        return
+    with cache:
+        cache.execute("INSERT OR IGNORE INTO body_dictionaries (digest, codec, data) VALUES (?, ?, ?)",
+                      (hashlib.sha256(data).hexdigest(), CODEC, data))
+
+
+def _train_dictionary(samples):
+    if CODEC == "zstd":
+        try:
+            return zstandard.train_dictionary(ZSTD_DICTIONARY_BYTES, samples).as_bytes()
+        except zstandard.ZstdError:
+            return None
+    # zlib: the lines that recur across bodies (signatures, footers, boilerplate),
+    # most common last because deflate reaches the end of the dictionary most cheaply
+    counts = Counter()
+    for sample in samples:
+        counts.update({line for line in sample.splitlines(keepends=True) if len(line) > 8})
+    common = [line for line, seen in counts.most_common() if seen > 1]
+    chosen, total = [], 0
+    for line in common:
+        if total + len(line) > ZLIB_DICTIONARY_BYTES:
+            break
+        chosen.append(line)
+        total += len(line)
+    return b"".join(reversed(chosen)) or None
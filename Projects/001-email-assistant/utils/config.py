@@ -1,37 +1,179 @@
 # utils/config.py
 import os
 import json
-import hashlib
+import threading
+import time
+from types import MappingProxyType
 
 CONFIG_DIR = "config"
 EMAIL_CONFIG_FILE = os.path.join(CONFIG_DIR, "email_config.json")
 PASSKEY_CONFIG_FILE = os.path.join(CONFIG_DIR, "passkey_config.json")
 DEFAULT_PASSKEY = "admin123"
+DEFAULT_PAGE_SIZE = 10
+CONFIG_CHECK_INTERVAL = 1.0
+CONFIG_WATCH_INTERVAL = 2.0
 
 def ensure_config_dir():
     """Ensure config directory exists"""
     os.makedirs(CONFIG_DIR, exist_ok=True)
 
-def load_config(file_path):
-    """Load configuration from JSON file"""
+def freeze_config(value):
+    """Read-only copy of parsed JSON: dicts become mappingproxies, lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze_config(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze_config(item) for item in value)
+    return value
+
+def thaw_config(value):
+    """Plain, JSON-serializable copy of a (possibly frozen) config value"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw_config(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw_config(item) for item in value]
+    return value
+
+def _file_signature(file_path):
     try:
-        if os.path.exists(file_path):
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class ConfigStore:
+    """Process-wide cache of the JSON config files.
+
+    Each file is parsed once and served as an immutable snapshot. The file
+    is stat'ed at most once per `check_interval` and only re-read when its
+    mtime or size changed. Writes go to a temp file that is fsynced and
+    renamed over the original, so a crash leaves either the old or the new
+    file. Subscribers are called with the new snapshot after a save, or when
+    the background watcher (started by the first subscription) sees the
+    file change on disk.
+    """
+
+    def __init__(self, check_interval=CONFIG_CHECK_INTERVAL, watch_interval=CONFIG_WATCH_INTERVAL):
+        self.check_interval = check_interval
+        self.watch_interval = watch_interval
+        self._entries = {}
+        self._subscribers = {}
+        self._lock = threading.RLock()
+        self._watcher = None
+
+    def get(self, file_path):
+        """Immutable snapshot of a config file; empty when missing or invalid"""
+        entry = self._entries.get(file_path)
+        if entry is not None and time.monotonic() - entry[2] < self.check_interval:
+            return entry[1]
+        return self.refresh(file_path)
+
+    def refresh(self, file_path):
+        """Stat the file now and re-read it if it changed"""
+        with self._lock:
+            entry = self._entries.get(file_path)
+            signature = _file_signature(file_path)
+            if entry is not None and entry[0] == signature:
+                entry[2] = time.monotonic()
+                return entry[1]
+
+            snapshot = freeze_config(self._read(file_path) if signature else {})
+            self._entries[file_path] = [signature, snapshot, time.monotonic()]
+        if entry is not None and snapshot != entry[1]:
+            self._notify(file_path, snapshot)
+        return snapshot
+
+    def save(self, file_path, config_data):
+        """Atomically replace a config file; returns True on success"""
+        import tempfile
+
+        data = thaw_config(config_data)
+        directory = os.path.dirname(file_path) or "."
+        try:
+            if directory == CONFIG_DIR:
+                ensure_config_dir()
+            else:
+                os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, file_path)
+            except BaseException:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception:
+            return False
+
+        snapshot = freeze_config(data)
+        with self._lock:
+            self._entries[file_path] = [_file_signature(file_path), snapshot, time.monotonic()]
+        self._notify(file_path, snapshot)
+        return True
+
+    def subscribe(self, file_path, callback):
+        """Call callback(snapshot) whenever the file changes; returns an unsubscribe function"""
+        with self._lock:
+            self.get(file_path)
+            self._subscribers.setdefault(file_path, []).append(callback)
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+                self._watcher.start()
+
+        def unsubscribe():
+            with self._lock:
+                callbacks = self._subscribers.get(file_path, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+        return unsubscribe
+
+    def _read(self, file_path):
+        try:
             with open(file_path, 'r') as f:
-                return json.load(f)
-    except Exception:
-        pass
-    return {}
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def _notify(self, file_path, snapshot):
+        with self._lock:
+            callbacks = list(self._subscribers.get(file_path, ()))
+        for callback in callbacks:
+            try:
+                callback(snapshot)
+            except Exception:
+                pass
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            with self._lock:
+                paths = [path for path, callbacks in self._subscribers.items() if callbacks]
+            for path in paths:
+                self.refresh(path)
+
+config_store = ConfigStore()
+
+def load_config(file_path):
+    """Load configuration from JSON file (cached, read-only snapshot)"""
+    return config_store.get(file_path)
 
 def save_config(file_path, config_data):
     """Save configuration to JSON file"""
+    return config_store.save(file_path, config_data)
+
+def get_int_setting(config, key, default):
+    """Read an optional integer setting stored as a string"""
     try:
-        ensure_config_dir()
-        with open(file_path, 'w') as f:
-            json.dump(config_data, f, indent=4)
-        return True
-    except Exception:
-        return False
+        return int(config.get(key, default))
+    except (TypeError, ValueError):
+        return default
 
 def hash_passkey(passkey):
     """Hash passkey for secure storage"""
-    return hashlib.sha256(passkey.encode()).hexdigest()
\ No newline at end of file
+    import hashlib
+    return hashlib.sha256(passkey.encode()).hexdigest()
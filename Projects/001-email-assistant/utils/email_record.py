@@ -0,0 +1,165 @@
+# utils/email_record.py
+import re
+
+_HEADER = re.compile(rb'^([^:\s]+):[ \t]*(.*(?:\r?\n[ \t].*)*)', re.MULTILINE)
+_LAZY_HEADERS = (b"from", b"subject", b"date")
+_UNSET = object()
+
+
+def _unfold(value):
+    return re.sub(r'\r?\n(?=[ \t])', '', value.decode('utf-8', errors='replace')).strip()
+
+
+class EmailRecord:
+    """Compact email record that decodes its fields on first access.
+
+    Keeps the raw header block plus (start, end) offsets of From, Subject
+    and Date, and the undecoded text part of the body. Message-ID,
+    In-Reply-To and References are plain fields so replies never need the
+    parsed message; `timestamp` is the sort key, set once at ingest.
+    Supports the dict-style access (`record["sender"]`, `.get`, `in`) the
+    rest of the app uses; known fields that are unset read as None and
+    count as missing for `in`, unknown keys raise KeyError.
+    """
+
+    __slots__ = ("id", "uid", "folder", "uidvalidity", "account", "message_id", "in_reply_to",
+                 "references", "flags", "size", "timestamp", "structure", "preview", "snippet",
+                 "_headers", "_offsets", "_sender", "_subject", "_date", "_body", "_body_source", "_extra")
+
+    _FIELDS = frozenset(__slots__[:14]) | {"sender", "subject", "date", "body"}
+
+    def __init__(self, headers=b"", body_source=None, **fields):
+        self._headers = bytes(headers or b"")
+        self._offsets = ()
+        self._sender = self._subject = self._date = _UNSET
+        self._body = _UNSET if body_source else None
+        self._body_source = body_source
+        self._extra = None
+        for name in self.__slots__[:14]:
+            setattr(self, name, None)
+
+        offsets = {}
+        for match in _HEADER.finditer(self._headers):
+            name = match.group(1).lower()
+            if name in _LAZY_HEADERS and name not in offsets:
+                offsets[name] = match.span(2)
+            elif name == b"message-id" and self.message_id is None:
+                self.message_id = _unfold(match.group(2))
+            elif name == b"in-reply-to" and self.in_reply_to is None:
+                self.in_reply_to = _unfold(match.group(2))
+            elif name == b"references" and self.references is None:
+                self.references = " ".join(_unfold(match.group(2)).split())
+        self._offsets = tuple(offsets.get(name, (-1, -1)) for name in _LAZY_HEADERS)
+
+        for name, value in fields.items():
+            self[name] = value
+
+    @property
+    def sender(self):
+        if self._sender is _UNSET:
+            self._sender = self._decode_header(0)
+        return self._sender
+
+    @sender.setter
+    def sender(self, value):
+        self._sender = value
+
+    @property
+    def subject(self):
+        if self._subject is _UNSET:
+            self._subject = self._decode_header(1) or "(No Subject)"
+        return self._subject
+
+    @subject.setter
+    def subject(self, value):
+        self._subject = value
+
+    @property
+    def date(self):
+        if self._date is _UNSET:
+            start, end = self._offsets[2] if self._offsets else (-1, -1)
+            self._date = _unfold(self._headers[start:end]) if start >= 0 else None
+        return self._date
+
+    @date.setter
+    def date(self, value):
+        self._date = value
+
+    @property
+    def body(self):
+        if self._body is _UNSET:
+            from utils.helpers import html_to_plain_text, clean_email_content
+            data, charset, subtype = self._body_source
+            try:
+                text = data.decode(charset or 'utf-8', errors='replace')
+            except LookupError:
+                text = data.decode('utf-8', errors='replace')
+            if subtype == "html":
+                text = html_to_plain_text(text)
+            self._body = clean_email_content(text) if text else "(No body content)"
+            self._body_source = None
+        return self._body
+
+    @body.setter
+    def body(self, value):
+        self._body = value
+        self._body_source = None
+
+    def _decode_header(self, index):
+        from utils.helpers import decode_header_value
+        start, end = self._offsets[index] if self._offsets else (-1, -1)
+        if start < 0:
+            return ""
+        return decode_header_value(_unfold(self._headers[start:end]))
+
+    def __getitem__(self, key):
+        if key in self._FIELDS:
+            return getattr(self, key)
+        value = (self._extra or {}).get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        """dict.get equivalent"""
+        if key in self._FIELDS:
+            value = getattr(self, key)
+        else:
+            value = (self._extra or {}).get(key)
+        return default if value is None else value
+
+    def keys(self):
+        """Names of the fields that are set"""
+        names = [name for name in sorted(self._FIELDS) if name != "body" and self.get(name) is not None]
+        if self._body is not None:
+            names.append("body")
+        return names + list(self._extra or {})
+
+    def to_dict(self):
+        """Plain dict copy with every set field decoded"""
+        return {name: self.get(name) for name in self.keys()}
+
+    def __getstate__(self):
+        # Records leave a parse worker fully decoded, without the raw header block
+        self.sender, self.subject, self.date, self.body
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state["_headers"], state["_offsets"] = b"", ()
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"EmailRecord(uid={self.uid!r}, subject={self.subject!r})"
@@ -1,35 +1,50 @@
 # utils/config.py
 import re
 import textwrap
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from email.header import decode_header
 from email.utils import parsedate_to_datetime
 
-def clean_email_body(body):
+from utils.html_text import html_to_text, looks_like_html
+from utils.profiler import profiler
+
+def clean_email_body(body, max_chars=None):
     """Clean HTML and format email body"""
     if not body:
         return "(No content)"
     
-    clean_body = re.sub(r'<[^>]+>', '', body)
+    clean_body = html_to_text(body, max_chars) if looks_like_html(body) else body[:max_chars]
     clean_body = re.sub(r'\s+', ' ', clean_body)
     return clean_body.strip()
 
-def format_email_date(date_string):
-    """Format email date in readable format"""
+def date_timestamp(date_string):
+    """POSIX timestamp of a Date header, or None when it does not parse"""
     if not date_string:
-        return "Unknown date"
-    
+        return None
     try:
-        dt = parsedate_to_datetime(date_string)
-        now = datetime.now()
-        
-        if dt.date() == now.date():
-            return f"Today at {dt.strftime('%I:%M %p')}"
-        elif dt.date() == now.replace(day=now.day-1).date():
-            return f"Yesterday at {dt.strftime('%I:%M %p')}"
-        else:
-            return dt.strftime("%b %d, %Y at %I:%M %p")
-    except:
-        return date_string[:25]
+        return parsedate_to_datetime(date_string).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+def format_email_date(date_string, timestamp=None):
+    """Format email date in readable local time; pass the record's timestamp to skip parsing"""
+    if timestamp is None:
+        timestamp = date_timestamp(date_string)
+    if timestamp is None:
+        return date_string[:25] if date_string else "Unknown date"
+
+    try:
+        dt = datetime.fromtimestamp(timestamp)
+    except (OverflowError, OSError, ValueError):
+        return date_string[:25] if date_string else "Unknown date"
+    today = date.today()
+
+    if dt.date() == today:
+        return f"Today at {dt.strftime('%I:%M %p')}"
+    elif dt.date() == today - timedelta(days=1):
+        return f"Yesterday at {dt.strftime('%I:%M %p')}"
+    else:
+        return dt.strftime("%b %d, %Y at %I:%M %p")
 
 def extract_clean_sender(sender_header):
     """Extract clean sender name and email"""
@@ -46,4 +61,36 @@ def extract_clean_sender(sender_header):
 
 def wrap_text(text, width=70):
     """Wrap text to specified width"""
-    return textwrap.fill(text, width=width)
\ No newline at end of file
+    return textwrap.fill(text, width=width)
+
+def decode_header_value(header):
+    """Decode email header value"""
+    if not header:
+        return ""
+    
+    decoded_parts = decode_header(header)
+    result = []
+    for part, encoding in decoded_parts:
+        if isinstance(part, bytes):
+            result.append(part.decode(encoding or 'utf-8'))
+        else:
+            result.append(part)
+    
+    return ' '.join(result)
+
+@profiler.timed("html to text")
+def html_to_plain_text(html, max_chars=None):
+    """Convert HTML to plain text"""
+    return html_to_text(html, max_chars)
+
+def clean_email_content(text):
+    """Clean email content by removing common clutter"""
+    if not text:
+        return ""
+    
+    lines = text.split('\n')
+    clean_lines = [line for line in lines if not line.strip().startswith('>')]
+    cleaned_text = '\n'.join(clean_lines)
+    cleaned_text = re.sub(r'\n\s*\n', '\n\n', cleaned_text)
+    
+    return cleaned_text.strip()
\ No newline at end of file
@@ -0,0 +1,111 @@
+# utils/html_text.py
+import re
+from bisect import bisect_left
+from html import unescape
+
+PARAGRAPH_TAGS = ("blockquote", "h[1-6]", "hr", "p", "table", "ul", "ol")
+LINE_TAGS = ("address", "article", "aside", "br", "dd", "div", "dl", "dt", "footer", "form",
+             "header", "li", "main", "nav", "pre", "section", "tbody", "td", "tfoot", "th", "thead", "tr")
+SKIP_TAGS = ("head", "noscript", "script", "style", "svg", "template", "title")
+PREVIEW_WINDOW_FACTOR = 8
+
+# Break markers survive whitespace collapsing and are turned into newlines at the end
+_LINE, _PARAGRAPH, _PRE_SPACE = "\x00", "\x01", "\x02"
+
+_SKIP_OPEN = re.compile(r'<(%s)\b[^>]*>' % "|".join(SKIP_TAGS), re.IGNORECASE)
+_SKIP_CLOSE = re.compile(r'</(%s)\s*>' % "|".join(SKIP_TAGS), re.IGNORECASE)
+# An unclosed skipped element ends where the document visibly goes on: </head>, <body> or a block tag
+_SKIP_BOUNDARY = re.compile(r'</head\s*>|<body\b|</?(?:%s)\b' % "|".join(PARAGRAPH_TAGS + LINE_TAGS),
+                            re.IGNORECASE)
+_PRE = re.compile(r'<pre\b[^>]*>.*?(?:</pre\s*>|$)', re.IGNORECASE | re.DOTALL)
+_PARAGRAPH_TAG = re.compile(r'</?(?:%s)\b[^>]*>' % "|".join(PARAGRAPH_TAGS), re.IGNORECASE)
+_LINE_TAG = re.compile(r'</?(?:%s)\b[^>]*>' % "|".join(LINE_TAGS), re.IGNORECASE)
+_OTHER_MARKUP = re.compile(r'<(?:/?[a-zA-Z][^>]*>|!--.*?(?:-->|$)|[!?][^>]*>)', re.DOTALL)
+_WHITESPACE = re.compile(r'\s+')
+_BREAKS = re.compile(r'[\x00\x01][\x00\x01 ]*')
+
+
+def _protect_pre(match):
+    return match.group(0).replace(" ", _PRE_SPACE).replace("\n", _LINE)
+
+
+def _break(match):
+    return "\n\n" if _PARAGRAPH in match.group(0) else "\n"
+
+
+def _strip_skipped(html):
+    """Remove skipped elements, each up to its closing tag or, unclosed, the next boundary.
+
+    Closing tags and boundaries are listed once and looked up by bisection,
+    so hostile input full of unclosed tags stays linear.
+    """
+    opening = _SKIP_OPEN.search(html)
+    if opening is None:
+        return html
+    closes = {}
+    for match in _SKIP_CLOSE.finditer(html, opening.end()):
+        closes.setdefault(match.group(1).lower(), []).append(match.span())
+    boundaries = None
+
+    parts, position = [], 0
+    while opening is not None:
+        parts.append(html[position:opening.start()])
+        ends = closes.get(opening.group(1).lower(), ())
+        index = bisect_left(ends, opening.end(), key=lambda span: span[0])
+        if index < len(ends):
+            position = ends[index][1]
+        else:
+            if boundaries is None:
+                boundaries = [match.start() for match in _SKIP_BOUNDARY.finditer(html)]
+            index = bisect_left(boundaries, opening.end())
+            position = boundaries[index] if index < len(boundaries) else len(html)
+        opening = _SKIP_OPEN.search(html, position)
+    parts.append(html[position:])
+    return "".join(parts)
+
+
+def _convert(html):
+    html = _strip_skipped(html)
+    if "<pre" in html or "<PRE" in html:
+        html = _PRE.sub(_protect_pre, html)
+    html = _PARAGRAPH_TAG.sub(_PARAGRAPH, html)
+    html = _LINE_TAG.sub(_LINE, html)
+    html = _OTHER_MARKUP.sub("", html)
+    text = _WHITESPACE.sub(" ", unescape(html) if "&" in html else html)
+    text = _BREAKS.sub(_break, text).replace(" \n", "\n")
+    return text.replace(_PRE_SPACE, " ").strip()
+
+
+def html_to_text(html, max_chars=None):
+    """Convert HTML to readable text.
+
+    Drops script/style/head content, decodes entities and keeps line and
+    paragraph breaks. Every step is a linear pass over the whole string:
+    regex substitutions, plus one scan that skips head/script/style
+    elements by bisecting precomputed tag positions. With `max_chars` only a
+    growing prefix of the markup is converted until enough text exists,
+    which makes previews of huge bodies cheap. Malformed markup degrades
+    gracefully: stray '<' stays text, and an unclosed head, title,
+    script or style ends at </head>, <body> or the next block tag.
+    """
+    if not html:
+        return ""
+    if not max_chars:
+        return _convert(html)
+
+    window = max_chars * PREVIEW_WINDOW_FACTOR
+    while True:
+        prefix = html[:window]
+        if window < len(html):
+            cut = prefix.rfind("<")
+            if cut > prefix.rfind(">"):
+                prefix = prefix[:cut]
+        text = _convert(prefix)
+        if len(text) >= max_chars or window >= len(html):
+            return text[:max_chars]
+        window *= 4
+
+
+def looks_like_html(text):
+    """Cheap check for markup or entities worth running the converter on"""
+    return "<" in text or "&" in text
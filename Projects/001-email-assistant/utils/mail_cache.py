@@ -0,0 +1,308 @@
+# utils/mail_cache.py
+import json
+import os
+import sqlite3
+
+from utils.email_record import EmailRecord
+from utils.body_store import BODY_STORE_SCHEMA, put_body, get_body, find_body, prune_bodies
+from utils.config import CONFIG_DIR, ensure_config_dir
+
+CACHE_DB_FILE = os.path.join(CONFIG_DIR, "mail_cache.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    folder TEXT PRIMARY KEY,
+    uidvalidity INTEGER NOT NULL,
+    highest_modseq INTEGER NOT NULL DEFAULT 0,
+    account TEXT,
+    local INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    sender TEXT,
+    subject TEXT,
+    date TEXT,
+    timestamp REAL,
+    message_id TEXT,
+    in_reply_to TEXT,
+    references_header TEXT,
+    flags TEXT,
+    size INTEGER,
+    structure TEXT,
+    preview TEXT,
+    body TEXT,
+    body_digest TEXT,
+    PRIMARY KEY (folder, uidvalidity, uid)
+);
+CREATE TABLE IF NOT EXISTS message_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    message_id TEXT,
+    deleted INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS message_flags_changed AFTER UPDATE OF flags ON messages
+WHEN old.flags IS NOT new.flags BEGIN
+    INSERT INTO message_changes (folder, uidvalidity, uid, message_id, deleted)
+    VALUES (new.folder, new.uidvalidity, new.uid, new.message_id, 0);
+END;
+CREATE TRIGGER IF NOT EXISTS message_deleted AFTER DELETE ON messages BEGIN
+    INSERT INTO message_changes (folder, uidvalidity, uid, message_id, deleted)
+    VALUES (old.folder, old.uidvalidity, old.uid, old.message_id, 1);
+END;
+"""
+
+# flag changes and deletions kept for in-memory views (the thread index) to catch up with
+CHANGE_LOG_LIMIT = 10000
+
+RECORD_COLUMNS = ("uid", "sender", "subject", "date", "timestamp", "message_id", "in_reply_to",
+                   "references_header", "flags", "size", "structure", "preview", "body")
+
+
+def open_mail_cache(path=CACHE_DB_FILE):
+    """Open (and create if needed) the on-disk message cache"""
+    if path == CACHE_DB_FILE:
+        ensure_config_dir()
+    cache = sqlite3.connect(path)
+    cache.execute("PRAGMA journal_mode=WAL")
+    cache.execute("PRAGMA synchronous=NORMAL")
+    cache.executescript(_SCHEMA + BODY_STORE_SCHEMA)
+    columns = {row[1] for row in cache.execute("PRAGMA table_info(messages)")}
+    if "timestamp" not in columns:
+        # caches created before sort keys were stored; their rows fall back to the Date header
+        cache.execute("ALTER TABLE messages ADD COLUMN timestamp REAL")
+    if "body_digest" not in columns:
+        # bodies cached inline before the body store are still read from the body column
+        cache.execute("ALTER TABLE messages ADD COLUMN body_digest TEXT")
+    folder_columns = {row[1] for row in cache.execute("PRAGMA table_info(folders)")}
+    if "account" not in folder_columns:
+        # folders synced before the owning account was recorded are re-synced once
+        cache.execute("ALTER TABLE folders ADD COLUMN account TEXT")
+    if "local" not in folder_columns:
+        cache.execute("ALTER TABLE folders ADD COLUMN local INTEGER NOT NULL DEFAULT 0")
+    return cache
+
+
+def get_folder_state(cache, folder, account=None):
+    """Return (uidvalidity, highest_modseq) for a folder, or (None, 0).
+
+    With `account`, a folder cached for another account (or before the
+    account was recorded) counts as not cached; local folders belong to
+    every account.
+    """
+    row = cache.execute("SELECT uidvalidity, highest_modseq, account, local FROM folders WHERE folder = ?",
+                        (folder,)).fetchone()
+    if row is None or (account is not None and row[2] != account and not row[3]):
+        return None, 0
+    return row[0], row[1]
+
+
+def set_folder_state(cache, folder, uidvalidity, highest_modseq=0, account=None, local=False):
+    """Record the folder's UIDVALIDITY, last seen HIGHESTMODSEQ and the account it was synced for.
+
+    `local` marks a folder that exists only in the cache (an imported
+    archive): its messages are never looked up on a server.
+    """
+    with cache:
+        cache.execute("INSERT INTO folders (folder, uidvalidity, highest_modseq, account, local) "
+                      "VALUES (?, ?, ?, ?, ?) "
+                      "ON CONFLICT(folder) DO UPDATE SET uidvalidity = excluded.uidvalidity, "
+                      "highest_modseq = excluded.highest_modseq, account = excluded.account, "
+                      "local = excluded.local",
+                      (folder, uidvalidity, highest_modseq, account, int(local)))
+
+
+def is_local_folder(cache, folder):
+    """True for a folder that exists only in the cache"""
+    row = cache.execute("SELECT local FROM folders WHERE folder = ?", (folder,)).fetchone()
+    return bool(row and row[0])
+
+
+def reset_folder(cache, folder):
+    """Drop every cached message of a folder (UIDVALIDITY or account changed)"""
+    with cache:
+        cache.execute("DELETE FROM messages WHERE folder = ?", (folder,))
+        cache.execute("DELETE FROM folders WHERE folder = ?", (folder,))
+    prune_bodies(cache)
+
+
+def max_cached_uid(cache, folder, uidvalidity):
+    """Return the highest cached UID of a folder, or 0"""
+    row = cache.execute("SELECT MAX(uid) FROM messages WHERE folder = ? AND uidvalidity = ?",
+                        (folder, uidvalidity)).fetchone()
+    return row[0] or 0
+
+
+def cached_uids(cache, folder, uidvalidity):
+    """Return all cached UIDs of a folder in ascending order"""
+    rows = cache.execute("SELECT uid FROM messages WHERE folder = ? AND uidvalidity = ? ORDER BY uid",
+                         (folder, uidvalidity))
+    return [row[0] for row in rows]
+
+
+def store_records(cache, folder, uidvalidity, records):
+    """Insert or replace parsed email records; their bodies go to the body store"""
+    rows = []
+    bodies = []
+    for record in records:
+        if record.get("body") is not None:
+            bodies.append(record)
+        rows.append((
+            folder, uidvalidity, record["uid"], record.get("sender"), record.get("subject"),
+            record.get("date"), record.get("timestamp"), record.get("message_id"), record.get("in_reply_to"),
+            record.get("references"), json.dumps(record.get("flags") or []), record.get("size") or 0,
+            json.dumps(record.get("structure")), record.get("preview"), None
+        ))
+    updates = ", ".join(f"{column} = excluded.{column}" for column in RECORD_COLUMNS[1:] if column != "body")
+    with cache:
+        cache.executemany(
+            "INSERT INTO messages (folder, uidvalidity, " + ", ".join(RECORD_COLUMNS) + ") "
+            "VALUES (" + ", ".join("?" * (len(RECORD_COLUMNS) + 2)) + ") "
+            "ON CONFLICT(folder, uidvalidity, uid) DO UPDATE SET " + updates +
+            ", body = COALESCE(excluded.body, messages.body)", rows)
+    for record in bodies:
+        store_body(cache, folder, uidvalidity, record["uid"], record["body"],
+                   record.get("message_id"), record.get("size"))
+
+
+def store_body(cache, folder, uidvalidity, uid, body, message_id=None, size=None):
+    """Save a downloaded body in the body store and link the cached message to it"""
+    digest = put_body(cache, body, message_id, size)
+    _link_body(cache, folder, uidvalidity, uid, digest, body)
+
+
+def cached_body(cache, folder, uidvalidity, uid, message_id=None, size=None):
+    """Body of a message from the cache: its own copy, else any copy with the same Message-ID, else None"""
+    row = cache.execute("SELECT body, body_digest FROM messages WHERE folder = ? AND uidvalidity = ? AND uid = ?",
+                        (folder, uidvalidity, uid)).fetchone()
+    if row is not None and row[0] is not None:
+        return row[0]
+    body = get_body(cache, row[1]) if row is not None else None
+    if body is not None:
+        return body
+
+    digest, body = find_body(cache, message_id, size)
+    if body is not None and row is not None:
+        _link_body(cache, folder, uidvalidity, uid, digest, body)
+    return body
+
+
+def _link_body(cache, folder, uidvalidity, uid, digest, body):
+    with cache:
+        cache.execute("UPDATE messages SET body = NULL, body_digest = ? WHERE folder = ? AND uidvalidity = ? AND uid = ?",
+                      (digest, folder, uidvalidity, uid))
+        try:
+            # the messages triggers only see the body column, so hand the text to the search index here
+            cache.execute("UPDATE message_index SET body = ? WHERE rowid = "
+                          "(SELECT rowid FROM messages WHERE folder = ? AND uidvalidity = ? AND uid = ?)",
+                          (body, folder, uidvalidity, uid))
+        except sqlite3.OperationalError:
+            # no search index (yet, or no FTS5); ensure_search_index back-fills from the store
+            pass
+
+
+def update_flags(cache, folder, uidvalidity, flags_by_uid):
+    """Apply {uid: flags} changes to cached messages"""
+    with cache:
+        cache.executemany("UPDATE messages SET flags = ? WHERE folder = ? AND uidvalidity = ? AND uid = ?",
+                          [(json.dumps(flags), folder, uidvalidity, uid) for uid, flags in flags_by_uid.items()])
+
+
+def delete_uid_ranges(cache, folder, uidvalidity, ranges):
+    """Delete cached messages inside inclusive (low, high) UID ranges"""
+    with cache:
+        cache.executemany("DELETE FROM messages WHERE folder = ? AND uidvalidity = ? AND uid BETWEEN ? AND ?",
+                          [(folder, uidvalidity, low, high) for low, high in ranges])
+
+
+def last_change(cache):
+    """Sequence number of the newest logged flag change or deletion, 0 when none"""
+    row = cache.execute("SELECT MAX(seq) FROM message_changes").fetchone()
+    return row[0] or 0
+
+
+def changes_since(cache, folder, uidvalidity, seq):
+    """(newest seq, deleted [(uid, message_id)], uids with new flags) logged after `seq`.
+
+    Returns None when entries after `seq` were already pruned, so the
+    caller has to reload instead of catching up.
+    """
+    oldest = cache.execute("SELECT MIN(seq) FROM message_changes").fetchone()[0]
+    newest = last_change(cache)
+    if oldest is not None and oldest > seq + 1 and newest > seq:
+        return None
+    deleted, changed = [], set()
+    for uid, message_id, was_deleted in cache.execute(
+            "SELECT uid, message_id, deleted FROM message_changes "
+            "WHERE seq > ? AND seq <= ? AND folder = ? AND uidvalidity = ? ORDER BY seq",
+            (seq, newest, folder, uidvalidity)):
+        if was_deleted:
+            deleted.append((uid, message_id))
+            changed.discard(uid)
+        else:
+            changed.add(uid)
+    return newest, deleted, sorted(changed)
+
+
+def prune_changes(cache, keep=CHANGE_LOG_LIMIT):
+    """Forget all but the newest `keep` logged changes"""
+    with cache:
+        cache.execute("DELETE FROM message_changes WHERE seq <= (SELECT MAX(seq) FROM message_changes) - ?",
+                      (keep,))
+
+
+def load_records_by_uid(cache, folder, uidvalidity, uids):
+    """Load the cached records of the given UIDs (missing ones are skipped)"""
+    local = is_local_folder(cache, folder)
+    query = ("SELECT " + ", ".join(RECORD_COLUMNS) + " FROM messages WHERE folder = ? AND uidvalidity = ? "
+             "AND uid IN (SELECT value FROM json_each(?)) ORDER BY uid")
+    return [record_from_row(row, folder, uidvalidity, local)
+            for row in cache.execute(query, (folder, uidvalidity, json.dumps(list(uids))))]
+
+
+def load_records(cache, folder, uidvalidity, limit=None, before_uid=None, after_uid=None):
+    """Load cached records newest first, optionally below and/or above a UID"""
+    query = "SELECT " + ", ".join(RECORD_COLUMNS) + " FROM messages WHERE folder = ? AND uidvalidity = ?"
+    params = [folder, uidvalidity]
+    if before_uid is not None:
+        query += " AND uid < ?"
+        params.append(before_uid)
+    if after_uid is not None:
+        query += " AND uid > ?"
+        params.append(after_uid)
+    query += " ORDER BY uid DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    local = is_local_folder(cache, folder)
+    return [record_from_row(row, folder, uidvalidity, local) for row in cache.execute(query, params)]
+
+
+def record_from_row(row, folder, uidvalidity, local=False):
+    """Build an email record from a row selected in RECORD_COLUMNS order; local marks a cache-only folder"""
+    values = dict(zip(RECORD_COLUMNS, row))
+    record = EmailRecord(
+        id=str(values["uid"]),
+        uid=values["uid"],
+        folder=folder,
+        uidvalidity=uidvalidity,
+        sender=values["sender"],
+        subject=values["subject"],
+        date=values["date"],
+        timestamp=values["timestamp"],
+        message_id=values["message_id"],
+        in_reply_to=values["in_reply_to"],
+        references=values["references_header"],
+        flags=json.loads(values["flags"] or "[]"),
+        size=values["size"],
+        structure=json.loads(values["structure"] or "null"),
+        preview=values["preview"],
+        body=values["body"]
+    )
+    if local:
+        record["local"] = True
+    return record
@@ -0,0 +1,86 @@
+# utils/parse_pool.py
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_PARSE_CHUNK = 64
+MIN_POOL_BATCH = 256
+
+_pool = None
+_pool_workers = 0
+_pool_failed = False
+_lock = threading.Lock()
+
+
+def parse_workers():
+    """Worker processes for bulk parsing: one per core"""
+    return os.cpu_count() or 1
+
+
+def map_chunks(func, items, chunk_size=DEFAULT_PARSE_CHUNK, min_batch=MIN_POOL_BATCH, workers=None):
+    """Run func(chunk) -> list over items in chunks on a process pool; results keep the input order.
+
+    func must be a module-level function so it can be sent to the workers.
+    Batches under min_batch, single-core machines and a pool that cannot
+    start or breaks run func(items) in-process instead, so callers always
+    get the same results.
+    """
+    items = list(items)
+    workers = parse_workers() if workers is None else workers
+    if len(items) < max(min_batch, 1) or workers < 2:
+        return func(items)
+
+    pool = _get_pool(workers)
+    if pool is None:
+        return func(items)
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    try:
+        results = []
+        for chunk_results in pool.map(func, chunks):
+            results.extend(chunk_results)
+        return results
+    except Exception:
+        _discard_pool()
+        return func(items)
+
+
+def shutdown_pool():
+    """Stop the worker processes; the next large batch starts a new pool"""
+    global _pool, _pool_workers
+    with _lock:
+        pool, _pool, _pool_workers = _pool, None, 0
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _lock:
+        if _pool_failed:
+            return None
+        if _pool is not None and _pool_workers == workers:
+            return _pool
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            # spawn: the app runs IMAP threads, which fork would copy mid-operation
+            _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, NotImplementedError, ValueError):
+            _pool = None
+            return None
+        _pool_workers = workers
+        return _pool
+
+
+def _discard_pool():
+    global _pool, _pool_workers, _pool_failed
+    with _lock:
+        pool, _pool, _pool_workers = _pool, None, 0
+        _pool_failed = True
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown_pool)
@@ -0,0 +1,276 @@
+# utils/profiler.py
+import atexit
+import functools
+import sys
+import threading
+import time
+
+MAX_TRACE_EVENTS = 200_000
+SMTP_VERBS = {"EHLO", "HELO", "STARTTLS", "AUTH", "MAIL", "RCPT", "DATA", "BDAT",
+              "RSET", "NOOP", "QUIT", "VRFY", "EXPN", "HELP"}
+
+
+class _NullSpan:
+    """Shared no-op context manager handed out while profiling is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "kind", "name", "start")
+
+    def __init__(self, profiler, kind, name):
+        self.profiler = profiler
+        self.kind = kind
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.kind, self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """Timed events from instrumented IMAP/SMTP connections and code spans.
+
+    Off by default: span() then returns a shared no-op context manager and
+    connections are left unwrapped, so the hooks cost an attribute check.
+    Every event is folded into per-(kind, name) totals for the summary; the
+    first MAX_TRACE_EVENTS are also kept for the trace file.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = None
+        self.events = []
+        self.dropped = 0
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.perf_counter()
+
+    def span(self, name, kind="span"):
+        """Context manager recording the enclosed block as one event"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, kind, name)
+
+    def timed(self, name, kind="span"):
+        """Decorator recording every call of a function as a span"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, kind, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, kind, name, start, duration, bytes_out=0, bytes_in=0):
+        """Add one event; start is a time.perf_counter() value"""
+        with self._lock:
+            totals = self._totals.get((kind, name))
+            if totals is None:
+                totals = self._totals[(kind, name)] = [0, 0.0, 0.0, 0, 0, 0]
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] = max(totals[2], duration)
+            totals[3] += bytes_out
+            totals[4] += bytes_in
+            totals[5] = max(totals[5], bytes_in)
+            if len(self.events) < MAX_TRACE_EVENTS:
+                self.events.append((kind, name, start, duration, bytes_out, bytes_in, threading.get_ident()))
+            else:
+                self.dropped += 1
+
+    def summary(self):
+        """(kind, name, calls, total s, max s, bytes out, bytes in, largest response) rows, slowest first"""
+        with self._lock:
+            rows = [(kind, name, *totals) for (kind, name), totals in self._totals.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def format_summary(self):
+        """Plain-text summary table"""
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        lines = [f"Profile: {elapsed:.2f} s wall; pipelined commands overlap, so their totals can exceed it",
+                 f"{'kind':<5} {'name':<24} {'calls':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9} "
+                 f"{'KB out':>9} {'KB in':>10} {'max resp KB':>11}"]
+        for kind, name, calls, total, longest, bytes_out, bytes_in, largest in self.summary():
+            lines.append(f"{kind:<5} {name[:24]:<24} {calls:>6} {total * 1000:>10.1f} {total * 1000 / calls:>9.2f} "
+                         f"{longest * 1000:>9.1f} {bytes_out / 1024:>9.1f} {bytes_in / 1024:>10.1f} "
+                         f"{largest / 1024:>11.1f}")
+        if self.dropped:
+            lines.append(f"({self.dropped} events beyond {MAX_TRACE_EVENTS} are in the totals only)")
+        return "\n".join(lines)
+
+    def write_trace(self, file_path):
+        """Write the kept events in Chrome trace format (chrome://tracing, Perfetto)"""
+        import json
+        import os
+
+        origin = self.started or 0.0
+        with self._lock:
+            events = list(self.events)
+        trace = [{"name": name, "cat": kind, "ph": "X", "pid": os.getpid(), "tid": thread,
+                  "ts": round((start - origin) * 1e6, 1), "dur": round(duration * 1e6, 1),
+                  "args": {"bytes_out": bytes_out, "bytes_in": bytes_in}}
+                 for kind, name, start, duration, bytes_out, bytes_in, thread in events]
+        with open(file_path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+
+profiler = Profiler()
+
+
+def apply_profile_flags(argv):
+    """Strip --profile / --profile-trace PATH from argv and report at exit when given.
+
+    The summary goes to stderr so headless JSON output on stdout stays clean.
+    Returns the remaining arguments.
+    """
+    remaining = []
+    enabled = False
+    trace_path = None
+    args = iter(argv)
+    for arg in args:
+        if arg == "--profile":
+            enabled = True
+        elif arg == "--profile-trace":
+            enabled = True
+            trace_path = next(args, None)
+        elif arg.startswith("--profile-trace="):
+            enabled = True
+            trace_path = arg.split("=", 1)[1]
+        else:
+            remaining.append(arg)
+    if enabled:
+        profiler.enable()
+        atexit.register(_report, trace_path)
+    return remaining
+
+
+def _report(trace_path):
+    print(profiler.format_summary(), file=sys.stderr)
+    if trace_path:
+        try:
+            profiler.write_trace(trace_path)
+            print(f"Trace written to {trace_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Cannot write trace {trace_path}: {e}", file=sys.stderr)
+
+
+def instrument_imap(conn, profiler=profiler):
+    """Record every command of an imaplib connection with its latency and bytes.
+
+    Wraps the instance's send/read/readline and the _command /
+    _command_complete pair that every imaplib command (and the pipelined
+    UID FETCH in email_reader) goes through. Latency runs from sending a
+    command to its tagged completion; bytes read while completing it are
+    its response. Returns conn; does nothing while profiling is off.
+    """
+    if not profiler.enabled or getattr(conn, "_profiled", False):
+        return conn
+    io = {"out": 0, "in": 0}
+    pending = {}
+    send, read, readline = conn.send, conn.read, conn.readline
+    command, complete = conn._command, conn._command_complete
+
+    def counted_send(data):
+        io["out"] += len(data)
+        return send(data)
+
+    def counted_read(size):
+        data = read(size)
+        io["in"] += len(data)
+        return data
+
+    def counted_readline():
+        line = readline()
+        io["in"] += len(line)
+        return line
+
+    def timed_command(name, *args):
+        label = f"{name} {args[0]}" if name == "UID" and args else name
+        start, sent = time.perf_counter(), io["out"]
+        tag = command(name, *args)
+        pending[tag] = (label, start, io["out"] - sent)
+        return tag
+
+    def timed_complete(name, tag):
+        received = io["in"]
+        try:
+            return complete(name, tag)
+        finally:
+            label, start, sent = pending.pop(tag, (name, time.perf_counter(), 0))
+            profiler.record("imap", label, start, time.perf_counter() - start, sent, io["in"] - received)
+
+    conn.send, conn.read, conn.readline = counted_send, counted_read, counted_readline
+    conn._command, conn._command_complete = timed_command, timed_complete
+    conn._profiled = True
+    return conn
+
+
+def instrument_smtp(server, profiler=profiler):
+    """Record every command of an smtplib connection with its latency and bytes.
+
+    Commands are read from what is sent, one per line, and matched to
+    replies in order, so PIPELINING batches are attributed correctly. Data
+    sent after a 354 reply is the message itself. Only known verbs are
+    used as names; AUTH continuation lines never reach the profile.
+    Returns server; does nothing while profiling is off.
+    """
+    if not profiler.enabled or getattr(server, "_profiled", False):
+        return server
+    pending = []
+    state = {"message": False, "message_start": None, "message_bytes": 0}
+    send, getreply = server.send, server.getreply
+
+    def counted_send(data):
+        now = time.perf_counter()
+        if state["message"]:
+            state["message_start"] = state["message_start"] or now
+            state["message_bytes"] += len(data)
+        else:
+            text = data if isinstance(data, str) else data.decode("latin-1")
+            for line in text.split("\r\n")[:-1] or [text]:
+                verb = line.split(" ", 1)[0].upper()
+                pending.append((verb if verb in SMTP_VERBS else "AUTH (continued)", now, len(line) + 2))
+        return send(data)
+
+    def timed_getreply():
+        try:
+            code, message = getreply()
+        except Exception:
+            pending.clear()
+            state["message"] = False
+            raise
+        if state["message"] and state["message_start"] is not None:
+            name, start, sent = "DATA (message)", state["message_start"], state["message_bytes"]
+            state.update(message=False, message_start=None, message_bytes=0)
+        elif pending:
+            name, start, sent = pending.pop(0)
+        else:
+            name, start, sent = "(unsolicited)", time.perf_counter(), 0
+        lines = message.count(b"\n") + 1
+        profiler.record("smtp", name, start, time.perf_counter() - start, sent, len(message) + 5 * lines + 1)
+        if code == 354:
+            state["message"] = True
+        return code, message
+
+    server.send, server.getreply = counted_send, timed_getreply
+    server._profiled = True
+    return server
@@ -0,0 +1,94 @@
+# utils/render_cache.py
+import shutil
+from collections import OrderedDict
+from datetime import date
+
+from utils.helpers import clean_email_body, format_email_date, extract_clean_sender, wrap_text
+
+DEFAULT_RENDER_CACHE_SIZE = 2000
+MAX_WRAP_WIDTH = 70
+MIN_WRAP_WIDTH = 20
+PREVIEW_LENGTH = 80
+
+
+def terminal_width():
+    """Current terminal width in columns"""
+    return shutil.get_terminal_size().columns
+
+
+class RenderCache:
+    """LRU of display-ready fields per message.
+
+    Sender, date, preview, cleaned body and wrapped body are computed once per
+    message and reused on every redraw. Entries are keyed by message identity
+    and whether the body has been downloaded; everything is dropped when the
+    terminal width or the calendar day changes ("Today"/"Yesterday" labels).
+    """
+
+    def __init__(self, max_entries=DEFAULT_RENDER_CACHE_SIZE, width_source=terminal_width):
+        self.max_entries = max(1, max_entries)
+        self.width_source = width_source
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._entries = OrderedDict()
+        self._generation = None
+
+    def render(self, email):
+        """Return the cached display fields of an email, computing them on first use"""
+        self._check_generation()
+        key = self._key(email)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+        self.stats["misses"] += 1
+        has_body = email.get('body') is not None
+        source = email['body'] if has_body else email.get('preview')
+        cleaned = clean_email_body(source, None if has_body else PREVIEW_LENGTH + 1)
+        entry = {
+            "sender": extract_clean_sender(email.get('sender')),
+            "subject": email.get('subject') or "(No Subject)",
+            "date": format_email_date(email.get('date'), email.get('timestamp')),
+            "preview": cleaned[:PREVIEW_LENGTH] + "..." if len(cleaned) > PREVIEW_LENGTH else cleaned,
+            "snippet": clean_email_body(email['snippet']) if email.get('snippet') else None,
+            "body": cleaned if has_body else None,
+            "wrapped": None
+        }
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def wrapped_body(self, email):
+        """Return the cleaned body wrapped to the terminal, cached with the entry"""
+        entry = self.render(email)
+        if entry["wrapped"] is None:
+            entry["wrapped"] = wrap_text(entry["body"] or clean_email_body(email.get('body')), width=self.wrap_width)
+        return entry["wrapped"]
+
+    @property
+    def wrap_width(self):
+        return max(MIN_WRAP_WIDTH, min(MAX_WRAP_WIDTH, self._generation[0] - 2))
+
+    def invalidate(self, email=None):
+        """Forget one email's entries, or everything"""
+        if email is None:
+            self._entries.clear()
+            return
+        for has_body in (False, True):
+            self._entries.pop(self._key(email, has_body), None)
+
+    def _key(self, email, has_body=None):
+        if has_body is None:
+            has_body = email.get('body') is not None
+        identity = email.get('uid') or email.get('id') or id(email)
+        return (email.get('account'), email.get('folder'), identity, email.get('message_id'), has_body)
+
+    def _check_generation(self):
+        generation = (self.width_source(), date.today())
+        if generation != self._generation:
+            if self._generation is not None:
+                self.stats["invalidations"] += 1
+            self._entries.clear()
+            self._generation = generation
@@ -0,0 +1,116 @@
+# utils/search_index.py
+import re
+import sqlite3
+import time
+
+from utils.body_store import get_body
+from utils.mail_cache import RECORD_COLUMNS, record_from_row
+
+DEFAULT_SEARCH_LIMIT = 20
+# bm25 column weights: sender, subject, body
+RANK_WEIGHTS = (2.0, 4.0, 1.0)
+# snippet() match delimiters: control characters, so neither mail text nor rich markup contains them
+MATCH_START, MATCH_END = "\x02", "\x03"
+
+_INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE message_index USING fts5(
+    sender, subject, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER message_index_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO message_index (rowid, sender, subject, body)
+    VALUES (new.rowid, new.sender, new.subject, COALESCE(new.body, new.preview, ''));
+END;
+CREATE TRIGGER message_index_update AFTER UPDATE OF sender, subject, preview, body ON messages
+WHEN old.sender IS NOT new.sender OR old.subject IS NOT new.subject
+     OR COALESCE(old.body, old.preview) IS NOT COALESCE(new.body, new.preview)
+BEGIN
+    UPDATE message_index SET sender = new.sender, subject = new.subject,
+        body = COALESCE(new.body, new.preview, '') WHERE rowid = new.rowid;
+END;
+CREATE TRIGGER message_index_delete AFTER DELETE ON messages BEGIN
+    DELETE FROM message_index WHERE rowid = old.rowid;
+END;
+"""
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def ensure_search_index(cache):
+    """Create the FTS5 index and its triggers once, back-filling cached mail.
+
+    Triggers on the messages table keep the index current, so only rows whose
+    sender, subject or text actually change are re-indexed. Returns False
+    when this SQLite build has no FTS5.
+    """
+    exists = cache.execute("SELECT 1 FROM sqlite_master WHERE name = 'message_index'").fetchone()
+    if exists:
+        return True
+    try:
+        cache.executescript("BEGIN;" + _INDEX_SCHEMA + """
+            INSERT INTO message_index (rowid, sender, subject, body)
+            SELECT rowid, sender, subject, COALESCE(body, preview, '') FROM messages;
+            COMMIT;""")
+    except sqlite3.OperationalError:
+        if cache.in_transaction:
+            cache.rollback()
+        return False
+
+    # bodies kept in the body store are not in the messages table the back-fill read
+    stored = cache.execute("SELECT rowid, body_digest FROM messages WHERE body IS NULL AND body_digest IS NOT NULL")
+    with cache:
+        for rowid, digest in stored.fetchall():
+            body = get_body(cache, digest)
+            if body is not None:
+                cache.execute("UPDATE message_index SET body = ? WHERE rowid = ?", (body, rowid))
+    return True
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every word must match, last word as a prefix"""
+    terms = _TERM.findall(text or "")
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_messages(cache, text, limit=DEFAULT_SEARCH_LIMIT):
+    """Run a ranked full-text query over cached mail.
+
+    Returns ((records, elapsed_seconds), error); each record carries a
+    `snippet` with the matching text, matches wrapped in MATCH_START and
+    MATCH_END (see snippet_segments).
+    """
+    query = build_match_query(text)
+    if query is None:
+        return ([], 0.0), None
+
+    started = time.perf_counter()
+    try:
+        rows = cache.execute(
+            "SELECT m.folder, m.uidvalidity, COALESCE(f.local, 0), " +
+            ", ".join(f"m.{column}" for column in RECORD_COLUMNS) +
+            ", snippet(message_index, 2, ?, ?, '…', 12)"
+            " FROM message_index JOIN messages AS m ON m.rowid = message_index.rowid"
+            " LEFT JOIN folders AS f ON f.folder = m.folder"
+            " WHERE message_index MATCH ? ORDER BY bm25(message_index, ?, ?, ?) LIMIT ?",
+            (MATCH_START, MATCH_END, query, *RANK_WEIGHTS, limit)).fetchall()
+    except sqlite3.OperationalError as e:
+        return None, f"Search error: {str(e)}"
+
+    records = []
+    for row in rows:
+        record = record_from_row(row[3:-1], row[0], row[1], bool(row[2]))
+        record["snippet"] = row[-1]
+        records.append(record)
+    return (records, time.perf_counter() - started), None
+
+
+def snippet_segments(snippet):
+    """Split a search snippet into (text, is_match) pieces for display"""
+    segments = []
+    for index, piece in enumerate(re.split(f"[{MATCH_START}{MATCH_END}]", snippet or "")):
+        if piece:
+            segments.append((piece, index % 2 == 1))
+    return segments